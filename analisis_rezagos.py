@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Análisis exposición–respuesta con rezagos distribuidos (DLM) entre la temperatura máxima y los
+conteos diarios de atenciones de urgencia y defunciones.
+
+Para cada serie (causa × grupo de edad) se ajusta un modelo cuasi-Poisson:
+
+    log E[y_t] = α + estacionalidad(t) + día de la semana(t) + Σ_l β_l · x_{t-l},   l = 0..21
+
+donde ``x`` es el exceso de temperatura máxima sobre un umbral y los coeficientes por rezago
+``β_l`` se restringen a un polinomio en ``l`` (cross-basis). La matriz de rezagos se construye
+como una vista con ``sliding_window_view`` (sin copiar ni desplazar la serie 22 veces) y los
+ajustes de todas las series corren en paralelo y quedan en caché según la versión de los archivos.
+"""
+
+# %% 1. Importar librerías y parámetros
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from cie10 import mascara
+from datos_base import defunciones, temperaturas, urgencias
+from grupos_causa import atenciones_por_grupo, grupos_defunciones
+from metricas_exposicion import RUTA_TEMPERATURAS, version_archivo
+
+RUTA_URGENCIAS = "data_atenciones_urgencia/df_rm_circ_2024.csv"
+RUTA_DEFUNCIONES = "data_defunciones/defunciones_2024.csv"
+
+REZAGO_MAXIMO = 21
+GRADO_POLINOMIO = 3       # grado del polinomio que suaviza los coeficientes por rezago
+UMBRAL_TEMPERATURA = 30.0 # la exposición es el exceso de t_max sobre este valor (°C)
+ARMONICOS = 2             # pares seno/coseno anuales para la estacionalidad
+MINIMO_PROMEDIO = 1.0     # series con menos de 1 evento diario promedio no se ajustan
+
+# IdCausa -> nombre de las atenciones de urgencia de los grupos vigilados (grupos_causa.py)
+causas_urgencia = atenciones_por_grupo()
+grupos_edad_urgencia = ['Total', 'Menores_1', 'De_1_a_4', 'De_5_a_14', 'De_15_a_64', 'De_65_y_mas']
+
+# Rangos de edad usados en el corredor endémico
+bins_edad_defunciones = [-1, 0, 79, float('inf')]
+labels_edad_defunciones = ['Menor 1 año', '1 a 79', '80 y mas']
+
+
+# %% 2. Cubo diario de conteos
+def cubo_urgencias(ruta: str = RUTA_URGENCIAS, causas: dict = None) -> pd.DataFrame:
+    """
+    Conteos diarios de atenciones de urgencia con columnas MultiIndex (causa, grupo de edad),
+    sumando todos los tipos de establecimiento. ``causas`` mapea IdCausa a nombre
+    (por defecto, las causas del sistema circulatorio).
+    """
+    causas = causas_urgencia if causas is None else causas
+    df = urgencias(ruta)[['fecha', 'IdCausa'] + grupos_edad_urgencia]
+    df = df[df['IdCausa'].isin(causas.keys())]
+    cubo = df.groupby(['fecha', 'IdCausa'])[grupos_edad_urgencia].sum().unstack('IdCausa')
+    cubo = cubo.swaplevel(axis=1).sort_index(axis=1)
+    cubo.columns = pd.MultiIndex.from_tuples(
+        [(causas[causa], edad) for causa, edad in cubo.columns], names=['causa', 'edad'])
+    return cubo.asfreq('D', fill_value=0)
+
+
+def cubo_defunciones(ruta: str = RUTA_DEFUNCIONES) -> pd.DataFrame:
+    """
+    Conteos diarios de defunciones con columnas MultiIndex (causa, grupo de edad), para el total
+    de defunciones y cada grupo de causa del registro (``grupos_causa.py``), en los rangos de edad
+    del corredor endémico. Todos los grupos se cuentan en una sola agrupación.
+    """
+    df = defunciones(ruta)[['EDAD_CANT', 'CIE10', 'DATE']]
+    df = df.dropna(subset=['DATE'])
+    edad_rango = pd.cut(df['EDAD_CANT'], bins=bins_edad_defunciones, labels=labels_edad_defunciones)
+
+    marcas = pd.DataFrame({'Total defunciones': np.ones(len(df), dtype=np.int32)}, index=df.index)
+    for grupo in grupos_defunciones():
+        marcas[grupo.nombre] = mascara(df['CIE10'], grupo.cie10).astype(np.int32)
+    conteos = marcas.groupby([df['DATE'], edad_rango], observed=False).sum()
+    partes = {}
+    for causa in marcas.columns:
+        por_edad = conteos[causa].unstack(fill_value=0)
+        por_edad['Total'] = por_edad.sum(axis=1)
+        partes[causa] = por_edad
+    cubo = pd.concat(partes, axis=1)
+    cubo.columns = pd.MultiIndex.from_tuples([(c, str(e)) for c, e in cubo.columns], names=['causa', 'edad'])
+    return cubo.asfreq('D', fill_value=0)
+
+
+def serie_temperatura(ruta: str = RUTA_TEMPERATURAS) -> pd.Series:
+    """Temperatura máxima diaria (promedio entre estaciones) en un calendario continuo."""
+    df = temperaturas(ruta)[['date', 't_max']]
+    serie = df.groupby('date')['t_max'].mean()
+    return serie.asfreq('D')
+
+
+# %% 3. Construcción de la matriz del modelo
+def matriz_rezagos(x: np.ndarray, rezago_maximo: int = REZAGO_MAXIMO) -> np.ndarray:
+    """
+    Matriz (n - rezago_maximo) × (rezago_maximo + 1) cuya columna ``l`` es ``x`` rezagada ``l`` días.
+    Es una vista sobre ``x`` (sin copia): la fila ``i`` corresponde al día ``i + rezago_maximo``.
+    """
+    return sliding_window_view(np.asarray(x, dtype=float), rezago_maximo + 1)[:, ::-1]
+
+
+def base_rezagos(rezago_maximo: int = REZAGO_MAXIMO, grado: int = GRADO_POLINOMIO) -> np.ndarray:
+    """Base polinomial (rezago_maximo + 1) × (grado + 1) que restringe los coeficientes por rezago."""
+    rezagos = np.arange(rezago_maximo + 1) / rezago_maximo
+    return np.vander(rezagos, grado + 1, increasing=True)
+
+
+def matriz_confusores(fechas: pd.DatetimeIndex) -> np.ndarray:
+    """Intercepto, tendencia lineal, armónicos anuales y variables indicadoras del día de la semana."""
+    t = np.arange(len(fechas), dtype=float)
+    dia_anio = fechas.dayofyear.to_numpy(dtype=float)
+    columnas = [np.ones_like(t), (t - t.mean()) / max(t.std(), 1.0)]
+    for k in range(1, ARMONICOS + 1):
+        angulo = 2 * np.pi * k * dia_anio / 365.25
+        columnas += [np.sin(angulo), np.cos(angulo)]
+    dia_semana = fechas.dayofweek.to_numpy()
+    columnas += [(dia_semana == d).astype(float) for d in range(1, 7)]
+    return np.column_stack(columnas)
+
+
+# %% 4. Ajuste cuasi-Poisson por IRLS
+def ajustar_poisson(X: np.ndarray, y: np.ndarray, max_iter: int = 50, tol: float = 1e-8):
+    """
+    Regresión de Poisson por mínimos cuadrados iterativamente reponderados.
+    Devuelve los coeficientes, su matriz de covarianza (escalada por la sobredispersión estimada,
+    es decir cuasi-Poisson) y la sobredispersión.
+    """
+    mu = y + 0.5
+    eta = np.log(mu)
+    beta = np.zeros(X.shape[1])
+    devianza = np.inf
+    for _ in range(max_iter):
+        z = eta + (y - mu) / mu
+        XtW = X.T * mu
+        beta = np.linalg.solve(XtW @ X, XtW @ z)
+        eta = X @ beta
+        mu = np.exp(eta)
+        con_eventos = y > 0
+        nueva = 2 * (np.sum(y[con_eventos] * np.log(y[con_eventos] / mu[con_eventos])) - np.sum(y - mu))
+        if abs(nueva - devianza) < tol * (abs(nueva) + 0.1):
+            break
+        devianza = nueva
+    grados_libertad = max(len(y) - X.shape[1], 1)
+    dispersion = max(np.sum((y - mu) ** 2 / mu) / grados_libertad, 1.0)
+    covarianza = np.linalg.inv((X.T * mu) @ X) * dispersion
+    return beta, covarianza, dispersion
+
+
+def ajustar_serie(y: np.ndarray, x: np.ndarray, fechas: pd.DatetimeIndex,
+                  rezago_maximo: int = REZAGO_MAXIMO, grado: int = GRADO_POLINOMIO,
+                  umbral: float = UMBRAL_TEMPERATURA) -> pd.DataFrame:
+    """
+    Ajusta el modelo de rezagos distribuidos para una serie diaria ``y`` y la temperatura ``x``
+    (ambas alineadas con ``fechas``). Devuelve una fila por rezago con el riesgo relativo por cada
+    1°C sobre el umbral, su IC 95%, y una fila adicional ``rezago = -1`` con el efecto acumulado.
+    """
+    exposicion = np.clip(np.asarray(x, dtype=float) - umbral, 0, None)
+    rezagos = matriz_rezagos(exposicion, rezago_maximo)
+    base = base_rezagos(rezago_maximo, grado)
+    cross_basis = rezagos @ base
+    confusores = matriz_confusores(fechas[rezago_maximo:])
+    y = np.asarray(y, dtype=float)[rezago_maximo:]
+
+    validos = np.isfinite(cross_basis).all(axis=1) & np.isfinite(y)
+    X = np.column_stack((confusores, cross_basis))[validos]
+    beta, covarianza, dispersion = ajustar_poisson(X, y[validos])
+
+    k = base.shape[1]
+    gamma, cov_gamma = beta[-k:], covarianza[-k:, -k:]
+    # Efecto por rezago y acumulado: combinaciones lineales de gamma
+    contrastes = np.vstack((base, base.sum(axis=0)))
+    efecto = contrastes @ gamma
+    error = np.sqrt(np.einsum('ij,jk,ik->i', contrastes, cov_gamma, contrastes))
+    return pd.DataFrame({
+        'rezago': np.append(np.arange(rezago_maximo + 1), -1),
+        'rr': np.exp(efecto),
+        'rr_inf': np.exp(efecto - 1.96 * error),
+        'rr_sup': np.exp(efecto + 1.96 * error),
+        'dispersion': dispersion,
+        'n_dias': int(validos.sum()),
+    })
+
+
+# %% 5. Ajuste en paralelo de todas las series, en caché
+def _ajustar_cubo(cubo: pd.DataFrame, temperatura: pd.Series, fuente: str,
+                  rezago_maximo: int, umbral: float, max_workers=None) -> pd.DataFrame:
+    fechas = cubo.index.intersection(temperatura.index)
+    fechas = pd.date_range(fechas.min(), fechas.max(), freq='D')
+    cubo = cubo.reindex(fechas)
+    x = temperatura.reindex(fechas).to_numpy()
+    series = [col for col in cubo.columns if cubo[col].mean() >= MINIMO_PROMEDIO]
+
+    def ajustar(col):
+        resultado = ajustar_serie(cubo[col].to_numpy(), x, fechas,
+                                  rezago_maximo=rezago_maximo, umbral=umbral)
+        resultado.insert(0, 'edad', col[1])
+        resultado.insert(0, 'causa', col[0])
+        resultado.insert(0, 'fuente', fuente)
+        return resultado
+
+    # NumPy libera el GIL en las operaciones de álgebra lineal, por lo que un pool de hilos
+    # basta para paralelizar y funciona también dentro del proceso de Streamlit.
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        resultados = list(pool.map(ajustar, series))
+    return pd.concat(resultados, ignore_index=True) if resultados else pd.DataFrame()
+
+
+@lru_cache(maxsize=8)
+def _exposicion_respuesta(versiones: tuple, rezago_maximo: int, umbral: float) -> pd.DataFrame:
+    temperatura = serie_temperatura()
+    return pd.concat([
+        _ajustar_cubo(cubo_urgencias(), temperatura, 'Atenciones de urgencia', rezago_maximo, umbral),
+        _ajustar_cubo(cubo_defunciones(), temperatura, 'Defunciones', rezago_maximo, umbral),
+    ], ignore_index=True)
+
+
+def versiones_entradas() -> tuple:
+    """Versión de cada archivo que leen los ajustes: atenciones, defunciones y temperaturas."""
+    return tuple(version_archivo(r) for r in (RUTA_URGENCIAS, RUTA_DEFUNCIONES, RUTA_TEMPERATURAS))
+
+
+def exposicion_respuesta(rezago_maximo: int = REZAGO_MAXIMO,
+                         umbral: float = UMBRAL_TEMPERATURA) -> pd.DataFrame:
+    """
+    Resultados exposición–respuesta para todas las series de atenciones y defunciones.
+    Quedan en caché mientras no cambien los archivos de origen.
+    """
+    return _exposicion_respuesta(versiones_entradas(), rezago_maximo, umbral).copy()
+
+
+# %%
+if __name__ == '__main__':
+    resultados = exposicion_respuesta()
+    print(resultados[resultados['rezago'] == -1].to_string(index=False))
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecuta las mediciones de las etapas de datos de los dashboards y guarda los resultados en JSON.
+
+Cada página se mide sobre los archivos incluidos en el repositorio (escala 1) y sobre copias
+escaladas a ``N`` veces sus años (ver ``escalar.py``). Los resultados quedan en
+``benchmarks/resultados/<fecha>_<commit>.json`` y se comparan con el archivo anterior para
+mostrar las etapas que se volvieron más lentas. La carpeta no se versiona: los tiempos solo son
+comparables en la misma máquina, por lo que la primera ejecución en cada una fija la referencia.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.ejecutar
+    python -m benchmarks.ejecutar --escalas 1 10 100 --repeticiones 5
+    python -m benchmarks.ejecutar --paginas alertas defunciones
+    python -m benchmarks.ejecutar --datos /tmp/sintetico   # datos de benchmarks.generar_datos
+"""
+
+# %% 1. Importar librerías y rutas
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.escalar import DIRECTORIO, preparar
+from benchmarks.generar_datos import salidas
+from benchmarks.etapas import Registro, paginas
+
+DIRECTORIO_RESULTADOS = os.path.join(DIRECTORIO, "benchmarks", "resultados")
+DIRECTORIO_DATOS = os.path.join(tempfile.gettempdir(), "benchmarks_dashboard")
+UMBRAL_REGRESION = 1.2  # una etapa se marca si su mediana es 20% mayor que en la medición anterior
+
+
+# %% 2. Medición
+def commit_actual() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRECTORIO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'sin_git'
+
+
+def medir(escalas, nombres, repeticiones: int, datos: str = None) -> dict:
+    """
+    Resultados ``escala -> página -> etapa -> {mediana_s, minimo_s, repeticiones, filas}``.
+    Si se indica ``datos`` (una carpeta con la estructura del repositorio), se mide además sobre
+    esos archivos con la etiqueta ``datos``.
+    """
+    conjuntos = {f"x{escala}": preparar(escala, DIRECTORIO_DATOS) for escala in escalas}
+    if datos:
+        conjuntos['datos'] = {nombre: os.path.join(datos, relativa) for nombre, relativa in salidas.items()}
+    resultados = {}
+    for etiqueta, rutas in conjuntos.items():
+        resultados[etiqueta] = {}
+        for nombre in nombres:
+            registro = Registro()
+            for _ in range(repeticiones):
+                paginas[nombre](rutas, registro)
+            resultados[etiqueta][nombre] = registro.resumen()
+            total = sum(etapa['mediana_s'] for etapa in resultados[etiqueta][nombre].values())
+            print(f"{etiqueta:<6} {nombre:<22} {total:8.3f} s")
+    return resultados
+
+
+def guardar(resultados: dict, repeticiones: int) -> str:
+    os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+    commit = commit_actual()
+    documento = {
+        'commit': commit,
+        'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'maquina': platform.machine(),
+        'repeticiones': repeticiones,
+        'resultados': resultados,
+    }
+    ruta = os.path.join(DIRECTORIO_RESULTADOS, f"{time.strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, ensure_ascii=False, indent=1)
+    return ruta
+
+
+def comparar(actual: str, umbral: float = UMBRAL_REGRESION) -> list:
+    """Etapas cuya mediana creció más que ``umbral`` respecto del resultado anterior a ``actual``."""
+    anteriores = sorted(r for r in glob.glob(os.path.join(DIRECTORIO_RESULTADOS, '*.json')) if r != actual)
+    if not anteriores:
+        return []
+    with open(anteriores[-1], encoding='utf-8') as f:
+        previo = json.load(f)
+    with open(actual, encoding='utf-8') as f:
+        nuevo = json.load(f)
+    regresiones = []
+    for escala, por_pagina in nuevo['resultados'].items():
+        for pagina, etapas in por_pagina.items():
+            for etapa, valores in etapas.items():
+                antes = previo['resultados'].get(escala, {}).get(pagina, {}).get(etapa)
+                if antes and antes['mediana_s'] > 0 and valores['mediana_s'] / antes['mediana_s'] > umbral:
+                    regresiones.append((escala, pagina, etapa, antes['mediana_s'], valores['mediana_s'], previo['commit']))
+    return regresiones
+
+
+# %%
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mide las etapas de datos de los dashboards.")
+    parser.add_argument('--escalas', nargs='*', type=int, default=[1, 10], help='factores de escala (años × N)')
+    parser.add_argument('--paginas', nargs='*', default=list(paginas), choices=list(paginas))
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--datos', help='carpeta con datos propios (p. ej. de benchmarks.generar_datos)')
+    args = parser.parse_args()
+
+    resultados = medir(args.escalas, args.paginas, args.repeticiones, args.datos)
+    ruta = guardar(resultados, args.repeticiones)
+    print(f"Resultados guardados en {os.path.relpath(ruta, DIRECTORIO)}")
+    regresiones = comparar(ruta)
+    for escala, pagina, etapa, antes, ahora, commit in regresiones:
+        print(f"  más lento: {escala} {pagina}.{etapa}: {antes:.3f} s ({commit}) -> {ahora:.3f} s")
+    sys.exit(1 if regresiones else 0)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Datos escalados para las mediciones: repite los archivos incluidos en el repositorio ``factor``
+veces, desplazando cada copia un número entero de años hacia atrás, de modo que la serie
+resultante cubra ``factor`` veces más años con la misma forma (columnas, separadores, codificación).
+"""
+
+# %% 1. Importar librerías y rutas de origen
+import os
+
+import pandas as pd
+
+DIRECTORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nombre lógico -> (ruta relativa, columna de fecha, opciones de lectura/escritura)
+archivos_base = {
+    'temperaturas': ("data_temperatura/tmm_historico_2024.csv", 'date', {}),
+    'urgencias': ("data_atenciones_urgencia/df_rm_circ_2024.csv", 'fecha', {}),
+    'defunciones': ("data_defunciones/defunciones_2024.csv", 'DATE', {'sep': '|'}),
+}
+
+
+def anios_cubiertos(fechas: pd.Series) -> int:
+    """Años completos que abarca la serie (mínimo 1), para que las copias no se traslapen."""
+    return max(1, fechas.dt.year.max() - fechas.dt.year.min() + 1)
+
+
+def escalar_archivo(origen: str, destino: str, columna_fecha: str, factor: int, **opciones):
+    """Escribe en ``destino`` el archivo ``origen`` repetido ``factor`` veces, una copia por bloque de años."""
+    df = pd.read_csv(origen, dtype=str, **opciones)
+    fechas = pd.to_datetime(df[columna_fecha], errors='coerce')
+    paso = anios_cubiertos(fechas.dropna())
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    for copia in range(factor):
+        bloque = df.copy()
+        desplazadas = fechas - pd.DateOffset(years=paso * copia)
+        bloque[columna_fecha] = desplazadas.dt.strftime('%Y-%m-%d').where(fechas.notna(), df[columna_fecha])
+        if 'ANO_DEF' in bloque:
+            bloque['ANO_DEF'] = desplazadas.dt.year.astype('Int64').astype(str).where(fechas.notna(), df['ANO_DEF'])
+        bloque.to_csv(destino, mode='w' if copia == 0 else 'a', header=copia == 0, index=False, **opciones)
+
+
+def preparar(factor: int, directorio: str) -> dict:
+    """
+    Devuelve ``nombre -> ruta`` de los archivos con ``factor`` veces los años del original.
+    Con ``factor == 1`` son los archivos incluidos en el repositorio; el resto se genera en
+    ``directorio/x<factor>/`` solo si aún no existe.
+    """
+    rutas = {}
+    for nombre, (relativa, columna_fecha, opciones) in archivos_base.items():
+        origen = os.path.join(DIRECTORIO, relativa)
+        if factor == 1:
+            rutas[nombre] = origen
+            continue
+        destino = os.path.join(directorio, f"x{factor}", relativa)
+        if not os.path.exists(destino):
+            escalar_archivo(origen, destino, columna_fecha, factor, **opciones)
+        rutas[nombre] = destino
+    return rutas
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Etapas de datos de cada dashboard, reproducidas sin Streamlit para medirlas.
+
+Cada función ``pagina_*`` recorre las mismas etapas que la página correspondiente (lectura del CSV,
+conversión de tipos, cálculo de alertas, agrupaciones, construcción de la figura, exportación a
+Excel y serialización JSON de la figura) y registra el tiempo de cada una en un ``Registro``.
+Se llaman directamente las funciones de los módulos, saltando sus cachés (``__wrapped__``),
+para medir el costo real de cada etapa y no el de un acierto de caché.
+"""
+
+# %% 1. Importar librerías y registro de tiempos
+import io
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from metricas_exposicion import calcular_metricas_diarias, episodios_calor, evaluar_alertas
+from cubo_atenciones import (_cubo_diario, formato_largo, razones_hospitalizacion, tipos_establecimiento,
+                             grupos_edad)
+from analisis_rezagos import cubo_defunciones, serie_temperatura, ajustar_serie
+
+
+class Registro:
+    """Tiempos (s) y filas procesadas por etapa, acumulados sobre varias repeticiones."""
+
+    def __init__(self):
+        self.tiempos = {}
+        self.filas = {}
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        inicio = time.perf_counter()
+        resultado = {}
+        yield resultado
+        self.tiempos.setdefault(nombre, []).append(time.perf_counter() - inicio)
+        if 'filas' in resultado:
+            self.filas[nombre] = int(resultado['filas'])
+
+    def resumen(self) -> dict:
+        return {nombre: {'mediana_s': float(np.median(t)), 'minimo_s': float(np.min(t)),
+                         'repeticiones': len(t), 'filas': self.filas.get(nombre)}
+                for nombre, t in self.tiempos.items()}
+
+
+def a_excel(df: pd.DataFrame) -> bytes:
+    salida = io.BytesIO()
+    with pd.ExcelWriter(salida, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Datos')
+    return salida.getvalue()
+
+
+# %% 2. Páginas
+def pagina_alertas(rutas: dict, registro: Registro):
+    with registro.etapa('leer_csv') as r:
+        df = pd.read_csv(rutas['temperaturas'])
+        r['filas'] = len(df)
+    with registro.etapa('convertir'):
+        df['date'] = pd.to_datetime(df['date'])
+    with registro.etapa('alertas') as r:
+        alertas = evaluar_alertas(df)
+        r['filas'] = len(alertas)
+    with registro.etapa('metricas_episodios'):
+        diario = calcular_metricas_diarias(df)
+        episodios_calor(diario)
+    with registro.etapa('figura'):
+        fig = px.line(alertas, x='date', y='t_max', markers=True)
+        for nombre, mascara in [('30-34', (alertas['t_max'] >= 30) & (alertas['t_max'] < 34)),
+                                ('34-40', (alertas['t_max'] >= 34) & (alertas['t_max'] < 40)),
+                                ('40+', alertas['t_max'] >= 40)]:
+            fig.add_scatter(x=alertas.loc[mascara, 'date'], y=alertas.loc[mascara, 't_max'],
+                            mode='markers', name=nombre)
+    with registro.etapa('excel'):
+        a_excel(alertas[['date', 't_max', 'alerta']])
+    with registro.etapa('json'):
+        fig.to_json()
+
+
+def pagina_atenciones(rutas: dict, registro: Registro):
+    with registro.etapa('leer_csv') as r:
+        df = pd.read_csv(rutas['urgencias'])
+        r['filas'] = len(df)
+    with registro.etapa('convertir'):
+        df['fecha'] = pd.to_datetime(df['fecha'])
+    with registro.etapa('groupby_causas'):
+        # Como los gráficos de la página: un filtro y un groupby por causa
+        series = {causa: df[df['IdCausa'] == causa].groupby('fecha')['Total'].sum()
+                  for causa in (12, 13, 14, 15, 16, 17)}
+    with registro.etapa('cubo') as r:
+        cubo, calendario, tipos, ids, _ = _cubo_diario.__wrapped__(rutas['urgencias'], None)
+        r['filas'] = cubo.size
+    tipos_establecimiento(rutas['urgencias'])  # textos de causa en caché, fuera de la medición
+    with registro.etapa('formato_largo'):
+        formato_largo(cubo.sum(axis=1), calendario, ids, ruta=rutas['urgencias'])
+    with registro.etapa('figura'):
+        fig = go.Figure([go.Scatter(x=s.index, y=s.values, mode='lines', name=str(c)) for c, s in series.items()])
+    with registro.etapa('excel'):
+        a_excel(pd.DataFrame(series).reset_index())
+    with registro.etapa('json'):
+        fig.to_json()
+
+
+def pagina_hospitalizaciones(rutas: dict, registro: Registro):
+    cubo, calendario, _, ids, _ = _cubo_diario.__wrapped__(rutas['urgencias'], None)
+    cubo = cubo.sum(axis=1)
+    with registro.etapa('razones') as r:
+        razones = razones_hospitalizacion(cubo, calendario, ids)
+        r['filas'] = razones.size
+    with registro.etapa('figura'):
+        seleccion = razones['Hospitalizaciones - Sistema Circulatorio', 'Total Sistema Circulatorio']
+        fig = go.Figure([go.Scatter(x=seleccion.index, y=seleccion[g], mode='lines', name=g) for g in grupos_edad])
+    with registro.etapa('json'):
+        fig.to_json()
+
+
+def pagina_defunciones(rutas: dict, registro: Registro):
+    with registro.etapa('leer_csv') as r:
+        data = pd.read_csv(rutas['defunciones'], sep='|', dtype=str)
+        r['filas'] = len(data)
+    with registro.etapa('convertir'):
+        data['CARDIOVASCULAR'] = data['CARDIOVASCULAR'].map({'True': True, 'False': False})
+        data['DATE'] = pd.to_datetime(data['DATE'], errors='coerce')
+        data['EDAD_CANT'] = pd.to_numeric(data['EDAD_CANT'], errors='coerce')
+    with registro.etapa('groupby'):
+        diario = data[data['CARDIOVASCULAR']].groupby('DATE').size().reset_index(name='CARDIOVASCULAR')
+        total = data.groupby('DATE').size().reset_index(name='Total')
+        por_edad = data[data['CARDIOVASCULAR']].copy()
+        por_edad['Grupo_Edad'] = por_edad['EDAD_CANT'].apply(lambda x: '>= 85' if x >= 85 else ('< 1' if x < 1 else 'Otros'))
+        por_edad.groupby(['DATE', 'Grupo_Edad']).size()
+        combinado = pd.merge(total, diario, on='DATE', how='left').fillna(0)
+    with registro.etapa('cubo_defunciones'):
+        cubo_defunciones(rutas['defunciones'])
+    with registro.etapa('figura'):
+        fig = px.line(diario, x='DATE', y='CARDIOVASCULAR')
+    with registro.etapa('excel'):
+        a_excel(combinado)
+    with registro.etapa('json'):
+        fig.to_json()
+
+
+def pagina_exposicion(rutas: dict, registro: Registro):
+    temperatura = serie_temperatura(rutas['temperaturas'])
+    cubo = cubo_defunciones(rutas['defunciones'])
+    fechas = cubo.index.intersection(temperatura.index)
+    with registro.etapa('ajuste_dlm') as r:
+        # Un ajuste (la página ajusta uno por serie): total de defunciones cardiovasculares
+        y = cubo.loc[fechas, ('Cardiovascular', 'Total')].to_numpy(dtype=float)
+        ajustar_serie(y, temperatura.loc[fechas].to_numpy(), fechas)
+        r['filas'] = len(fechas)
+
+
+paginas = {
+    'alertas': pagina_alertas,
+    'atenciones_urgencia': pagina_atenciones,
+    'hospitalizaciones': pagina_hospitalizaciones,
+    'defunciones': pagina_defunciones,
+    'exposicion_respuesta': pagina_exposicion,
+}
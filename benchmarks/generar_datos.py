@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Generador de datos sintéticos con la forma de los archivos de los dashboards, para pruebas de carga.
+
+Produce, para cualquier rango de años, número de estaciones y tipos de establecimiento:
+    - ``data_temperatura/tmm_historico_2024.csv``: temperaturas diarias por estación, con ciclo anual,
+      anomalías persistentes (AR(1)) y olas de calor ocasionales.
+    - ``data_atenciones_urgencia/df_rm_circ_2024.csv``: atenciones y hospitalizaciones por tipo de
+      establecimiento, causa y grupo de edad, con estacionalidad, efecto día de la semana y un exceso
+      de riesgo cuando la temperatura máxima (promedio de 3 días) supera 30°C.
+    - ``data_defunciones/defunciones_2024.csv``: una fila por defunción, con edad, sexo, diagnóstico
+      CIE-10, comuna de residencia y el mismo efecto del calor (mayor en causas cardiovasculares).
+
+Los días se generan por bloques y cada bloque se agrega al final de los archivos, por lo que la
+memoria no crece con el largo del período (``--poblacion`` multiplica las tasas para obtener
+archivos de varios GB). Con la misma semilla y los mismos parámetros la salida es idéntica.
+
+Uso:
+    python -m benchmarks.generar_datos --destino /tmp/sintetico --desde 1990 --hasta 2025
+    python -m benchmarks.generar_datos --destino /tmp/grande --estaciones 5 --poblacion 20
+"""
+
+# %% 1. Importar librerías y parámetros del modelo
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.escalar import DIRECTORIO
+
+SEMILLA = 2024
+DIAS_POR_BLOQUE = 92
+
+ESTACION_BASE = 330020
+UMBRAL_CALOR = 30.0  # °C sobre el cual aumenta el riesgo
+
+# Atenciones diarias promedio por causa en un Hospital (orden de magnitud de los datos de la RM)
+tasas_causa = {13: 8.6, 14: 27.5, 15: 10.0, 16: 14.6, 17: 111.8}
+OTRAS_CAUSAS = 4230.0      # atenciones de urgencia no circulatorias
+HOSPITALIZACIONES = 503.0  # hospitalizaciones totales (solo en hospitales)
+FRACCION_HOSP_CIRC = 0.114
+textos_causa = {
+    1: 'Atenciones de urgencia - Total',
+    12: 'Atenciones de urgencia - Total Sistema Circulatorio',
+    13: 'Atenciones de urgencia - Infarto agudo miocardio',
+    14: 'Atenciones de urgencia - Accidente vascular encefálico',
+    15: 'Atenciones de urgencia - Crisis hipertensiva',
+    16: 'Atenciones de urgencia - Arritmia grave',
+    17: 'Atenciones de urgencia - Otras causas circulatorias',
+    22: 'Hospitalizaciones - CAUSAS SISTEMA CIRCULATORIO',
+    25: 'Hospitalizaciones - Total',
+}
+# Escala de cada tipo de establecimiento respecto de un Hospital; otros tipos usan ESCALA_OTRO
+escala_establecimiento = {'Hospital': 1.0, 'SAPU': 0.86, 'SAR': 0.37, 'SUR': 0.03}
+ESCALA_OTRO = 0.3
+grupos_edad = ['Menores_1', 'De_1_a_4', 'De_5_a_14', 'De_15_a_64', 'De_65_y_mas']
+edades_circulatorio = [0.001, 0.003, 0.015, 0.52, 0.461]
+edades_general = [0.03, 0.09, 0.15, 0.55, 0.18]
+
+# Efecto del calor: log-riesgo relativo por °C sobre el umbral
+BETA_CIRCULATORIO = 0.025
+BETA_GENERAL = 0.008
+BETA_DEFUNCIONES_CV = 0.035
+BETA_DEFUNCIONES = 0.012
+
+DEFUNCIONES_DIARIAS = 128.0
+FRACCION_CARDIOVASCULAR = 0.257
+capitulos_no_cv = {'C': 0.32, 'J': 0.18, 'K': 0.09, 'G': 0.075, 'E': 0.057, 'F': 0.04, 'T': 0.04,
+                   'N': 0.04, 'A': 0.03, 'R': 0.03, 'X': 0.028, 'V': 0.02, 'Y': 0.02, 'M': 0.01, 'D': 0.01, 'Q': 0.01}
+
+columnas_temperatura = ['day', 't_min', 'ht_min', 't_max', 'ht_max', 'Climatologica', 'Aritmetica',
+                        'col_7', 'col_8', 'col_9', 'url', 'est', 'year', 'month', 'date']
+columnas_defunciones = ['SEXO', 'EDAD_TIPO', 'EDAD_CANT', 'DIA_DEF', 'MES_DEF', 'ANO_DEF', 'DIAG1', 'REG_RES',
+                        'COMUNA', 'CARDIOVASCULAR', 'DATE']
+salidas = {
+    'temperaturas': "data_temperatura/tmm_historico_2024.csv",
+    'urgencias': "data_atenciones_urgencia/df_rm_circ_2024.csv",
+    'defunciones': "data_defunciones/defunciones_2024.csv",
+}
+
+
+# %% 2. Componentes del modelo
+def estacionalidad(fechas: pd.DatetimeIndex, amplitud: float, dia_pico: int) -> np.ndarray:
+    """Factor multiplicativo anual (1 ± amplitud) con máximo en ``dia_pico`` del año."""
+    return 1 + amplitud * np.cos(2 * np.pi * (fechas.dayofyear.to_numpy() - dia_pico) / 365.25)
+
+
+def efecto_dia_semana(fechas: pd.DatetimeIndex) -> np.ndarray:
+    return np.array([1.08, 1.02, 1.0, 0.99, 1.0, 0.95, 0.96])[fechas.dayofweek.to_numpy()]
+
+
+def riesgo_calor(temperatura_3d: np.ndarray, beta: float) -> np.ndarray:
+    return np.exp(beta * np.clip(temperatura_3d - UMBRAL_CALOR, 0, None))
+
+
+def repartir_edades(rng, totales: np.ndarray, proporciones) -> np.ndarray:
+    """Reparte cada total entre los grupos de edad (multinomial, vectorizado)."""
+    return rng.multinomial(totales.astype(np.int64), proporciones)
+
+
+class Generador:
+    """Estado de la simulación entre bloques (anomalías AR(1), olas de calor y últimos días de temperatura)."""
+
+    def __init__(self, estaciones: int, establecimientos: list, poblacion: float, semilla: int):
+        self.rng = np.random.default_rng(semilla)
+        self.estaciones = [str(ESTACION_BASE + i) for i in range(estaciones)]
+        self.desplazamiento = np.concatenate(([0.0], self.rng.normal(0, 1.2, estaciones - 1)))
+        self.establecimientos = establecimientos
+        self.poblacion = poblacion
+        self.anomalia = np.zeros(estaciones)
+        self.ola_restante = 0
+        self.ultimas = np.full(2, np.nan)
+        comunas = pd.read_csv(os.path.join(DIRECTORIO, "data_espacial/comunas_rm.csv"), dtype={'codigo': str})
+        self.comunas = comunas['codigo'].to_numpy()
+        self.peso_comunas = self.rng.gamma(2.0, 1.0, len(self.comunas))
+        self.peso_comunas /= self.peso_comunas.sum()
+
+    # --- Temperaturas
+    def temperaturas(self, fechas: pd.DatetimeIndex):
+        """Tabla de temperaturas del bloque (todas las estaciones) y t_max regional por día."""
+        n, e = len(fechas), len(self.estaciones)
+        ciclo = 23.5 + 7.5 * np.cos(2 * np.pi * (fechas.dayofyear.to_numpy() - 15) / 365.25)
+        anomalias = np.empty((n, e))
+        ola = np.zeros(n)
+        for t in range(n):
+            self.anomalia = 0.7 * self.anomalia + self.rng.normal(0, 2.2, e)
+            anomalias[t] = self.anomalia
+            if self.ola_restante == 0 and fechas.month[t] in (12, 1, 2) and self.rng.random() < 0.02:
+                self.ola_restante = int(self.rng.integers(2, 6))
+            if self.ola_restante > 0:
+                ola[t] = self.rng.uniform(4, 8)
+                self.ola_restante -= 1
+        t_max = np.round(ciclo[:, None] + self.desplazamiento[None, :] + anomalias + ola[:, None], 1)
+        t_min = np.round(t_max - 14.5 + 2 * np.cos(2 * np.pi * (fechas.dayofyear.to_numpy()[:, None] - 15) / 365.25)
+                         + self.rng.normal(0, 1.5, (n, e)), 1)
+
+        fecha = np.repeat(fechas, e)
+        minutos_min = self.rng.integers(300, 480, n * e)
+        minutos_max = self.rng.integers(840, 1080, n * e)
+        tabla = pd.DataFrame({
+            'day': fecha.day.astype(float),
+            't_min': t_min.ravel(),
+            'ht_min': [f"{m // 60:02d}:{m % 60:02d}" for m in minutos_min],
+            't_max': t_max.ravel(),
+            'ht_max': [f"{m // 60:02d}:{m % 60:02d}" for m in minutos_max],
+        })
+        tabla['Climatologica'] = np.round((tabla['t_min'] + tabla['t_max']) / 2, 1)
+        tabla['Aritmetica'] = tabla['Climatologica']
+        tabla['col_7'] = 24
+        tabla['col_8'] = ''
+        tabla['col_9'] = ''
+        tabla['est'] = np.tile(self.estaciones, n)
+        tabla['year'] = fecha.year
+        tabla['month'] = fecha.month
+        tabla['url'] = tabla['est'] + '/' + tabla['year'].astype(str) + '/' + tabla['month'].astype(str)
+        tabla['date'] = fecha.strftime('%Y-%m-%d')
+
+        regional = t_max.mean(axis=1)
+        historia = np.concatenate((self.ultimas, regional))
+        promedio_3d = pd.Series(historia).rolling(3, min_periods=1).mean().to_numpy()[2:]
+        self.ultimas = historia[-2:]
+        return tabla[columnas_temperatura], promedio_3d
+
+    # --- Atenciones de urgencia
+    def urgencias(self, fechas: pd.DatetimeIndex, temperatura_3d: np.ndarray) -> pd.DataFrame:
+        n = len(fechas)
+        base = estacionalidad(fechas, 0.12, 196) * efecto_dia_semana(fechas) * self.poblacion
+        calor_circ = riesgo_calor(temperatura_3d, BETA_CIRCULATORIO)
+        calor_gen = riesgo_calor(temperatura_3d, BETA_GENERAL)
+        bloques = []
+        for tipo in self.establecimientos:
+            escala = escala_establecimiento.get(tipo, ESCALA_OTRO)
+            conteos = {}
+            for causa, tasa in tasas_causa.items():
+                conteos[causa] = repartir_edades(self.rng, self.rng.poisson(tasa * escala * base * calor_circ),
+                                                 edades_circulatorio)
+            conteos[12] = sum(conteos[c] for c in tasas_causa)
+            otras = repartir_edades(self.rng, self.rng.poisson(OTRAS_CAUSAS * escala * base * calor_gen), edades_general)
+            conteos[1] = conteos[12] + otras
+            if tipo == 'Hospital':
+                hosp = self.rng.poisson(HOSPITALIZACIONES * base * calor_gen)
+                hosp_circ = self.rng.binomial(hosp, np.clip(FRACCION_HOSP_CIRC * calor_circ / calor_gen, 0, 1))
+                conteos[25] = repartir_edades(self.rng, hosp, edades_general)
+                conteos[22] = repartir_edades(self.rng, hosp_circ, edades_circulatorio)
+            else:
+                conteos[25] = conteos[22] = np.zeros((n, len(grupos_edad)), dtype=np.int64)
+            for causa in textos_causa:
+                bloque = pd.DataFrame(conteos[causa], columns=grupos_edad)
+                bloque.insert(0, 'Total', bloque.sum(axis=1))
+                bloque.insert(0, 'Causa', textos_causa[causa])
+                bloque.insert(0, 'IdCausa', causa)
+                bloque.insert(0, 'fecha', fechas.strftime('%Y-%m-%d'))
+                bloque.insert(0, 'GLOSATIPOESTABLECIMIENTO', tipo)
+                bloques.append(bloque)
+        tabla = pd.concat(bloques, ignore_index=True)
+        return tabla.sort_values(['GLOSATIPOESTABLECIMIENTO', 'fecha', 'IdCausa'], kind='stable')
+
+    # --- Defunciones
+    def defunciones(self, fechas: pd.DatetimeIndex, temperatura_3d: np.ndarray) -> pd.DataFrame:
+        base = DEFUNCIONES_DIARIAS * estacionalidad(fechas, 0.15, 196) * self.poblacion
+        n_cv = self.rng.poisson(base * FRACCION_CARDIOVASCULAR * riesgo_calor(temperatura_3d, BETA_DEFUNCIONES_CV))
+        n_otras = self.rng.poisson(base * (1 - FRACCION_CARDIOVASCULAR) * riesgo_calor(temperatura_3d, BETA_DEFUNCIONES))
+        total = n_cv + n_otras
+        n = int(total.sum())
+        fecha = np.repeat(fechas, total)
+        cardiovascular = np.concatenate([np.r_[np.ones(c, bool), np.zeros(o, bool)] for c, o in zip(n_cv, n_otras)]) \
+            if n else np.zeros(0, bool)
+
+        letras = np.array(list(capitulos_no_cv))
+        probabilidades = np.array(list(capitulos_no_cv.values()))
+        capitulo = np.where(cardiovascular, 'I', self.rng.choice(letras, n, p=probabilidades / probabilidades.sum()))
+        codigo = self.rng.integers(0, 1000, n)
+        diag1 = pd.Series(capitulo).str.cat(pd.Series(codigo).map('{:03d}'.format))
+
+        infante = self.rng.random(n) < 0.007
+        edad_tipo = np.where(infante, self.rng.choice([2, 3, 4], n), 1)
+        edad = np.where(infante, self.rng.integers(0, 12, n),
+                        np.clip(np.round(self.rng.normal(76, 15, n)), 1, 110)).astype(int)
+        return pd.DataFrame({
+            'SEXO': self.rng.choice([1, 2], n),
+            'EDAD_TIPO': edad_tipo,
+            'EDAD_CANT': edad,
+            'DIA_DEF': fecha.day,
+            'MES_DEF': fecha.month,
+            'ANO_DEF': fecha.year,
+            'DIAG1': diag1,
+            'REG_RES': 13.0,
+            'COMUNA': self.rng.choice(self.comunas, n, p=self.peso_comunas),
+            'CARDIOVASCULAR': cardiovascular,
+            'DATE': fecha.strftime('%Y-%m-%d'),
+        })[columnas_defunciones]
+
+
+# %% 3. Escritura por bloques
+def generar(destino: str, desde: int, hasta: int, estaciones: int = 1, establecimientos=None,
+            poblacion: float = 1.0, semilla: int = SEMILLA, dias_por_bloque: int = DIAS_POR_BLOQUE) -> dict:
+    """
+    Genera los tres archivos en ``destino`` (con la misma estructura de carpetas del repositorio)
+    para los años ``desde``..``hasta``. Devuelve ``nombre -> ruta``.
+    """
+    establecimientos = establecimientos or list(escala_establecimiento)
+    generador = Generador(estaciones, establecimientos, poblacion, semilla)
+    rutas = {nombre: os.path.join(destino, relativa) for nombre, relativa in salidas.items()}
+    for ruta in rutas.values():
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    calendario = pd.date_range(f"{desde}-01-01", f"{hasta}-12-31", freq='D')
+    for inicio in range(0, len(calendario), dias_por_bloque):
+        fechas = calendario[inicio:inicio + dias_por_bloque]
+        primero = inicio == 0
+        temperaturas, temperatura_3d = generador.temperaturas(fechas)
+        temperaturas.to_csv(rutas['temperaturas'], mode='w' if primero else 'a', header=primero, index=False)
+        generador.urgencias(fechas, temperatura_3d).to_csv(
+            rutas['urgencias'], mode='w' if primero else 'a', header=primero, index=False)
+        generador.defunciones(fechas, temperatura_3d).to_csv(
+            rutas['defunciones'], mode='w' if primero else 'a', header=primero, index=False, sep='|')
+    return rutas
+
+
+# %%
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos con la forma de los archivos de los dashboards.")
+    parser.add_argument('--destino', required=True, help='carpeta de salida (se crea la estructura data_*/)')
+    parser.add_argument('--desde', type=int, default=2015)
+    parser.add_argument('--hasta', type=int, default=2025)
+    parser.add_argument('--estaciones', type=int, default=1)
+    parser.add_argument('--establecimientos', nargs='*', default=None,
+                        help='tipos de establecimiento (por defecto Hospital, SAPU, SAR y SUR)')
+    parser.add_argument('--poblacion', type=float, default=1.0, help='multiplicador de las tasas de eventos')
+    parser.add_argument('--semilla', type=int, default=SEMILLA)
+    args = parser.parse_args()
+
+    rutas = generar(args.destino, args.desde, args.hasta, args.estaciones, args.establecimientos,
+                    args.poblacion, args.semilla)
+    for nombre, ruta in rutas.items():
+        print(f"{nombre:<13} {os.path.getsize(ruta) / 1e6:10.1f} MB  {ruta}")
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de artefactos direccionada por contenido para las salidas de los procesos ETL.
+
+Cada salida se serializa en memoria, se identifica por su hash SHA-256 y se guarda una sola vez en
+``data_cache/objetos/<hash[:2]>/<hash>``. Un manifiesto (``data_cache/manifest.json``) asocia cada
+nombre lógico de dataset a su hash y a la ruta que leen los dashboards. Así:
+    - Si una ejecución produce exactamente el mismo contenido, la ruta publicada no se reescribe
+      (no cambia su fecha de modificación ni se invalidan los cachés que dependen de ella).
+    - Los dashboards pueden usar el hash del manifiesto como clave de sus cachés en memoria, en vez
+      de volver a revisar los archivos.
+
+En el servidor del visor, ``precarga.py`` fija con ``servir_estado`` las versiones que ven las
+páginas (manifiesto y versión de cada archivo vigilado): ``cargar_manifiesto``, ``hash_manifiesto``
+y ``version_archivo`` devuelven ese estado fijado, y solo cambian cuando el refresco en segundo plano
+terminó de recalcular las cachés para los archivos nuevos.
+
+Las etapas de ``pipeline.py`` corren en procesos paralelos y todas publican: cada publicación lee,
+modifica y guarda el manifiesto con un candado de archivo (``bloqueo_manifiesto``), de modo que
+ninguna pisa las entradas de otra y ``limpiar`` no borra un objeto que se está publicando.
+"""
+
+# %% 1. Importar librerías y rutas
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_CACHE = os.path.join(DIRECTORIO, "data_cache")
+DIRECTORIO_OBJETOS = os.path.join(DIRECTORIO_CACHE, "objetos")
+RUTA_MANIFIESTO = os.path.join(DIRECTORIO_CACHE, "manifest.json")
+RUTA_CANDADO = os.path.join(DIRECTORIO_CACHE, "manifest.lock")
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Estado servido a las páginas: (manifiesto, {ruta absoluta: versión}); None = leer siempre del disco
+_servido = None
+_local = threading.local()  # estado propio del hilo que está recalculando (ver ``con_estado``)
+
+
+# %% 2. Manifiesto
+def _manifiesto_disco() -> dict:
+    if not os.path.exists(RUTA_MANIFIESTO):
+        return {}
+    with open(RUTA_MANIFIESTO, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _estado_vigente():
+    return getattr(_local, 'estado', None) or _servido
+
+
+def cargar_manifiesto() -> dict:
+    """
+    Manifiesto ``nombre -> {hash, ruta, bytes, fecha}`` (vacío si aún no se publica nada). Si hay un
+    estado fijado con ``servir_estado``, devuelve el manifiesto de ese estado.
+    """
+    estado = _estado_vigente()
+    if estado is not None:
+        return estado[0]
+    return _manifiesto_disco()
+
+
+@contextmanager
+def bloqueo_manifiesto():
+    """
+    Candado exclusivo entre procesos (y entre hilos: cada uso abre su propio descriptor) para leer,
+    modificar y guardar el manifiesto sin perder las entradas que publica otro proceso.
+    """
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    with open(RUTA_CANDADO, 'a+b') as candado:
+        if fcntl is not None:
+            fcntl.flock(candado.fileno(), fcntl.LOCK_EX)
+        else:
+            candado.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(candado.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK se rinde tras 10 intentos: seguir esperando
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(candado.fileno(), fcntl.LOCK_UN)
+            else:
+                candado.seek(0)
+                msvcrt.locking(candado.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def guardar_manifiesto(manifiesto: dict):
+    """Guarda el manifiesto completo; quien lo modifica debe tener ``bloqueo_manifiesto``."""
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    temporal = f'{RUTA_MANIFIESTO}.{os.getpid()}-{threading.get_ident()}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temporal, RUTA_MANIFIESTO)
+
+
+def hash_manifiesto(nombres=None) -> str:
+    """
+    Hash del manifiesto (o de las entradas indicadas en ``nombres``). Cambia solo cuando cambia el
+    contenido de algún dataset publicado; sirve como clave de caché de los dashboards.
+    """
+    manifiesto = cargar_manifiesto()
+    if nombres is not None:
+        manifiesto = {n: manifiesto.get(n, {}).get('hash') for n in nombres}
+    else:
+        manifiesto = {n: entrada['hash'] for n, entrada in manifiesto.items()}
+    return hashlib.sha256(json.dumps(manifiesto, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def version_archivo(ruta: str) -> tuple:
+    """
+    Versión de un archivo de datos para invalidar cachés: el hash de contenido registrado en el
+    manifiesto si la ruta fue publicada por el ETL, o su fecha de modificación y tamaño si no.
+    """
+    absoluta = os.path.normcase(os.path.abspath(ruta))
+    estado = _estado_vigente()
+    if estado is not None and absoluta in estado[1]:
+        return estado[1][absoluta]
+    return _version_disco(absoluta, cargar_manifiesto())
+
+
+def _version_disco(absoluta: str, manifiesto: dict) -> tuple:
+    for entrada in manifiesto.values():
+        if os.path.normcase(os.path.join(DIRECTORIO, entrada['ruta'])) == absoluta:
+            return ('sha256', entrada['hash'])
+    info = os.stat(absoluta)
+    return info.st_mtime_ns, info.st_size
+
+
+# %% 3. Estado servido a los dashboards
+def estado_disco(rutas) -> tuple:
+    """
+    Estado actual en disco: ``(manifiesto, {ruta absoluta: versión})`` para las ``rutas`` que existen.
+    Dos estados iguales significan que ningún archivo vigilado cambió.
+    """
+    manifiesto = _manifiesto_disco()
+    versiones = {}
+    for ruta in rutas:
+        absoluta = os.path.normcase(os.path.abspath(ruta))
+        if os.path.exists(absoluta):
+            versiones[absoluta] = _version_disco(absoluta, manifiesto)
+    return manifiesto, versiones
+
+
+@contextmanager
+def con_estado(estado: tuple):
+    """Dentro del bloque, el hilo actual ve ``estado`` en vez del servido (para recalcular cachés)."""
+    previo, _local.estado = getattr(_local, 'estado', None), estado
+    try:
+        yield
+    finally:
+        _local.estado = previo
+
+
+def servir_estado(estado: tuple):
+    """Fija el estado que ven todas las páginas. El reemplazo es una sola asignación (atómica)."""
+    global _servido
+    _servido = estado
+
+
+# %% 4. Publicación de artefactos
+def ruta_objeto(hash_contenido: str) -> str:
+    return os.path.join(DIRECTORIO_OBJETOS, hash_contenido[:2], hash_contenido)
+
+
+def hash_bytes(contenido: bytes) -> str:
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def escribir_atomico(ruta: str, contenido: bytes):
+    """
+    Escribe en un temporal del mismo directorio y lo reemplaza de una vez. El temporal lleva el
+    proceso y el hilo, de modo que varios procesos pueden publicar la misma ruta a la vez.
+    """
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    temporal = f'{ruta}.{os.getpid()}-{threading.get_ident()}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def publicar_bytes(nombre: str, contenido: bytes, ruta: str) -> str:
+    """
+    Registra ``contenido`` como la versión actual del dataset ``nombre`` y lo materializa en ``ruta``
+    (relativa al repositorio) solo si lo publicado allí es distinto. Devuelve el hash del contenido.
+    """
+    hash_contenido = hash_bytes(contenido)
+    objeto = ruta_objeto(hash_contenido)
+    destino = os.path.join(DIRECTORIO, ruta)
+    # El objeto se escribe con el candado tomado: ``limpiar`` no lo ve sin referencia a medio publicar
+    with bloqueo_manifiesto():
+        if not os.path.exists(objeto):
+            escribir_atomico(objeto, contenido)
+        manifiesto = _manifiesto_disco()
+        anterior = manifiesto.get(nombre, {})
+        if os.path.exists(destino) and anterior.get('hash') == hash_contenido and anterior.get('ruta') == ruta:
+            mismo_contenido = True
+        elif os.path.exists(destino):
+            with open(destino, 'rb') as f:
+                mismo_contenido = hash_bytes(f.read()) == hash_contenido
+        else:
+            mismo_contenido = False
+        if not mismo_contenido:
+            escribir_atomico(destino, contenido)
+        if anterior.get('hash') != hash_contenido or anterior.get('ruta') != ruta:
+            manifiesto[nombre] = {'hash': hash_contenido, 'ruta': ruta, 'bytes': len(contenido),
+                                  'fecha': time.strftime('%Y-%m-%d %H:%M:%S')}
+            guardar_manifiesto(manifiesto)
+    return hash_contenido
+
+
+def publicar(nombre: str, df, ruta: str, **opciones_csv) -> str:
+    """
+    Publica un DataFrame como CSV (con las mismas opciones de ``DataFrame.to_csv``) a través de la
+    caché. Ejemplo: ``publicar('defunciones', df, 'data_defunciones/defunciones_2024.csv', sep='|')``.
+    """
+    encoding = opciones_csv.pop('encoding', 'utf-8')
+    texto = io.StringIO()
+    df.to_csv(texto, **opciones_csv)
+    return publicar_bytes(nombre, texto.getvalue().encode(encoding), ruta)
+
+
+def publicar_parquet(nombre: str, df, ruta: str) -> str:
+    """Publica un DataFrame como Parquet (conserva los tipos: categorías, enteros pequeños, booleanos)."""
+    contenido = io.BytesIO()
+    df.to_parquet(contenido, index=False)
+    return publicar_bytes(nombre, contenido.getvalue(), ruta)
+
+
+def limpiar() -> int:
+    """Elimina los objetos que ya no referencia el manifiesto. Devuelve cuántos se borraron."""
+    borrados = 0
+    with bloqueo_manifiesto():
+        vigentes = {entrada['hash'] for entrada in _manifiesto_disco().values()}
+        for carpeta, _, archivos in os.walk(DIRECTORIO_OBJETOS):
+            for archivo in archivos:
+                # Los temporales de una escritura en curso (``escribir_atomico``) no son objetos
+                if archivo not in vigentes and not archivo.endswith('.tmp'):
+                    os.remove(os.path.join(carpeta, archivo))
+                    borrados += 1
+    return borrados
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Validación de las salidas de los ETL y reporte de calidad de datos.
+
+Los ETL descartaban filas sin dejar rastro (fechas inválidas convertidas en ``NaT`` con
+``errors='coerce'``, egresos sin día de ingreso) y no revisaban rangos ni duplicados. Aquí cada
+conjunto de datos declara sus ``Reglas`` y ``validar`` las revisa sobre la tabla ya armada, con una
+operación vectorizada por regla (sin recorrer filas), por lo que agrega poco tiempo al ETL:
+
+    - ``obligatorias``: columnas que no pueden venir vacías (``NaT`` cuenta como vacío).
+    - ``numericas``: columnas que deben poder leerse como número.
+    - ``rangos``: ``columna -> (mínimo, máximo)``; ``None`` deja el extremo abierto.
+    - ``clave``: columnas que identifican una fila (duplicados); ``[]`` usa todas las columnas.
+    - ``fecha``: columna de fecha cuya serie diaria debe ser continua (días faltantes entre la
+      primera y la última fecha).
+    - ``sumas``: ``columna -> columnas`` cuya suma debe ser igual a la columna (totales).
+
+El reporte (solo con los problemas encontrados, más las filas descartadas que informe el ETL) se
+publica junto a cada salida como ``<salida>.calidad.json`` con ``publicar_reporte``; la página de
+diagnóstico los muestra (``reportes_publicados``).
+"""
+
+# %% 1. Importar librerías y reglas
+import json
+import os
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from cache_artefactos import DIRECTORIO, cargar_manifiesto, publicar_bytes
+
+MAX_EJEMPLOS = 10  # días faltantes que se listan en el reporte
+
+
+@dataclass
+class Reglas:
+    """Reglas de validación de un conjunto de datos (ver el docstring del módulo)."""
+    obligatorias: list = field(default_factory=list)
+    numericas: list = field(default_factory=list)
+    rangos: dict = field(default_factory=dict)
+    clave: list = None
+    fecha: str = None
+    sumas: dict = field(default_factory=dict)
+
+
+# %% 2. Validación
+def _conteos(serie: pd.Series) -> dict:
+    return {columna: int(n) for columna, n in serie.items() if n}
+
+
+def validar(df: pd.DataFrame, reglas: Reglas, descartes: dict = None) -> dict:
+    """
+    Reporte de calidad de ``df`` según ``reglas``: número de filas y, por regla, solo los casos con
+    problemas. ``descartes`` (motivo -> filas) son las filas que el ETL eliminó antes de publicar.
+    """
+    reporte = {'filas': len(df)}
+    if reglas.obligatorias:
+        reporte['vacias'] = _conteos(df[reglas.obligatorias].isna().sum())
+    if reglas.numericas:
+        valores = df[reglas.numericas]
+        convertidos = valores.apply(pd.to_numeric, errors='coerce')
+        reporte['no_numericas'] = _conteos((convertidos.isna() & valores.notna()).sum())
+    if reglas.rangos:
+        fuera = {}
+        for columna, (minimo, maximo) in reglas.rangos.items():
+            valores = pd.to_numeric(df[columna], errors='coerce')
+            mascara = pd.Series(False, index=df.index)
+            if minimo is not None:
+                mascara |= valores < minimo
+            if maximo is not None:
+                mascara |= valores > maximo
+            fuera[columna] = mascara.sum()
+        reporte['fuera_de_rango'] = _conteos(pd.Series(fuera, dtype='int64'))
+    if reglas.clave is not None:
+        reporte['duplicadas'] = int(df.duplicated(subset=reglas.clave or None).sum())
+    if reglas.sumas:
+        reporte['sumas_distintas'] = _conteos(pd.Series(
+            {total: (df[partes].sum(axis=1) != df[total]).sum() for total, partes in reglas.sumas.items()},
+            dtype='int64'))
+    if reglas.fecha:
+        fechas = pd.to_datetime(df[reglas.fecha], errors='coerce').dropna().dt.normalize()
+        if len(fechas):
+            calendario = pd.date_range(fechas.min(), fechas.max(), freq='D')
+            faltantes = calendario.difference(pd.DatetimeIndex(fechas.unique()))
+            reporte['fechas'] = {'desde': str(calendario[0].date()), 'hasta': str(calendario[-1].date()),
+                                 'dias_faltantes': len(faltantes)}
+            if len(faltantes):
+                reporte['fechas']['primeros_faltantes'] = [str(d.date()) for d in faltantes[:MAX_EJEMPLOS]]
+    if descartes:
+        reporte['descartadas'] = {motivo: int(n) for motivo, n in descartes.items() if n}
+    # Solo lo que tiene problemas: las reglas sin casos no aparecen
+    return {clave: valor for clave, valor in reporte.items() if valor or clave in ('filas', 'fechas')}
+
+
+def resumen(reporte: dict) -> str:
+    """Una línea con los problemas del reporte (para la salida de los ETL)."""
+    partes = [f"{reporte['filas']} filas"]
+    for regla, valor in reporte.items():
+        if regla in ('filas', 'fechas'):
+            continue
+        if isinstance(valor, dict):
+            valor = ', '.join(f'{k}={v}' for k, v in valor.items())
+        partes.append(f'{regla}: {valor}')
+    if reporte.get('fechas', {}).get('dias_faltantes'):
+        partes.append(f"días faltantes: {reporte['fechas']['dias_faltantes']}")
+    return '; '.join(partes)
+
+
+# %% 3. Publicación junto a la salida
+def ruta_reporte(ruta: str) -> str:
+    """``data_x/salida.csv`` -> ``data_x/salida.calidad.json``."""
+    return os.path.splitext(ruta)[0] + '.calidad.json'
+
+
+def publicar_reporte(nombre: str, reporte: dict, ruta: str) -> str:
+    """Publica el reporte de la salida ``ruta`` (dataset ``nombre``) en ``ruta_reporte(ruta)``."""
+    print(f"Calidad de {nombre}: {resumen(reporte)}")
+    contenido = json.dumps(reporte, ensure_ascii=False, indent=1).encode('utf-8')
+    return publicar_bytes(f'{nombre}_calidad', contenido, ruta_reporte(ruta))
+
+
+def reportes_publicados() -> dict:
+    """Reportes de calidad publicados (dataset -> reporte), según el manifiesto."""
+    reportes = {}
+    for nombre, entrada in sorted(cargar_manifiesto().items()):
+        ruta = os.path.join(DIRECTORIO, entrada['ruta'])
+        if nombre.endswith('_calidad') and os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                reportes[nombre[:-len('_calidad')]] = json.load(f)
+    return reportes
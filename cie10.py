@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de códigos CIE-10 para filtrar defunciones por grupo de causa sin recorrer textos.
+
+Cada código de ``DIAG1`` (``I219``, ``T67X``, ``C23X``) se convierte una sola vez en un entero que
+respeta el orden de la clasificación:
+
+    letra * 1100 + dos dígitos * 11 + cuarto carácter
+
+donde el cuarto carácter vale 0 si no hay subdivisión (``X`` o ausente) y 1..10 para ``.0``..``.9``.
+Así una categoría (``T67``), un bloque (``I20-I25``) o un capítulo (``J00-J99``) es un intervalo de
+enteros, y saber si una defunción pertenece a un grupo de causas es comparar su código con los
+límites del intervalo, sin ``str.startswith`` sobre cada fila. Los códigos que no tienen forma CIE-10
+quedan como ``SIN_CODIGO``.
+"""
+
+# %% 1. Importar librerías y tablas de la clasificación
+import numpy as np
+import pandas as pd
+
+SIN_CODIGO = -1
+_POR_LETRA = 1100
+_POR_CATEGORIA = 11
+
+# (número, desde, hasta, título) según la CIE-10 de la OMS
+capitulos = [
+    ('I', 'A00', 'B99', 'Ciertas enfermedades infecciosas y parasitarias'),
+    ('II', 'C00', 'D48', 'Tumores (neoplasias)'),
+    ('III', 'D50', 'D89', 'Enfermedades de la sangre y del sistema inmunitario'),
+    ('IV', 'E00', 'E90', 'Enfermedades endocrinas, nutricionales y metabólicas'),
+    ('V', 'F00', 'F99', 'Trastornos mentales y del comportamiento'),
+    ('VI', 'G00', 'G99', 'Enfermedades del sistema nervioso'),
+    ('VII', 'H00', 'H59', 'Enfermedades del ojo y sus anexos'),
+    ('VIII', 'H60', 'H95', 'Enfermedades del oído y de la apófisis mastoides'),
+    ('IX', 'I00', 'I99', 'Enfermedades del sistema circulatorio'),
+    ('X', 'J00', 'J99', 'Enfermedades del sistema respiratorio'),
+    ('XI', 'K00', 'K93', 'Enfermedades del sistema digestivo'),
+    ('XII', 'L00', 'L99', 'Enfermedades de la piel y del tejido subcutáneo'),
+    ('XIII', 'M00', 'M99', 'Enfermedades del sistema osteomuscular y del tejido conjuntivo'),
+    ('XIV', 'N00', 'N99', 'Enfermedades del sistema genitourinario'),
+    ('XV', 'O00', 'O99', 'Embarazo, parto y puerperio'),
+    ('XVI', 'P00', 'P96', 'Ciertas afecciones originadas en el período perinatal'),
+    ('XVII', 'Q00', 'Q99', 'Malformaciones congénitas, deformidades y anomalías cromosómicas'),
+    ('XVIII', 'R00', 'R99', 'Síntomas, signos y hallazgos anormales no clasificados en otra parte'),
+    ('XIX', 'S00', 'T98', 'Traumatismos, envenenamientos y otras consecuencias de causas externas'),
+    ('XX', 'V01', 'Y98', 'Causas externas de morbilidad y de mortalidad'),
+    ('XXI', 'Z00', 'Z99', 'Factores que influyen en el estado de salud'),
+    ('XXII', 'U00', 'U99', 'Códigos para propósitos especiales'),
+]
+
+
+# %% 2. Codificación
+def codificar_texto(codigo) -> int:
+    """Entero de un código CIE-10 (``'I219'``, ``'T67X'``, ``'E86'``); ``SIN_CODIGO`` si no es válido."""
+    if not isinstance(codigo, str):
+        return SIN_CODIGO
+    codigo = codigo.strip().upper().replace('.', '')
+    if len(codigo) < 3 or not ('A' <= codigo[0] <= 'Z') or not codigo[1:3].isdigit():
+        return SIN_CODIGO
+    cuarto = codigo[3:4]
+    if cuarto.isdigit():
+        subdivision = int(cuarto) + 1
+    elif cuarto in ('', 'X'):
+        subdivision = 0
+    else:
+        return SIN_CODIGO
+    return (ord(codigo[0]) - ord('A')) * _POR_LETRA + int(codigo[1:3]) * _POR_CATEGORIA + subdivision
+
+
+def codificar(codigos: pd.Series) -> np.ndarray:
+    """
+    Enteros (int16) de una columna de códigos. Solo se interpreta cada código distinto una vez
+    (unos pocos miles), el resto es indexar con los códigos de la categórica.
+    """
+    categorica = codigos.astype('category')
+    tabla = np.array([codificar_texto(c) for c in categorica.cat.categories] + [SIN_CODIGO], dtype=np.int16)
+    # Los nulos tienen código -1 en la categórica: caen en el último elemento (SIN_CODIGO)
+    return tabla[categorica.cat.codes.to_numpy()]
+
+
+def texto_categoria(entero: int) -> str:
+    """Categoría de tres caracteres (``'T67'``, ``'I21'``) de un entero; vacío para ``SIN_CODIGO``."""
+    if entero < 0:
+        return ''
+    return f"{chr(ord('A') + entero // _POR_LETRA)}{entero % _POR_LETRA // _POR_CATEGORIA:02d}"
+
+
+def categoria(enteros) -> np.ndarray:
+    """``texto_categoria`` de cada entero (se interpreta cada valor distinto una sola vez)."""
+    unicos, inversa = np.unique(np.asarray(enteros), return_inverse=True)
+    return np.array([texto_categoria(e) for e in unicos], dtype=object)[inversa]
+
+
+def intervalo(desde: str, hasta: str) -> tuple:
+    """Enteros ``(mínimo, máximo)`` que cubren todas las subdivisiones de las categorías ``desde``..``hasta``."""
+    inicio = codificar_texto(desde[:3])
+    fin = codificar_texto(hasta[:3])
+    if inicio == SIN_CODIGO or fin == SIN_CODIGO:
+        raise ValueError(f"Intervalo CIE-10 inválido: {desde}-{hasta}")
+    return inicio, fin + _POR_CATEGORIA - 1
+
+
+# %% 3. Búsquedas por capítulo y grupo
+_limites_capitulos = np.array([intervalo(desde, hasta) for _, desde, hasta, _ in capitulos])
+
+
+def capitulo(enteros) -> np.ndarray:
+    """Número romano del capítulo de cada entero (vacío si no cae en ninguno)."""
+    enteros = np.asarray(enteros)
+    resultado = np.full(enteros.shape, '', dtype=object)
+    for (numero, *_), (inicio, fin) in zip(capitulos, _limites_capitulos):
+        resultado[(enteros >= inicio) & (enteros <= fin)] = numero
+    return resultado
+
+
+def mascara(enteros, intervalos) -> np.ndarray:
+    """
+    ``True`` para los enteros dentro de alguno de los ``intervalos`` ``(desde, hasta)`` de categorías
+    (por ejemplo, los de un grupo de ``grupos_causa.registro``).
+    """
+    enteros = np.asarray(enteros)
+    resultado = np.zeros(enteros.shape, dtype=bool)
+    for desde, hasta in intervalos:
+        inicio, fin = intervalo(desde, hasta)
+        resultado |= (enteros >= inicio) & (enteros <= fin)
+    return resultado
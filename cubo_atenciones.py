@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Cubo diario de atenciones de urgencia y hospitalizaciones
+(fecha × tipo de establecimiento × IdCausa × grupo de edad).
+
+``df_rm_circ_2024.csv`` trae una fila por tipo de establecimiento, fecha y causa. Aquí se agrupa
+una sola vez por versión del archivo en un arreglo denso ``días × tipos × causas × edades``; filtrar
+por tipo de establecimiento es sumar un corte de ese arreglo. Sobre el cubo resultante, las razones
+hospitalizaciones / atenciones se calculan para todas las combinaciones de causas y todos los días
+con una sola operación vectorizada. Los dashboards solo recortan el rango
+de fechas, por lo que cada interacción cuesta lo mismo sin importar el largo de la serie.
+"""
+
+# %% 1. Importar librerías y parámetros
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache_artefactos import version_archivo
+from datos_base import urgencias
+
+RUTA_URGENCIAS = "data_atenciones_urgencia/df_rm_circ_2024.csv"
+
+grupos_edad = ['Total', 'Menores_1', 'De_1_a_4', 'De_5_a_14', 'De_15_a_64', 'De_65_y_mas']
+
+# IdCausa -> nombre corto (se usa el IdCausa y no el texto de ``Causa``, que no es uniforme entre años)
+causas_atencion = {
+    1: 'Atenciones de urgencia - Total',
+    12: 'Total Sistema Circulatorio',
+    13: 'Infarto agudo miocardio',
+    14: 'Accidente vascular encefálico',
+    15: 'Crisis hipertensiva',
+    16: 'Arritmia grave',
+    17: 'Otras causas circulatorias',
+}
+causas_hospitalizacion = {
+    25: 'Hospitalizaciones - Total',
+    22: 'Hospitalizaciones - Sistema Circulatorio',
+}
+causas_cubo = {**causas_atencion, **causas_hospitalizacion}
+
+
+# %% 2. Cubo diario
+@lru_cache(maxsize=2)
+def _cubo_diario(ruta: str, version: tuple) -> tuple:
+    df = urgencias(ruta)[['GLOSATIPOESTABLECIMIENTO', 'fecha', 'IdCausa', 'Causa'] + grupos_edad]
+    df = df[df['IdCausa'].isin(causas_cubo.keys())]
+    fechas = pd.to_datetime(df['fecha'])
+    calendario = pd.date_range(fechas.min(), fechas.max(), freq='D', name='fecha')
+    tipos = sorted(df['GLOSATIPOESTABLECIMIENTO'].unique())
+    ids = list(causas_cubo)
+    posicion_dia = calendario.get_indexer(fechas)
+    posicion_tipo = pd.Index(tipos).get_indexer(df['GLOSATIPOESTABLECIMIENTO'])
+    posicion_causa = pd.Index(ids).get_indexer(df['IdCausa'])
+    cubo = np.zeros((len(calendario), len(tipos), len(ids), len(grupos_edad)))
+    # Suma directa sobre el arreglo denso (acumula filas repetidas de un mismo día y tipo)
+    np.add.at(cubo, (posicion_dia, posicion_tipo, posicion_causa), df[grupos_edad].to_numpy(dtype=float))
+    # Texto de ``Causa`` tal como viene en el archivo (para el formato largo de los dashboards)
+    textos = df.drop_duplicates('IdCausa').set_index('IdCausa')['Causa'].to_dict()
+    return cubo, calendario, tipos, ids, textos
+
+
+def versiones_entradas(ruta: str = RUTA_URGENCIAS) -> tuple:
+    """Versión del archivo de atenciones que lee el cubo (clave de las cachés de los dashboards)."""
+    return (version_archivo(ruta),)
+
+
+def tipos_establecimiento(ruta: str = RUTA_URGENCIAS) -> list:
+    """Tipos de establecimiento presentes en el archivo (Hospital, SAPU, SAR, SUR, ...)."""
+    return _cubo_diario(ruta, version_archivo(ruta))[2]
+
+
+def cubo_diario(ruta: str = RUTA_URGENCIAS, tipos: list = None) -> tuple:
+    """
+    ``(cubo, calendario, ids)``: arreglo ``días × causas × edades`` con los conteos de los tipos de
+    establecimiento indicados en ``tipos`` (por defecto, todos), el calendario continuo de sus filas
+    y los IdCausa de su segundo eje (en el orden de ``causas_cubo``; las edades siguen ``grupos_edad``).
+    Filtrar por tipo solo suma un corte del cubo en caché: no vuelve a leer ni agrupar el archivo.
+    """
+    cubo, calendario, todos, ids, _ = _cubo_diario(ruta, version_archivo(ruta))
+    if tipos is not None:
+        cubo = cubo[:, [todos.index(t) for t in tipos]]
+    return cubo.sum(axis=1), calendario, ids
+
+
+def serie(cubo: np.ndarray, calendario: pd.DatetimeIndex, ids: list, id_causa: int) -> pd.DataFrame:
+    """Conteos diarios de una causa, con una columna por grupo de edad."""
+    return pd.DataFrame(cubo[:, ids.index(id_causa), :], index=calendario, columns=grupos_edad)
+
+
+def formato_largo(cubo: np.ndarray, calendario: pd.DatetimeIndex, ids: list, ruta: str = RUTA_URGENCIAS,
+                  etiqueta_tipo: str = 'Seleccionados') -> pd.DataFrame:
+    """
+    El cubo en el mismo formato largo que ``df_rm_circ_2024.csv`` (una fila por fecha y causa), para
+    usarlo directamente en los gráficos existentes. ``etiqueta_tipo`` va en ``GLOSATIPOESTABLECIMIENTO``.
+    """
+    textos = _cubo_diario(ruta, version_archivo(ruta))[4]
+    n_dias, n_causas = cubo.shape[:2]
+    largo = pd.DataFrame(cubo.reshape(n_dias * n_causas, -1), columns=grupos_edad)
+    largo.insert(0, 'GLOSATIPOESTABLECIMIENTO', etiqueta_tipo)
+    largo.insert(1, 'fecha', np.repeat(calendario.to_numpy(), n_causas))
+    largo.insert(2, 'IdCausa', np.tile(ids, n_dias))
+    largo.insert(3, 'Causa', largo['IdCausa'].map(textos))
+    return largo
+
+
+# %% 3. Razones hospitalizaciones / atenciones
+def razones_hospitalizacion(cubo: np.ndarray, calendario: pd.DatetimeIndex, ids: list) -> pd.DataFrame:
+    """
+    Razón (en %) entre cada causa de hospitalización y cada causa de atención de urgencia, por día
+    y grupo de edad. Columnas MultiIndex ``(hospitalizacion, atencion, edad)`` con los nombres de
+    ``causas_cubo``; los días sin atenciones quedan en NaN.
+    """
+    h = [ids.index(i) for i in causas_hospitalizacion]
+    a = [ids.index(i) for i in causas_atencion]
+    numerador = cubo[:, h, None, :]       # días × hosp × 1 × edades
+    denominador = cubo[:, None, a, :]     # días × 1 × atenc × edades
+    with np.errstate(invalid='ignore', divide='ignore'):
+        razones = np.where(denominador > 0, 100 * numerador / denominador, np.nan)
+    columnas = pd.MultiIndex.from_product(
+        [list(causas_hospitalizacion.values()), list(causas_atencion.values()), grupos_edad],
+        names=['hospitalizacion', 'atencion', 'edad'])
+    razones = pd.DataFrame(razones.reshape(len(calendario), -1), index=calendario, columns=columnas)
+    return razones.sort_index(axis=1)  # columnas ordenadas para que la selección por causa sea directa
@@ -5,6 +5,8 @@ Se muestran tres secciones:
     1. Gráfico y tabla SENAPRED: Visualiza las temperaturas máximas diarias con rangos de alerta.
     2. Gráfico y tabla SEREMI: Presenta las temperaturas máximas diarias con la clasificación de alertas, junto con una explicación de las reglas.
     3. Gráfico y tabla Sobre 35°C: Destaca los días en que la temperatura fue igual o superior a 35°C.
+    4. Episodios de calor: Rachas de días calurosos con grados-día, noches tropicales y Excess Heat Factor.
+    5. Exceso de defunciones y atenciones de urgencia en cada episodio de Alerta Amarilla/Roja.
 Debajo de cada gráfico se agrega un botón para descargar los datos utilizados en el mismo.
 Al final se agrega una sección para descargar la base completa (el CSV original).
 """
@@ -16,8 +18,13 @@ import plotly.express as px
 import datetime
 import numpy as np  # Para la función de tabla SENAPRED
 import io
+from metricas_exposicion import metricas_estacion, filtrar_episodios, agregar_episodios
+from exceso_alertas import exceso_por_episodio, versiones_entradas as versiones_exceso, DIAS_POSTERIORES
+from datos_base import temperaturas
+from diagnostico import etapa, medido, cache_data
 
 # Función auxiliar: Convertir DataFrame a archivo Excel en memoria
+@medido("alertas")
 def to_excel(df: pd.DataFrame) -> bytes:
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
@@ -38,16 +45,20 @@ rango_fechas = st.sidebar.date_input(
 )
 
 # Cargar y filtrar los datos
-df = pd.read_csv("data_temperatura/tmm_historico_2024.csv")
-df["date"] = pd.to_datetime(df["date"])
+with etapa("alertas", "cargar_temperaturas") as medicion:
+    df = temperaturas()
+    medicion["filas"] = len(df)
 
 if len(rango_fechas) == 2:
     fecha_inicio_seleccionada, fecha_fin_seleccionada = rango_fechas
-    df = df[(df["date"] >= pd.Timestamp(fecha_inicio_seleccionada)) &
-            (df["date"] <= pd.Timestamp(fecha_fin_seleccionada))]
+    with etapa("alertas", "filtrar_fechas") as medicion:
+        df = df[(df["date"] >= pd.Timestamp(fecha_inicio_seleccionada)) &
+                (df["date"] <= pd.Timestamp(fecha_fin_seleccionada))]
+        medicion["filas"] = len(df)
 
 # %% 3. Definir funciones para cálculos, gráficos y tablas
 
+@medido("alertas")
 def evaluar_alertas(df: pd.DataFrame) -> pd.DataFrame:
     """
     Evalúa y asigna alertas a los datos según la temperatura máxima y el mes.
@@ -71,6 +82,7 @@ def evaluar_alertas(df: pd.DataFrame) -> pd.DataFrame:
     df.loc[df["alerta_consecutiva_3"] >= 3, "alerta"] = "Alerta Roja"
     return df
 
+@medido("alertas")
 def grafico_alertas_senapred(df: pd.DataFrame):
     """
     Gráfico:
@@ -114,6 +126,7 @@ def grafico_alertas_senapred(df: pd.DataFrame):
     )
     return fig
 
+@medido("alertas")
 def tabla_alertas_senapred(df: pd.DataFrame) -> pd.DataFrame:
     """
     Tabla SENAPRED:
@@ -135,6 +148,7 @@ def tabla_alertas_senapred(df: pd.DataFrame) -> pd.DataFrame:
     tabla.columns = ["Fecha", "Tipo de Alerta", "Temperatura Máxima"]
     return tabla
 
+@medido("alertas")
 def grafico_alertas_seremi(df: pd.DataFrame):
     """
     Gráfico SEREMI:
@@ -171,6 +185,7 @@ def grafico_alertas_seremi(df: pd.DataFrame):
     )
     return fig
 
+@medido("alertas")
 def tabla_alertas_seremi(df: pd.DataFrame) -> pd.DataFrame:
     """
     Tabla SEREMI:
@@ -183,6 +198,7 @@ def tabla_alertas_seremi(df: pd.DataFrame) -> pd.DataFrame:
     tabla.columns = ["Fecha", "Tipo de Alerta", "Temperatura Máxima"]
     return tabla
 
+@medido("alertas")
 def grafico_alertas_sobre35(df: pd.DataFrame):
     """
     Gráfico Sobre 35°C:
@@ -211,6 +227,7 @@ def grafico_alertas_sobre35(df: pd.DataFrame):
     )
     return fig
 
+@medido("alertas")
 def tabla_alertas_sobre35(df: pd.DataFrame) -> pd.DataFrame:
     """
     Tabla Sobre 35°C:
@@ -299,7 +316,8 @@ st.markdown(
 # Los datos usados en SEREMI se obtienen aplicando evaluar_alertas()
 df_seremi = evaluar_alertas(df)
 fig_seremi = grafico_alertas_seremi(df)
-st.plotly_chart(fig_seremi, use_container_width=True)
+with etapa("alertas", "mostrar_fig_seremi"):
+    st.plotly_chart(fig_seremi, use_container_width=True)
 
 # Botón para descargar los datos utilizados en el gráfico SEREMI
 excel_seremi_data = to_excel(df_seremi)
@@ -360,6 +378,89 @@ with st.expander("Ver tabla"):
 #         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 #     )
 
+# --- Sección 4: Episodios de calor ---
+st.header("Episodios de calor")
+st.markdown(
+    """
+    Los días con temperatura máxima **igual o superior a 34°C** se agrupan en **episodios** (rachas de al menos
+    dos días consecutivos). Para cada episodio se muestra su inicio, fin, duración, temperatura máxima alcanzada,
+    los **grados-día sobre 34°C** acumulados y el **Excess Heat Factor (EHF)** máximo.
+    El gráfico muestra los grados-día acumulados en la temporada sobre 30°C y 34°C, con los episodios sombreados.
+    """
+)
+with etapa("alertas", "metricas_estacion") as medicion:
+    df_exposicion, df_episodios = metricas_estacion()
+    if len(rango_fechas) == 2:
+        df_exposicion = df_exposicion[(df_exposicion["date"] >= pd.Timestamp(fecha_inicio_seleccionada)) &
+                                      (df_exposicion["date"] <= pd.Timestamp(fecha_fin_seleccionada))]
+        df_episodios = filtrar_episodios(df_episodios, fecha_inicio_seleccionada, fecha_fin_seleccionada)
+    medicion["filas"] = len(df_exposicion)
+
+with etapa("alertas", "grafico_episodios") as medicion:
+    fig_exposicion = px.line(df_exposicion, x="date", y=["gd30_acumulado", "gd34_acumulado"],
+                             title="Grados-día acumulados en la temporada y episodios de calor")
+    fig_exposicion.update_layout(
+        xaxis_title="Fecha",
+        yaxis_title="Grados-día (°C·día)",
+        legend=dict(title="", orientation="h", yanchor="top", y=-0.2, xanchor="center", x=0.5)
+    )
+    agregar_episodios(fig_exposicion, df_episodios)
+    medicion["filas"] = len(df_exposicion)
+with etapa("alertas", "mostrar_fig_exposicion"):
+    st.plotly_chart(fig_exposicion, use_container_width=True)
+
+col_ep1, col_ep2, col_ep3 = st.columns(3)
+col_ep1.metric("Episodios de calor", len(df_episodios))
+col_ep2.metric("Días en episodio", int(df_episodios["duracion"].sum()) if len(df_episodios) else 0)
+col_ep3.metric("Noches tropicales (t_min ≥ 20°C)", int(df_exposicion["noche_tropical"].sum()))
+
+with st.expander("Ver tabla de episodios"):
+    tabla_episodios = df_episodios.rename(columns={
+        "inicio": "Inicio", "fin": "Fin", "duracion": "Duración (días)",
+        "t_max_peak": "Temperatura Máxima", "grados_dia_34": "Grados-día sobre 34°C",
+        "ehf_max": "EHF máximo"
+    })
+    st.table(tabla_episodios)
+    st.download_button(
+        label="Descargar tabla de episodios (Excel)",
+        data=to_excel(tabla_episodios),
+        file_name="tabla_episodios_calor.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+# --- Sección 5: Exceso durante episodios de alerta ---
+st.header("Exceso de defunciones y atenciones durante alertas")
+st.markdown(
+    f"""
+    Para cada episodio de **Alerta Amarilla o Roja** se comparan los eventos observados (durante el episodio y
+    los {DIAS_POSTERIORES} días siguientes, sin pasar al episodio siguiente) con los esperados según una línea base estacional: el valor central del
+    corredor endémico cuando existe (80 y más, menores de 1 año) o un modelo estacional ajustado con los días sin alerta.
+    El intervalo de confianza al 95% se obtiene por bootstrap.
+    """
+)
+
+@cache_data("alertas", show_spinner="Calculando exceso por episodio...")
+def cargar_exceso(version: tuple) -> pd.DataFrame:
+    # ``version`` solo sirve de clave: cambia cuando cambia cualquiera de los archivos que lee el cálculo
+    return exceso_por_episodio()
+
+df_exceso = cargar_exceso(versiones_exceso())
+if len(rango_fechas) == 2:
+    df_exceso = df_exceso[(df_exceso["fin"] >= pd.Timestamp(fecha_inicio_seleccionada)) &
+                          (df_exceso["inicio"] <= pd.Timestamp(fecha_fin_seleccionada))]
+tabla_exceso = df_exceso.rename(columns={
+    "fuente": "Fuente", "causa": "Causa", "edad": "Grupo de edad", "inicio": "Inicio", "fin": "Fin",
+    "dias_alerta": "Días en alerta", "nivel": "Nivel", "observados": "Observados", "esperados": "Esperados",
+    "exceso": "Exceso", "ic_inf": "IC 95% inferior", "ic_sup": "IC 95% superior", "exceso_pct": "Exceso (%)"
+})
+st.dataframe(tabla_exceso.round(1), use_container_width=True, hide_index=True)
+st.download_button(
+    label="Descargar tabla de exceso (Excel)",
+    data=to_excel(tabla_exceso),
+    file_name="tabla_exceso_alertas.xlsx",
+    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+
 # --- Sección Final: Descargar Base Completa ---
 st.header("Descargar Base Completa")
 with open("data_temperatura/tmm_historico_2024.csv", "rb") as f:
@@ -6,19 +6,25 @@ Esta aplicación permite visualizar diversos gráficos que relacionan las atenci
 (con diferentes causas) con la evolución de la temperatura máxima. Cada sección incluye una breve 
 explicación, el gráfico interactivo, y una tabla que muestra la información de los últimos 10 días 
 utilizados en el gráfico, con la opción de descargar los datos en Excel. Al final se ofrece la opción 
-de descargar las bases completas en formato CSV.
+de descargar las bases completas en formato CSV. Los últimos días del total del sistema circulatorio,
+todavía incompletos por el retraso de registro, se corrigen con la estimación de ``nowcasting.py``.
 """
 
 # %% 1. Importar librerías y definir funciones auxiliares
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-import pydeck as pdk
 from io import BytesIO
 import datetime
-import numpy as np
+from series_derivadas import (media_movil_2d, ewma_2d, z_calendario_2d, urgencias_formato_largo,
+                              versiones_entradas as versiones_derivadas)
+from cubo_atenciones import cubo_diario, formato_largo, tipos_establecimiento, versiones_entradas
+from detector_ears import leer_alertas, CAUSA_VIGILADA
+from nowcasting import RUTA_URGENCIAS as RUTA_INSTANTANEAS, agregar_estimacion, corregir, factores, tabla
+from datos_base import temperaturas
+from diagnostico import etapa, medido, cache_data
 # Función para convertir un DataFrame a Excel (en bytes)
+@medido("atenciones")
 def to_excel_bytes(df: pd.DataFrame) -> bytes:
     output = BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
@@ -26,6 +32,7 @@ def to_excel_bytes(df: pd.DataFrame) -> bytes:
     return output.getvalue()
 
 # Función para convertir un DataFrame a CSV (en bytes) para las bases completas
+@medido("atenciones")
 def df_to_csv_bytes(df: pd.DataFrame) -> bytes:
     return df.to_csv(index=False, sep=';', decimal=',', encoding='utf-8').encode('utf-8')
 
@@ -76,17 +83,76 @@ rango_fechas = st.sidebar.date_input(
     max_value=fecha_fin
 )
 
-# Cargar la base de datos de atenciones de urgencia
-df_au = pd.read_csv("data_atenciones_urgencia/df_rm_circ_2024.csv")
-df_au['fecha'] = pd.to_datetime(df_au['fecha'])
+opciones_suavizado = {
+    "Sin suavizar": None,
+    "Media móvil 7 días": "media_7d",
+    "Media móvil exponencial (EWMA)": "ewma",
+    "Puntaje z (misma semana de años anteriores)": "z",
+}
+suavizado = st.sidebar.radio(
+    "Suavizado de las series:",
+    list(opciones_suavizado),
+    help="El puntaje z compara cada día con los días ± 3 de la misma fecha en los años anteriores."
+)
+
+# Los tipos de establecimiento son un eje del cubo diario en caché: filtrar solo suma un corte
+@cache_data("atenciones")
+def cargar_tipos(versiones: tuple) -> list:
+    return tipos_establecimiento()
+
+# Versión de cada archivo que leen las cargas: el cubo de atenciones y la capa de series derivadas
+versiones_datos = versiones_entradas() + versiones_derivadas()
+tipos_disponibles = cargar_tipos(versiones_datos)
+tipos_sel = st.sidebar.multiselect(
+    "Tipo de establecimiento:",
+    tipos_disponibles,
+    default=tipos_disponibles,
+    help="Por ejemplo, SAPU y SAR para la atención primaria de urgencia, u Hospital para la red hospitalaria."
+)
+if not tipos_sel:
+    st.sidebar.warning("Seleccione al menos un tipo de establecimiento; se muestran todos.")
+    tipos_sel = tipos_disponibles
+
+# Las cargas quedan en caché con la versión de cada archivo de origen como clave: solo se vuelven a
+# calcular cuando cambia alguno de ellos
+@cache_data("atenciones")
+def cargar_atenciones(tipos: tuple, tipo_suavizado, versiones: tuple) -> pd.DataFrame:
+    if set(tipos) == set(tipos_establecimiento()):
+        # Todos los tipos: la capa precalculada de series_derivadas.py (en caché por versión de archivo)
+        return urgencias_formato_largo(tipo_suavizado or 'original')
+    cubo, calendario, ids = cubo_diario(tipos=list(tipos))
+    if tipo_suavizado is not None:
+        # Todas las series (causa × edad) se transforman juntas sobre la matriz series × días
+        matriz = cubo.reshape(len(calendario), -1).T.astype(float)
+        if tipo_suavizado == 'z':
+            matriz = z_calendario_2d(matriz, calendario)
+        else:
+            matriz = media_movil_2d(matriz) if tipo_suavizado == 'media_7d' else ewma_2d(matriz)
+        cubo = matriz.T.reshape(cubo.shape)
+    largo = formato_largo(cubo, calendario, ids, etiqueta_tipo=', '.join(tipos))
+    # Los días sin años anteriores no tienen puntaje z
+    return largo.dropna(subset=['Total']) if tipo_suavizado == 'z' else largo
+
+# Cargar las series diarias de atenciones de urgencia (suavizadas si corresponde). Un porcentaje entre
+# puntajes z no tiene sentido: con el puntaje z, los gráficos de porcentaje usan los conteos originales
+df_au = cargar_atenciones(tuple(tipos_sel), opciones_suavizado[suavizado], versiones_datos)
+if opciones_suavizado[suavizado] == 'z':
+    df_au_porcentajes = cargar_atenciones(tuple(tipos_sel), None, versiones_datos)
+else:
+    df_au_porcentajes = df_au
 if len(rango_fechas) == 2:
     fecha_inicio_sel, fecha_fin_sel = rango_fechas
-    df_au = df_au[(df_au['fecha'] >= pd.Timestamp(fecha_inicio_sel)) &
-                  (df_au['fecha'] <= pd.Timestamp(fecha_fin_sel))]
+    with etapa("atenciones", "filtrar_fechas") as medicion:
+        df_au = df_au[(df_au['fecha'] >= pd.Timestamp(fecha_inicio_sel)) &
+                      (df_au['fecha'] <= pd.Timestamp(fecha_fin_sel))]
+        df_au_porcentajes = df_au_porcentajes[(df_au_porcentajes['fecha'] >= pd.Timestamp(fecha_inicio_sel)) &
+                                              (df_au_porcentajes['fecha'] <= pd.Timestamp(fecha_fin_sel))]
+        medicion["filas"] = len(df_au)
 
 # Cargar la base de datos de temperaturas
-df_tmm = pd.read_csv("data_temperatura/tmm_historico_2024.csv")
-df_tmm['date'] = pd.to_datetime(df_tmm['date'])
+with etapa("atenciones", "cargar_temperaturas") as medicion:
+    df_tmm = temperaturas()
+    medicion["filas"] = len(df_tmm)
 if len(rango_fechas) == 2:
     fecha_inicio_sel, fecha_fin_sel = rango_fechas
     df_tmm = df_tmm[(df_tmm['date'] >= pd.Timestamp(fecha_inicio_sel)) &
@@ -107,7 +173,8 @@ diccionario_causas_au = {
 
 # %% 3. Definición de funciones para crear gráficos y bases de datos combinadas
 
-def grafico_area_atenciones_respiratorias(df_au, df_temp, col, title):
+@medido("atenciones")
+def grafico_area_atenciones_respiratorias(df_au, df_temp, col, title, estimacion=None):
     """
     Gráfico de evolución de atenciones de urgencia en el Sistema Circulatorio
     junto con la evolución de la temperatura máxima.
@@ -120,7 +187,8 @@ def grafico_area_atenciones_respiratorias(df_au, df_temp, col, title):
       - Arritmia grave
       - Otras causas circulatorias
 
-    Además, se agrega la serie de la temperatura máxima y se muestran sus alertas.
+    Además, se agrega la serie de la temperatura máxima y se muestran sus alertas. Si se entrega
+    ``estimacion`` (``nowcasting.corregir`` del total), sus últimos días se dibujan como tramo punteado.
     """
     # Filtrar y agrupar datos de atenciones por causa
     df_tota_sc = df_au[df_au['Causa'] == diccionario_causas_au[12]].groupby('fecha')[col].sum().reset_index()
@@ -148,6 +216,8 @@ def grafico_area_atenciones_respiratorias(df_au, df_temp, col, title):
     fig.add_trace(go.Scatter(x=df_tota_sc['fecha'], y=df_tota_sc[col],
                              mode='lines', name='Total Sistema Circulatorio',
                              line=dict(color=colors_atenciones['Total Sistema Circulatorio'])))
+    if estimacion is not None:
+        agregar_estimacion(fig, estimacion, colors_atenciones['Total Sistema Circulatorio'])
     fig.add_trace(go.Scatter(x=df_infarto['fecha'], y=df_infarto[col],
                              mode='lines', name='Infarto agudo miocardio',
                              line=dict(color=colors_atenciones['Infarto agudo miocardio'])))
@@ -198,6 +268,7 @@ def grafico_area_atenciones_respiratorias(df_au, df_temp, col, title):
     return fig, df_base
 
 
+@medido("atenciones")
 def grafico_porcentaje_atenciones(df, df_temp, col, title):
     """
     Gráfico de porcentaje diario de atenciones de urgencia por causa en el Sistema Circulatorio.
@@ -281,6 +352,7 @@ def grafico_porcentaje_atenciones(df, df_temp, col, title):
     return fig, df_base
 
 
+@medido("atenciones")
 def grafico_total_grupo_etario(df, df_temp, title):
     """
     Gráfico de consultas de urgencia por grupos etarios en el Sistema Circulatorio.
@@ -356,6 +428,7 @@ def grafico_total_grupo_etario(df, df_temp, title):
     return fig, df_base
 
 
+@medido("atenciones")
 def grafico_grupos_interes_epidemiologico(df, df_temp, title):
     """
     Gráfico de consultas de urgencia en grupos de interés epidemiológico.
@@ -413,6 +486,7 @@ def grafico_grupos_interes_epidemiologico(df, df_temp, title):
     return fig, df_base
 
 
+@medido("atenciones")
 def grafico_porcentaje_total(df, df_temp, col, title):
     """
     Gráfico del porcentaje de atenciones de urgencia de causas del sistema circulatorio
@@ -494,6 +568,10 @@ def grafico_porcentaje_total(df, df_temp, col, title):
 
 st.title("Análisis de atenciones de urgencia por causas del sistema circulatorio y calor extremo")
 st.write("Esta página permite analizar la evolución de las atenciones de urgencia y su relación con la temperatura máxima. Cada sección incluye una explicación, el gráfico interactivo, y una tabla con los datos de los últimos 10 días, con opción de descargar los datos en Excel.")
+st.caption(f"Tipos de establecimiento incluidos: {', '.join(tipos_sel)}.")
+if opciones_suavizado[suavizado] == 'z':
+    st.caption("Los gráficos de atenciones muestran el puntaje z de cada día frente a la misma semana de los años "
+               "anteriores (sobre 2: más de lo habitual); los de porcentaje usan los conteos originales.")
 
 ### Gráfico 1: Evolución de Atenciones de Urgencia
 st.header("Evolución de atenciones de urgencia por causas del sistema circulatorio.")
@@ -503,12 +581,31 @@ st.markdown(
     Este gráfico muestra la evolución temporal de las atenciones de urgencia (desglosadas por causa) y la serie de temperatura máxima (con alertas) dentro del rango de fechas seleccionado.
     """
 )
+# Estimación de los últimos días del total por el retraso de registro (nowcasting.py). Las fracciones
+# registradas se aprenden del total de todos los establecimientos; con series suavizadas no aplica
+estimacion_total = None
+if opciones_suavizado[suavizado] is None:
+    with etapa("atenciones", "nowcasting") as medicion:
+        total_sc = df_au[df_au['Causa'] == diccionario_causas_au[12]].groupby('fecha')['Total'].sum()
+        estimacion_total = corregir(total_sc, factores(diccionario_causas_au[12], RUTA_INSTANTANEAS))
+        medicion["filas"] = len(estimacion_total)
 fig1, base_area = grafico_area_atenciones_respiratorias(df_au, df_tmm, 'Total',
-                                                        'Evolución de Atenciones de Urgencia en el Sistema Circulatorio')
-st.plotly_chart(fig1, use_container_width=True)
+                                                        'Evolución de Atenciones de Urgencia en el Sistema Circulatorio',
+                                                        estimacion_total)
+with etapa("atenciones", "mostrar_fig1"):
+    st.plotly_chart(fig1, use_container_width=True)
+if estimacion_total is not None and not estimacion_total.empty:
+    st.caption(
+        f"Tramo punteado: total de los últimos {len(estimacion_total)} días corregido por el retraso de registro "
+        "observado en los extractos anteriores (todos los establecimientos), con su banda de incertidumbre."
+    )
+elif estimacion_total is None:
+    st.caption("La corrección de los últimos días por retraso de registro se muestra solo con las series sin suavizar.")
 with st.expander("Ver tabla: Últimos 10 días (Cardiovasculares)"):
     st.markdown("**Tabla: Últimos 10 días (Cardiovasculares)**")
     table1 = base_area.sort_values(by='Fecha').tail(10)
+    if estimacion_total is not None and not estimacion_total.empty:
+        table1 = table1.merge(tabla(estimacion_total, 'Fecha'), on='Fecha', how='left')
     st.table(table1)
     st.download_button(
         label="Descargar Tabla (Excel)",
@@ -533,9 +630,10 @@ st.markdown(
     junto con la serie de temperatura máxima (y sus alertas) para complementar el análisis.
     """
 )
-fig2, base_porcentaje = grafico_porcentaje_atenciones(df_au, df_tmm, 'Total',
+fig2, base_porcentaje = grafico_porcentaje_atenciones(df_au_porcentajes, df_tmm, 'Total',
                                                       'Porcentaje de Atenciones de Urgencia por Causa')
-st.plotly_chart(fig2, use_container_width=True)
+with etapa("atenciones", "mostrar_fig2"):
+    st.plotly_chart(fig2, use_container_width=True)
 with st.expander("Ver tabla: Últimos 10 días (Porcentaje de Atenciones)"):
     st.markdown("**Tabla: Últimos 10 días (Porcentaje de Atenciones)**")
     table2 = base_porcentaje.sort_values(by='Fecha').tail(10)
@@ -565,7 +663,8 @@ st.markdown(
 )
 fig3, base_grupo = grafico_total_grupo_etario(df_au, df_tmm,
                                               'Consultas de Urgencia por Grupos Etarios del Sistema Circulatorio')
-st.plotly_chart(fig3, use_container_width=True)
+with etapa("atenciones", "mostrar_fig3"):
+    st.plotly_chart(fig3, use_container_width=True)
 with st.expander("Ver tabla: Últimos 10 días (Atenciones por Grupo de Edad)"):
     st.markdown("**Tabla: Últimos 10 días (Atenciones por Grupo de Edad)**")
     table3 = base_grupo.sort_values(by='Fecha').tail(10)
@@ -594,9 +693,10 @@ st.markdown(
     con la serie de temperatura máxima (y alertas) superpuesta en un eje secundario.
     """
 )
-fig4, base_porcentaje_grupo = grafico_porcentaje_total(df_au, df_tmm, 'Total',
+fig4, base_porcentaje_grupo = grafico_porcentaje_total(df_au_porcentajes, df_tmm, 'Total',
                                                        'Porcentaje de Atenciones por Causa (Total General)')
-st.plotly_chart(fig4, use_container_width=True)
+with etapa("atenciones", "mostrar_fig4"):
+    st.plotly_chart(fig4, use_container_width=True)
 with st.expander("Ver tabla: Últimos 10 días (Porcentaje de Atenciones por Grupo de Edad)"):
     st.markdown("**Tabla: Últimos 10 días (Porcentaje de Atenciones por Grupo de Edad)**")
     table4 = base_porcentaje_grupo.sort_values(by='Fecha').tail(10)
@@ -615,6 +715,59 @@ with st.expander("Ver tabla: Últimos 10 días (Porcentaje de Atenciones por Gru
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
+### Alertas tempranas EARS
+st.header("Alertas tempranas de atenciones de urgencia (EARS)")
+st.markdown(
+    """
+    **Descripción:**  
+    Días en que las atenciones de urgencia del sistema circulatorio superan lo esperado según los métodos
+    **EARS C1, C2 y C3** (comparación con los días inmediatamente anteriores), independientemente de la temperatura.
+    La tabla la actualiza el proceso de carga de datos cada vez que se agregan días nuevos.
+    """
+)
+with etapa("atenciones", "leer_alertas_ears") as medicion:
+    df_ears = leer_alertas()
+    medicion["filas"] = len(df_ears)
+if len(rango_fechas) == 2:
+    df_ears = df_ears[(df_ears['fecha'] >= pd.Timestamp(fecha_inicio_sel)) &
+                      (df_ears['fecha'] <= pd.Timestamp(fecha_fin_sel))]
+serie_ears = st.selectbox("Serie vigilada:", ['Total', 'De_65_y_mas'])
+df_ears_serie = df_ears[df_ears['serie'] == serie_ears]
+with etapa("atenciones", "grafico_ears"):
+    fig_ears = go.Figure()
+    fig_ears.add_trace(go.Scatter(x=df_ears_serie['fecha'], y=df_ears_serie['observado'],
+                                  mode='lines', name='Observado',
+                                  line=dict(color=colors_atenciones['Total Sistema Circulatorio'])))
+    fig_ears.add_trace(go.Scatter(x=df_ears_serie['fecha'], y=df_ears_serie['esperado_c2'],
+                                  mode='lines', name='Esperado (C2)',
+                                  line=dict(color=colors_atenciones['Arritmia grave'], dash='dash')))
+    for metodo, alerta in [('C1', 'alerta_c1'), ('C2', 'alerta_c2'), ('C3', 'alerta_c3')]:
+        df_marcados = df_ears_serie[df_ears_serie[alerta]]
+        fig_ears.add_trace(go.Scatter(x=df_marcados['fecha'], y=df_marcados['observado'],
+                                      mode='markers', name=f'Alerta {metodo}',
+                                      marker=dict(size=9, symbol='triangle-up',
+                                                  color={'C1': colors_alerta['Alerta Amarilla'],
+                                                         'C2': '#fd7e14',
+                                                         'C3': colors_alerta['Alerta Roja']}[metodo])))
+    fig_ears.update_layout(
+        title=f'{CAUSA_VIGILADA} ({serie_ears}) y alertas EARS',
+        xaxis_title='Fecha',
+        yaxis_title='Atenciones',
+        template='plotly_white',
+        legend=dict(orientation="h", yanchor="top", y=-0.2, xanchor="center", x=0.5)
+    )
+with etapa("atenciones", "mostrar_fig_ears"):
+    st.plotly_chart(fig_ears, use_container_width=True)
+with st.expander("Ver tabla: Días con alerta EARS"):
+    tabla_ears = df_ears[df_ears[['alerta_c1', 'alerta_c2', 'alerta_c3']].any(axis=1)].sort_values(by='fecha')
+    st.table(tabla_ears)
+    st.download_button(
+        label="Descargar Tabla (Excel)",
+        data=to_excel_bytes(tabla_ears),
+        file_name="tabla_alertas_ears.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
 # %% 5. Sección Final: Descargar Bases de Datos Completas (en CSV)
 st.header("Descargar Bases de Datos Completas")
 st.markdown(
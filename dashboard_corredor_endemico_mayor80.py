@@ -1,11 +1,10 @@
 #%%
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import pydeck as pdk
 import plotly.graph_objects as go
-from io import BytesIO
 import datetime
+from datos_base import corredor, defunciones, temperaturas
+from diagnostico import etapa, medido
 
 # Configuración de fechas
 fecha_inicio = datetime.date(2024, 1, 1)  # Mínimo permitido
@@ -24,17 +23,10 @@ fecha_inicio_dt = pd.Timestamp(rango_fechas[0])
 fecha_fin_dt = pd.Timestamp(rango_fechas[1])
 
 # Carga de datos
+@medido("corredor_mayor80")
 def cargar_datos():
-    path_def = "data_defunciones/defunciones_2024.csv"
-    df_corredor = pd.read_excel('data_corredor_endemico/corredor_endemico_mayor80.xlsx')
-    df_def = pd.read_csv(path_def)
-    columns = [
-        'SEXO', 'EDAD_TIPO', 'EDAD_CANT', 'DIA_DEF', 'MES_DEF', 'ANO_DEF',
-        'DIAG1', 'REG_RES', 'CARDIOVASCULAR', 'DATE'
-    ]
-    df_def = df_def['SEXO|EDAD_TIPO|EDAD_CANT|DIA_DEF|MES_DEF|ANO_DEF|DIAG1|REG_RES|CARDIOVASCULAR|DATE'].str.split('|', expand=True)
-    df_def.columns = columns
-    
+    df_corredor = corredor('data_corredor_endemico/corredor_endemico_mayor80.xlsx')
+    df_def = defunciones()
     return df_corredor, df_def
 
 df_corredor, df_def = cargar_datos()
@@ -45,15 +37,17 @@ df_corredor['Seguridad'] = df_corredor['Zona de éxito'] + df_corredor['Zona de
 df_corredor['Alerta'] = df_corredor['Zona de éxito'] + df_corredor['Zona de seguridad'] + df_corredor['Zona de alerta']
 
 # Filtrar defunciones para mayores de 80 años y agrupar por fecha
-df_def['DATE'] = pd.to_datetime(df_def['DATE'])
-df_def_80_mas = df_def[df_def['EDAD_CANT'].astype(float) >= 80]
-df_def_80_mas = df_def_80_mas.loc[(df_def_80_mas.DATE >= fecha_inicio_dt) & (df_def_80_mas.DATE <= fecha_fin_dt)]
-defunciones_por_dia = df_def_80_mas.groupby('DATE').size().reset_index(name='Defunciones')
+with etapa("corredor_mayor80", "agrupar_defunciones") as medicion:
+    df_def_80_mas = df_def[df_def['EDAD_CANT'].astype(float) >= 80]
+    df_def_80_mas = df_def_80_mas.loc[(df_def_80_mas.DATE >= fecha_inicio_dt) & (df_def_80_mas.DATE <= fecha_fin_dt)]
+    defunciones_por_dia = df_def_80_mas.groupby('DATE').size().reset_index(name='Defunciones')
+    medicion["filas"] = len(df_def)
 
 #%%
 # Carga de datos de temperatura
-df_ttm = pd.read_csv("data_temperatura/tmm_historico_2024.csv")
-df_ttm['date'] = pd.to_datetime(df_ttm['date'])
+with etapa("corredor_mayor80", "cargar_temperaturas") as medicion:
+    df_ttm = temperaturas()
+    medicion["filas"] = len(df_ttm)
 
 if len(rango_fechas) == 2:
     fecha_inicio_seleccionada, fecha_fin_seleccionada = rango_fechas
@@ -64,6 +58,7 @@ else:
 
 #%%
 # Evaluación de alertas
+@medido("corredor_mayor80")
 def evaluar_alertas(df):
     df['alerta'] = 'Sin Alerta' 
     df['mes'] = df['date'].dt.month
@@ -80,6 +75,7 @@ df_alertas = evaluar_alertas(df_alertas)
 
 #%%
 # Funciones para gráficos
+@medido("corredor_mayor80")
 def graficar_corredor_endemico_ordenado(df):
     df['Fecha'] = pd.to_datetime(df['Fecha'])
     fig = go.Figure()
@@ -133,6 +129,7 @@ def graficar_corredor_endemico_ordenado(df):
 fig_ordenado = graficar_corredor_endemico_ordenado(df_corredor)
 
 #%%
+@medido("corredor_mayor80")
 def graficar_corredor_endemico_con_defunciones(df_corredor, defunciones_por_dia):
     df_corredor['Fecha'] = pd.to_datetime(df_corredor['Fecha'])
     fig = go.Figure()
@@ -196,6 +193,7 @@ fig_con_defunciones = graficar_corredor_endemico_con_defunciones(df_corredor, de
 
 
 #%%
+@medido("corredor_mayor80")
 def graficar_corredor_endemico_con_alertas(df_corredor, defunciones_por_dia, df_alertas):
     df_corredor['Fecha'] = pd.to_datetime(df_corredor['Fecha'])
     df_alertas['date'] = pd.to_datetime(df_alertas['date'])
@@ -289,5 +287,6 @@ def graficar_corredor_endemico_con_alertas(df_corredor, defunciones_por_dia, df_
 
 #%% Generar gráfico combinado
 fig_corredor_endemico_con_alertas = graficar_corredor_endemico_con_alertas(df_corredor, defunciones_por_dia, df_alertas)
-st.plotly_chart(fig_corredor_endemico_con_alertas)
+with etapa("corredor_mayor80", "mostrar_fig_corredor_endemico_con_alertas"):
+    st.plotly_chart(fig_corredor_endemico_con_alertas)
 # %%
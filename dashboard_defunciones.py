@@ -5,6 +5,9 @@ Página de Defunciones – Análisis de defunciones cardiovasculares con Tempera
 Esta página muestra distintos gráficos basados en la información de defunciones del año 2024, 
 en particular enfocándose en las defunciones cardiovasculares y su distribución por grupo de edad, 
 y superpone la serie de temperatura máxima con la clasificación de alertas (según SEREMI).
+Una sección adicional muestra las defunciones del grupo de causas CIE-10 elegido en el sidebar
+(respiratorias, efectos del calor, deshidratación, etc.). Los últimos días, todavía incompletos por
+el retraso de registro, se corrigen con la estimación de ``nowcasting.py`` (tramo punteado).
 
 Cada sección incluye:
   - Un título y una breve explicación.
@@ -21,8 +24,16 @@ import plotly.express as px
 import plotly.graph_objects as go
 import datetime
 from io import BytesIO
+from metricas_exposicion import metricas_estacion, filtrar_episodios, agregar_episodios
+from datos_base import RUTA_DEFUNCIONES, defunciones, temperaturas
+from cie10 import mascara, categoria, capitulo
+from grupos_causa import grupos_defunciones
+from nowcasting import (RUTA_DEFUNCIONES as RUTA_INSTANTANEAS, agregar_estimacion, corregir, factores, tabla,
+                        ultimo_corte)
+from diagnostico import etapa, medido
 
 # Función para convertir un DataFrame a Excel (en bytes)
+@medido("defunciones")
 def to_excel_bytes(df: pd.DataFrame) -> bytes:
     output = BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
@@ -30,6 +41,7 @@ def to_excel_bytes(df: pd.DataFrame) -> bytes:
     return output.getvalue()
 
 # Función para convertir un DataFrame a CSV (en bytes)
+@medido("defunciones")
 def df_to_csv_bytes(df: pd.DataFrame) -> bytes:
     return df.to_csv(index=False, sep=';', decimal=',', encoding='utf-8').encode('utf-8')
 
@@ -73,65 +85,138 @@ rango_fechas = st.sidebar.date_input(
     max_value=fecha_fin
 )
 
-# Ruta del archivo de defunciones
-path_def = "data_defunciones/defunciones_2024.csv"
-
-# Cargar datos de defunciones
-data = pd.read_csv(path_def)
-columns = [
-    'SEXO', 'EDAD_TIPO', 'EDAD_CANT', 'DIA_DEF', 'MES_DEF', 'ANO_DEF',
-    'DIAG1', 'REG_RES', 'CARDIOVASCULAR', 'DATE'
-]
-data = data['SEXO|EDAD_TIPO|EDAD_CANT|DIA_DEF|MES_DEF|ANO_DEF|DIAG1|REG_RES|CARDIOVASCULAR|DATE'].str.split('|', expand=True)
-data.columns = columns
-data['CARDIOVASCULAR'] = data['CARDIOVASCULAR'].map({'True': True, 'False': False})
-data['DATE'] = pd.to_datetime(data['DATE'], errors='coerce')
-data['EDAD_CANT'] = pd.to_numeric(data['EDAD_CANT'], errors='coerce')
+modo_alertas = st.sidebar.radio(
+    "Mostrar alertas de temperatura como:",
+    ["Marcadores diarios", "Episodios de calor"]
+)
+
+grupos_causa = {grupo.etiqueta: grupo for grupo in grupos_defunciones()}
+grupo_causa = st.sidebar.selectbox(
+    "Grupo de causa (CIE-10):",
+    list(grupos_causa),
+    index=1,
+    help="Grupo de causas de la sección «Defunciones por grupo de causa» (registro en grupos_causa.py)."
+)
+
+# Cargar datos de defunciones (tabla tipada en memoria, ver datos_base.py)
+with etapa("defunciones", "cargar_defunciones") as medicion:
+    data = defunciones()
+    medicion["filas"] = len(data)
 
 # Filtrar defunciones según rango de fechas seleccionado
-filtered_data = data[(data['DATE'] >= pd.to_datetime(rango_fechas[0])) & 
-                     (data['DATE'] <= pd.to_datetime(rango_fechas[1]))]
+with etapa("defunciones", "filtrar_fechas") as medicion:
+    filtered_data = data[(data['DATE'] >= pd.to_datetime(rango_fechas[0])) & 
+                         (data['DATE'] <= pd.to_datetime(rango_fechas[1]))]
+    medicion["filas"] = len(filtered_data)
 
 # Cargar la base de temperaturas (usada para superponer serie de temperatura y alertas)
-df_temp = pd.read_csv("data_temperatura/tmm_historico_2024.csv")
-df_temp['date'] = pd.to_datetime(df_temp['date'])
-df_temp = df_temp[(df_temp['date'] >= pd.to_datetime(rango_fechas[0])) & 
-                  (df_temp['date'] <= pd.to_datetime(rango_fechas[1]))]
+with etapa("defunciones", "cargar_temperaturas") as medicion:
+    df_temp = temperaturas()
+    df_temp = df_temp[(df_temp['date'] >= pd.to_datetime(rango_fechas[0])) & 
+                      (df_temp['date'] <= pd.to_datetime(rango_fechas[1]))]
+    medicion["filas"] = len(df_temp)
 
 # Aplicar lógica de alertas SEREMI a la serie de temperatura
-df_temp = df_temp.copy()
-df_temp['alerta'] = 'Sin Alerta'
-df_temp['mes'] = df_temp['date'].dt.month
-df_temp.loc[df_temp['mes'].isin([11,12,1,2,3]), 'alerta'] = 'Alerta temprana preventiva'
-df_temp.loc[df_temp['t_max'] >= 40, 'alerta'] = 'Alerta Roja'
-df_temp['alerta_temporal'] = df_temp['t_max'] >= 34
-df_temp['alerta_consecutiva'] = df_temp['alerta_temporal'].rolling(window=2).sum()
-df_temp.loc[df_temp['alerta_consecutiva'] >= 2, 'alerta'] = 'Alerta Amarilla'
-df_temp['alerta_consecutiva_3'] = df_temp['alerta_temporal'].rolling(window=3).sum()
-df_temp.loc[df_temp['alerta_consecutiva_3'] >= 3, 'alerta'] = 'Alerta Roja'
+with etapa("defunciones", "alertas_temperatura") as medicion:
+    df_temp = df_temp.copy()
+    df_temp['alerta'] = 'Sin Alerta'
+    df_temp['mes'] = df_temp['date'].dt.month
+    df_temp.loc[df_temp['mes'].isin([11,12,1,2,3]), 'alerta'] = 'Alerta temprana preventiva'
+    df_temp.loc[df_temp['t_max'] >= 40, 'alerta'] = 'Alerta Roja'
+    df_temp['alerta_temporal'] = df_temp['t_max'] >= 34
+    df_temp['alerta_consecutiva'] = df_temp['alerta_temporal'].rolling(window=2).sum()
+    df_temp.loc[df_temp['alerta_consecutiva'] >= 2, 'alerta'] = 'Alerta Amarilla'
+    df_temp['alerta_consecutiva_3'] = df_temp['alerta_temporal'].rolling(window=3).sum()
+    df_temp.loc[df_temp['alerta_consecutiva_3'] >= 3, 'alerta'] = 'Alerta Roja'
+    medicion["filas"] = len(df_temp)
+
+# Episodios de calor (rachas de días con t_max >= 34°C) para sombrear en los gráficos
+with etapa("defunciones", "metricas_estacion") as medicion:
+    _, episodios = metricas_estacion()
+    episodios = filtrar_episodios(episodios, rango_fechas[0], rango_fechas[-1])
+    medicion["filas"] = len(episodios)
+
+def agregar_temperatura_y_alertas(fig):
+    """
+    Superpone la temperatura máxima en el eje secundario y, según la opción del sidebar,
+    los marcadores diarios de alerta SEREMI o los episodios de calor sombreados.
+    """
+    fig.add_trace(go.Scatter(
+        x=df_temp['date'], y=df_temp['t_max'],
+        mode='lines', name='Temperatura Máxima',
+        line=dict(color=color_temperatura), yaxis='y2'
+    ))
+    if modo_alertas == "Episodios de calor":
+        agregar_episodios(fig, episodios, color=colors_alerta['Alerta Roja'])
+    else:
+        for alerta, color in colors_alerta.items():
+            df_alerta = df_temp[df_temp['alerta'] == alerta]
+            fig.add_trace(go.Scatter(
+                x=df_alerta['date'], y=df_alerta['t_max'],
+                mode='markers', name=f'Alerta: {alerta}',
+                marker=dict(color=color), yaxis='y2'
+            ))
+    fig.update_layout(
+        yaxis2=dict(title='Temperatura Máxima', overlaying='y', side='right')
+    )
+    return fig
+
+def diarios_hasta_corte(conteos: pd.Series) -> pd.Series:
+    """
+    Conteos diarios (índice ``DATE``) con 0 en los días sin defunciones, desde el inicio del rango
+    hasta el último día del extracto. En los días más recientes el retraso de registro produce
+    justamente días en 0, que ``groupby`` omite y la estimación no corregiría.
+    """
+    corte = ultimo_corte(RUTA_INSTANTANEAS)
+    if corte is None:
+        return conteos
+    fin = min(pd.Timestamp(rango_fechas[1]), corte - pd.Timedelta(days=1))
+    return conteos.reindex(pd.date_range(pd.Timestamp(rango_fechas[0]), fin, freq='D', name='DATE'), fill_value=0)
+
+def nota_estimacion(estimacion: pd.DataFrame):
+    """Explica el tramo punteado bajo el gráfico, si hay estimación para el rango seleccionado."""
+    if not estimacion.empty:
+        st.caption(
+            f"Tramo punteado: estimación de los últimos {len(estimacion)} días corregida por el retraso de registro "
+            "observado en los extractos anteriores, con su banda de incertidumbre (nowcasting)."
+        )
 
 # %% 3. Creación de Gráficos y bases de datos
 
 ## Gráfico 1: Cantidad diaria de defunciones cardiovasculares
-daily_cardiovascular = filtered_data[filtered_data['CARDIOVASCULAR']].groupby('DATE').size().reset_index(name='CARDIOVASCULAR')
+with etapa("defunciones", "agrupar_cardiovascular") as medicion:
+    daily_cardiovascular = filtered_data[filtered_data['CARDIOVASCULAR']].groupby('DATE').size().reset_index(name='CARDIOVASCULAR')
+    medicion["filas"] = len(filtered_data)
+
+# Estimación de los últimos días según el retraso de registro de los extractos anteriores
+with etapa("defunciones", "nowcasting") as medicion:
+    diarios_cardiovascular = diarios_hasta_corte(daily_cardiovascular.set_index('DATE')['CARDIOVASCULAR'])
+    estimacion_cardiovascular = corregir(diarios_cardiovascular, factores('CARDIOVASCULAR', RUTA_INSTANTANEAS))
+    medicion["filas"] = len(estimacion_cardiovascular)
 
 ## Gráfico 2: Porcentaje de defunciones cardiovasculares
-total_deaths = filtered_data.groupby('DATE').size().reset_index(name='Total')
-daily_cardiovascular_perc = daily_cardiovascular.copy()
-merged_data = pd.merge(total_deaths, daily_cardiovascular_perc, on='DATE', how='left').fillna(0)
-merged_data['Porcentaje'] = (merged_data['CARDIOVASCULAR'] / merged_data['Total']) * 100
-merged_data['Temperatura Máxima'] = df_temp.set_index('date').reindex(merged_data['DATE'], method='nearest')['t_max'].values
+with etapa("defunciones", "agrupar_porcentaje") as medicion:
+    total_deaths = filtered_data.groupby('DATE').size().reset_index(name='Total')
+    daily_cardiovascular_perc = daily_cardiovascular.copy()
+    merged_data = pd.merge(total_deaths, daily_cardiovascular_perc, on='DATE', how='left').fillna(0)
+    merged_data['Porcentaje'] = (merged_data['CARDIOVASCULAR'] / merged_data['Total']) * 100
+    merged_data['Temperatura Máxima'] = df_temp.set_index('date').reindex(merged_data['DATE'], method='nearest')['t_max'].values
+    medicion["filas"] = len(filtered_data)
 
 ## Gráfico 3: Cantidad diaria de defunciones cardiovasculares por grupo de edad
-grouped_data = filtered_data[filtered_data['CARDIOVASCULAR']].copy()
-grouped_data['Grupo_Edad'] = grouped_data['EDAD_CANT'].apply(lambda x: '>= 85' if x >= 85 else ('< 1' if x < 1 else 'Otros'))
-daily_by_age = grouped_data.groupby(['DATE', 'Grupo_Edad']).size().reset_index(name='CARDIOVASCULAR')
+with etapa("defunciones", "agrupar_grupo_edad") as medicion:
+    grouped_data = filtered_data[filtered_data['CARDIOVASCULAR']].copy()
+    grouped_data['Grupo_Edad'] = grouped_data['EDAD_CANT'].apply(lambda x: '>= 85' if x >= 85 else ('< 1' if x < 1 else 'Otros'))
+    daily_by_age = grouped_data.groupby(['DATE', 'Grupo_Edad']).size().reset_index(name='CARDIOVASCULAR')
+    medicion["filas"] = len(grouped_data)
 
 ## Gráfico 4: Porcentaje de defunciones cardiovasculares por grupo de edad
-total_by_date = total_deaths.copy()
-merged_by_age = pd.merge(total_by_date, daily_by_age, on='DATE', how='left').fillna(0)
-merged_by_age['Porcentaje'] = (merged_by_age['CARDIOVASCULAR'] / merged_by_age['Total']) * 100
-merged_by_age['Temperatura Máxima'] = df_temp.set_index('date').reindex(merged_by_age['DATE'], method='nearest')['t_max'].values
+with etapa("defunciones", "agrupar_porcentaje_grupo_edad") as medicion:
+    total_by_date = total_deaths.copy()
+    merged_by_age = pd.merge(total_by_date, daily_by_age, on='DATE', how='left').fillna(0)
+    merged_by_age['Porcentaje'] = (merged_by_age['CARDIOVASCULAR'] / merged_by_age['Total']) * 100
+    merged_by_age['Temperatura Máxima'] = df_temp.set_index('date').reindex(merged_by_age['DATE'], method='nearest')['t_max'].values
+    medicion["filas"] = len(merged_by_age)
 
 # %% 4. Renderización de Gráficos, Tablas y Botones de Descarga
 
@@ -144,35 +229,28 @@ st.markdown(
     superpuesto a la serie de temperatura máxima (con sus alertas) según criterios SEREMI.
     """
 )
-fig1 = px.line(
-    daily_cardiovascular, 
-    x='DATE', 
-    y='CARDIOVASCULAR', 
-    title='Cantidad diaria de defunciones cardiovasculares',
-    labels={'DATE': 'Fecha', 'CARDIOVASCULAR': 'Cantidad de defunciones'},
-    template='plotly_white'
-)
-fig1.update_traces(line_color=colors_def['Cardiovascular'])
-fig1.add_trace(go.Scatter(
-    x=df_temp['date'], y=df_temp['t_max'],
-    mode='lines', name='Temperatura Máxima',
-    line=dict(color=color_temperatura), yaxis='y2'
-))
-for alerta, color in colors_alerta.items():
-    df_alerta = df_temp[df_temp['alerta'] == alerta]
-    fig1.add_trace(go.Scatter(
-        x=df_alerta['date'], y=df_alerta['t_max'],
-        mode='markers', name=f'Alerta: {alerta}',
-        marker=dict(color=color), yaxis='y2'
-    ))
-fig1.update_layout(
-    yaxis2=dict(title='Temperatura Máxima', overlaying='y', side='right')
-)
-st.plotly_chart(fig1, use_container_width=True)
+with etapa("defunciones", "grafico_1") as medicion:
+    fig1 = px.line(
+        daily_cardiovascular, 
+        x='DATE', 
+        y='CARDIOVASCULAR', 
+        title='Cantidad diaria de defunciones cardiovasculares',
+        labels={'DATE': 'Fecha', 'CARDIOVASCULAR': 'Cantidad de defunciones'},
+        template='plotly_white'
+    )
+    fig1.update_traces(line_color=colors_def['Cardiovascular'])
+    agregar_estimacion(fig1, estimacion_cardiovascular, colors_def['Cardiovascular'])
+    agregar_temperatura_y_alertas(fig1)
+    medicion["filas"] = len(daily_cardiovascular)
+with etapa("defunciones", "mostrar_fig1"):
+    st.plotly_chart(fig1, use_container_width=True)
+nota_estimacion(estimacion_cardiovascular)
 
 with st.expander("Ver tabla: Últimos 10 días (Defunciones Cardiovasculares)"):
     # Tabla 1: Últimos 10 días de defunciones cardiovasculares (Gráfico 1)
     table1 = daily_cardiovascular.sort_values(by='DATE').tail(10)
+    if not estimacion_cardiovascular.empty:
+        table1 = table1.merge(tabla(estimacion_cardiovascular, 'DATE'), on='DATE', how='left')
     st.write("### Tabla: Últimos 10 días (Defunciones Cardiovasculares)")
     st.table(table1)
     st.download_button(
@@ -198,31 +276,20 @@ st.markdown(
     junto con la serie de temperatura máxima (y sus alertas) para complementar el análisis.
     """
 )
-fig2 = px.line(
-    merged_data, 
-    x='DATE', 
-    y='Porcentaje', 
-    title='Porcentaje de defunciones cardiovasculares',
-    labels={'DATE': 'Fecha', 'Porcentaje': 'Porcentaje (%)'},
-    template='plotly_white'
-)
-fig2.update_traces(line_color=colors_def['Cardiovascular'])
-fig2.add_trace(go.Scatter(
-    x=df_temp['date'], y=df_temp['t_max'],
-    mode='lines', name='Temperatura Máxima',
-    line=dict(color=color_temperatura), yaxis='y2'
-))
-for alerta, color in colors_alerta.items():
-    df_alerta = df_temp[df_temp['alerta'] == alerta]
-    fig2.add_trace(go.Scatter(
-        x=df_alerta['date'], y=df_alerta['t_max'],
-        mode='markers', name=f'Alerta: {alerta}',
-        marker=dict(color=color), yaxis='y2'
-    ))
-fig2.update_layout(
-    yaxis2=dict(title='Temperatura Máxima', overlaying='y', side='right')
-)
-st.plotly_chart(fig2, use_container_width=True)
+with etapa("defunciones", "grafico_2") as medicion:
+    fig2 = px.line(
+        merged_data, 
+        x='DATE', 
+        y='Porcentaje', 
+        title='Porcentaje de defunciones cardiovasculares',
+        labels={'DATE': 'Fecha', 'Porcentaje': 'Porcentaje (%)'},
+        template='plotly_white'
+    )
+    fig2.update_traces(line_color=colors_def['Cardiovascular'])
+    agregar_temperatura_y_alertas(fig2)
+    medicion["filas"] = len(merged_data)
+with etapa("defunciones", "mostrar_fig2"):
+    st.plotly_chart(fig2, use_container_width=True)
 with st.expander("Ver tabla: Últimos 10 días (Porcentaje de defunciones cardiovasculares)"):
     # Tabla 2: Últimos 10 días (Porcentaje de defunciones cardiovasculares)
     table2 = merged_data.sort_values(by='DATE').tail(10)
@@ -254,32 +321,21 @@ st.markdown(
     Se superpone la serie de temperatura máxima (con alertas) en un eje secundario.
     """
 )
-fig3 = px.line(
-    daily_by_age, 
-    x='DATE', 
-    y='CARDIOVASCULAR', 
-    color='Grupo_Edad', 
-    title='Cantidad diaria de defunciones cardiovasculares por grupo de edad',
-    labels={'DATE': 'Fecha', 'CARDIOVASCULAR': 'Cantidad de defunciones', 'Grupo_Edad': 'Grupo de Edad'},
-    template='plotly_white',
-    color_discrete_map=colors_age
-)
-fig3.add_trace(go.Scatter(
-    x=df_temp['date'], y=df_temp['t_max'],
-    mode='lines', name='Temperatura Máxima',
-    line=dict(color=color_temperatura), yaxis='y2'
-))
-for alerta, color in colors_alerta.items():
-    df_alerta = df_temp[df_temp['alerta'] == alerta]
-    fig3.add_trace(go.Scatter(
-        x=df_alerta['date'], y=df_alerta['t_max'],
-        mode='markers', name=f'Alerta: {alerta}',
-        marker=dict(color=color), yaxis='y2'
-    ))
-fig3.update_layout(
-    yaxis2=dict(title='Temperatura Máxima', overlaying='y', side='right')
-)
-st.plotly_chart(fig3, use_container_width=True)
+with etapa("defunciones", "grafico_3") as medicion:
+    fig3 = px.line(
+        daily_by_age, 
+        x='DATE', 
+        y='CARDIOVASCULAR', 
+        color='Grupo_Edad', 
+        title='Cantidad diaria de defunciones cardiovasculares por grupo de edad',
+        labels={'DATE': 'Fecha', 'CARDIOVASCULAR': 'Cantidad de defunciones', 'Grupo_Edad': 'Grupo de Edad'},
+        template='plotly_white',
+        color_discrete_map=colors_age
+    )
+    agregar_temperatura_y_alertas(fig3)
+    medicion["filas"] = len(daily_by_age)
+with etapa("defunciones", "mostrar_fig3"):
+    st.plotly_chart(fig3, use_container_width=True)
 
 with st.expander("Ver tabla: Últimos 10 días (Defunciones por grupo de edad)"):
     # Tabla 3: Últimos 10 días (Defunciones por grupo de edad)
@@ -313,32 +369,21 @@ st.markdown(
     (y sus alertas) en un eje secundario.
     """
 )
-fig4 = px.line(
-    merged_by_age, 
-    x='DATE', 
-    y='Porcentaje', 
-    color='Grupo_Edad', 
-    title='Porcentaje de defunciones cardiovasculares por grupo de edad',
-    labels={'DATE': 'Fecha', 'Porcentaje': 'Porcentaje (%)', 'Grupo_Edad': 'Grupo de Edad'},
-    template='plotly_white',
-    color_discrete_map=colors_age
-)
-fig4.add_trace(go.Scatter(
-    x=df_temp['date'], y=df_temp['t_max'],
-    mode='lines', name='Temperatura Máxima',
-    line=dict(color=color_temperatura), yaxis='y2'
-))
-for alerta, color in colors_alerta.items():
-    df_alerta = df_temp[df_temp['alerta'] == alerta]
-    fig4.add_trace(go.Scatter(
-        x=df_alerta['date'], y=df_alerta['t_max'],
-        mode='markers', name=f'Alerta: {alerta}',
-        marker=dict(color=color), yaxis='y2'
-    ))
-fig4.update_layout(
-    yaxis2=dict(title='Temperatura Máxima', overlaying='y', side='right')
-)
-st.plotly_chart(fig4, use_container_width=True)
+with etapa("defunciones", "grafico_4") as medicion:
+    fig4 = px.line(
+        merged_by_age, 
+        x='DATE', 
+        y='Porcentaje', 
+        color='Grupo_Edad', 
+        title='Porcentaje de defunciones cardiovasculares por grupo de edad',
+        labels={'DATE': 'Fecha', 'Porcentaje': 'Porcentaje (%)', 'Grupo_Edad': 'Grupo de Edad'},
+        template='plotly_white',
+        color_discrete_map=colors_age
+    )
+    agregar_temperatura_y_alertas(fig4)
+    medicion["filas"] = len(merged_by_age)
+with etapa("defunciones", "mostrar_fig4"):
+    st.plotly_chart(fig4, use_container_width=True)
 with st.expander("Ver tabla: Últimos 10 días (Porcentaje de Defunciones por Grupo de Edad)"):
 # Tabla 4: Últimos 10 días (Porcentaje de defunciones por grupo de edad)
     merged_by_age = merged_by_age.loc[merged_by_age.Grupo_Edad=='>= 85']
@@ -359,6 +404,56 @@ with st.expander("Ver tabla: Últimos 10 días (Porcentaje de Defunciones por Gr
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
+### Gráfico 5: Defunciones del grupo de causa seleccionado + Temperatura y Alertas
+# El filtro compara el código CIE-10 entero de cada defunción con los límites del grupo
+with etapa("defunciones", "agrupar_grupo_causa") as medicion:
+    data_grupo = filtered_data[mascara(filtered_data['CIE10'], grupos_causa[grupo_causa].cie10)]
+    daily_grupo = data_grupo.groupby('DATE').size().reset_index(name='Defunciones')
+    estimacion_grupo = corregir(diarios_hasta_corte(daily_grupo.set_index('DATE')['Defunciones']),
+                                factores(grupos_causa[grupo_causa].columna, RUTA_INSTANTANEAS))
+    detalle_grupo = pd.DataFrame({
+        'Capítulo': capitulo(data_grupo['CIE10']),
+        'Categoría': categoria(data_grupo['CIE10']),
+    }).value_counts().reset_index(name='Defunciones')
+    medicion["filas"] = len(filtered_data)
+
+st.write(f"## Defunciones por grupo de causa: {grupo_causa}")
+st.markdown(
+    """
+    **Descripción:**  
+    Este gráfico muestra el número diario de defunciones cuya causa básica (DIAG1) pertenece al grupo CIE-10 
+    seleccionado en el sidebar, junto con la serie de temperatura máxima (y sus alertas).
+    """
+)
+if daily_grupo.empty:
+    st.info("No hay defunciones de este grupo de causas en el rango de fechas seleccionado.")
+else:
+    with etapa("defunciones", "grafico_5") as medicion:
+        fig5 = px.line(
+            daily_grupo,
+            x='DATE',
+            y='Defunciones',
+            title=f'Cantidad diaria de defunciones: {grupo_causa}',
+            labels={'DATE': 'Fecha', 'Defunciones': 'Cantidad de defunciones'},
+            template='plotly_white'
+        )
+        fig5.update_traces(line_color=colors_def['Cardiovascular'])
+        agregar_estimacion(fig5, estimacion_grupo, colors_def['Cardiovascular'])
+        agregar_temperatura_y_alertas(fig5)
+        medicion["filas"] = len(daily_grupo)
+    with etapa("defunciones", "mostrar_fig5"):
+        st.plotly_chart(fig5, use_container_width=True)
+    nota_estimacion(estimacion_grupo)
+with st.expander("Ver tabla: Defunciones del grupo por categoría CIE-10"):
+    st.write(f"### Tabla: {len(data_grupo)} defunciones por capítulo y categoría")
+    st.dataframe(detalle_grupo, use_container_width=True, hide_index=True)
+    st.download_button(
+        label="Descargar Datos (Excel)",
+        data=to_excel_bytes(daily_grupo),
+        file_name="datos_defunciones_grupo_causa.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
 # %% 5. Sección Final: Descargar Bases de Datos Completas (en CSV)
 st.write("## Descargar Bases de Datos Completas")
 st.markdown(
@@ -367,7 +462,7 @@ st.markdown(
     A continuación, puedes descargar los archivos CSV originales que contienen toda la información.
     """
 )
-with open(path_def, "rb") as f:
+with open(RUTA_DEFUNCIONES, "rb") as f:
     base_defunciones = f.read()
 st.download_button(
     label="Descargar Base de Defunciones (CSV)",
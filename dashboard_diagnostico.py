@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Página de Diagnóstico – Tiempos por etapa de los dashboards
+
+Muestra los registros que dejan las etapas medidas con ``diagnostico.py`` (lectura, agregación,
+construcción y envío de figuras, exportación a Excel) en este proceso del servidor: percentiles de
+duración por página y etapa, filas procesadas y memoria. La página no aparece en el menú; se abre en
+``/diagnostico``.
+"""
+
+# %% 1. Importar librerías
+import tracemalloc
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from io import BytesIO
+from diagnostico import registros, percentiles, limpiar, trazar_memoria, TAMANO_BUFFER
+from datos_base import reporte_memoria
+from calidad import reportes_publicados, resumen as resumen_calidad
+
+# Función para convertir un DataFrame a Excel (en bytes)
+def to_excel_bytes(df: pd.DataFrame) -> bytes:
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Datos')
+    return output.getvalue()
+
+# %% 2. Controles
+st.title("Diagnóstico de tiempos por etapa")
+st.write(
+    f"Últimas {TAMANO_BUFFER} etapas medidas en este proceso (todas las sesiones). Las etapas de carga "
+    "en caché solo se registran cuando no aciertan en la caché."
+)
+
+col_memoria, col_limpiar = st.columns(2)
+memoria = col_memoria.toggle(
+    "Medir memoria por etapa (tracemalloc)",
+    value=tracemalloc.is_tracing(),
+    help="Registra el pico de memoria asignada en cada etapa. Hace más lentas las etapas mientras está activo."
+)
+trazar_memoria(memoria)
+if col_limpiar.button("Vaciar registros"):
+    limpiar()
+
+df = registros()
+if df.empty:
+    st.info("Aún no hay etapas registradas: abra alguna de las páginas del visor y vuelva aquí.")
+    st.stop()
+
+paginas = st.multiselect("Páginas:", sorted(df['pagina'].unique()), default=sorted(df['pagina'].unique()))
+df = df[df['pagina'].isin(paginas)]
+resumen = percentiles(df)
+
+# %% 3. Percentiles por etapa
+col1, col2, col3 = st.columns(3)
+col1.metric("Etapas registradas", len(df))
+col2.metric("Tiempo total (s)", f"{df['segundos'].sum():.2f}")
+col3.metric("Memoria residente máxima (MB)",
+            f"{df['rss_max_mb'].max():.0f}" if df['rss_max_mb'].notna().any() else "–")
+
+st.header("Percentiles por etapa")
+top = resumen.head(20).assign(etapa_pagina=lambda d: d['pagina'] + ' · ' + d['etapa'])
+fig = px.bar(
+    top.iloc[::-1],
+    x=['p50_s', 'p90_s', 'p99_s'],
+    y='etapa_pagina',
+    orientation='h',
+    barmode='group',
+    title='Duración por etapa (20 etapas con mayor p90)',
+    labels={'value': 'Segundos', 'etapa_pagina': '', 'variable': 'Percentil'},
+    template='plotly_white'
+)
+fig.update_layout(height=max(400, 28 * len(top)))
+st.plotly_chart(fig, use_container_width=True)
+
+st.dataframe(resumen.round(4), use_container_width=True, hide_index=True)
+st.download_button(
+    label="Descargar percentiles (Excel)",
+    data=to_excel_bytes(resumen),
+    file_name="diagnostico_percentiles.xlsx",
+    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+
+# %% 4. Registros individuales
+with st.expander("Ver registros: Últimas 200 etapas"):
+    st.dataframe(df.tail(200).iloc[::-1], use_container_width=True, hide_index=True)
+
+# %% 5. Memoria de las tablas base
+st.header("Memoria de las tablas base")
+st.write(
+    "Tamaño de cada tabla de `datos_base.py` con sus tipos compactos frente a la lectura del CSV sin "
+    "tipos. El cálculo vuelve a leer los archivos, por eso se hace a pedido."
+)
+if st.button("Calcular reporte de memoria"):
+    reporte = reporte_memoria()
+    reporte['MB_sin_tipos'] = reporte['bytes_sin_tipos'] / 2**20
+    reporte['MB_tipados'] = reporte['bytes_tipados'] / 2**20
+    st.dataframe(reporte[['tabla', 'filas', 'MB_sin_tipos', 'MB_tipados', 'reduccion']].round(2),
+                 use_container_width=True, hide_index=True)
+
+# %% 6. Calidad de los datos
+st.header("Calidad de los datos")
+reportes = reportes_publicados()
+if not reportes:
+    st.info("Aún no hay reportes de calidad: se generan junto a cada salida al ejecutar los ETL (`pipeline.py`).")
+else:
+    st.write("Problemas encontrados por la validación de cada ETL (`calidad.py`) en su última ejecución.")
+    st.dataframe(pd.DataFrame([{'dataset': nombre, 'filas': reporte['filas'], 'detalle': resumen_calidad(reporte)}
+                               for nombre, reporte in reportes.items()]),
+                 use_container_width=True, hide_index=True)
+    with st.expander("Ver reportes completos"):
+        st.json(reportes)
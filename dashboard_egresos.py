@@ -1,9 +1,40 @@
-#%%
+# -*- coding: utf-8 -*-
+"""
+Página de Egresos Hospitalarios – Egresos de la RM por fecha de ingreso y comuna
+
+Los datos provienen del almacenamiento compacto ``data_egresos/eh_2024.parquet`` que genera
+``data_egresos.py``. La página no lee los registros individuales en cada interacción: usa el cubo
+fecha × comuna de ``egresos.py`` (en caché) y solo filtra y suma sobre él.
+
+Secciones:
+  - Serie diaria de egresos del indicador seleccionado, con la temperatura máxima superpuesta.
+  - Egresos por comuna de residencia en el rango de fechas seleccionado.
+"""
+
+# %% 1. Importar librerías y definir funciones auxiliares
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import datetime
+from io import BytesIO
+from egresos import RUTA_EGRESOS, cubo_egresos, serie_diaria, por_comuna, indicadores_egresos, versiones_entradas
+from datos_base import temperaturas
+from diagnostico import etapa, medido, cache_data
+
+# Función para convertir un DataFrame a Excel (en bytes)
+@medido("egresos")
+def to_excel_bytes(df: pd.DataFrame) -> bytes:
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Datos')
+    return output.getvalue()
+
+color_egresos = '#08306B'
+color_temperatura = '#B22222'
 
+# %% 2. Configuración del Sidebar y carga de datos
 fecha_inicio = datetime.date(2024, 1, 1)  # Mínimo permitido
 fecha_fin = datetime.date.today()  # Máximo permitido
 fecha_inicio_default = datetime.date(2024, 11, 1)
@@ -15,39 +46,94 @@ rango_fechas = st.sidebar.date_input(
     min_value=fecha_inicio,
     max_value=fecha_fin
 )
+indicador = st.sidebar.selectbox("Indicador:", list(indicadores_egresos))
 
-#%%
-path_eh = "data_egresos/eh_2024.csv"
+if not os.path.exists(RUTA_EGRESOS):
+    st.warning(f"No se encontró `{RUTA_EGRESOS}`. Ejecute `data_egresos.py` (o `pipeline.py --etapas egresos`).")
+    st.stop()
 
-#%%
+# El cubo queda en caché con la versión de cada archivo que lee como clave
+@cache_data("egresos", show_spinner="Cargando egresos hospitalarios...")
+def cargar_cubo(versiones: tuple) -> pd.DataFrame:
+    return cubo_egresos()
 
-# Cargar datos
-data_eh = pd.read_csv(path_eh, encoding='LATIN1')
+cubo = cargar_cubo(versiones_entradas())
+fecha_desde = pd.Timestamp(rango_fechas[0])
+fecha_hasta = pd.Timestamp(rango_fechas[-1])
+with etapa("egresos", "filtrar_fechas") as medicion:
+    cubo = cubo[(cubo['fecha'] >= fecha_desde) & (cubo['fecha'] <= fecha_hasta)]
+    medicion["filas"] = len(cubo)
 
-# Convertir tipos de datos
-data_eh['CARDIOVASCULAR'] = data_eh['CARDIOVASCULAR']
-data_eh['date_ingreso'] = pd.to_datetime(data_eh['date_ingreso'], errors='coerce')
-data_eh['EDAD_CANT'] = pd.to_numeric(data_eh['EDAD_CANT'], errors='coerce')
+with etapa("egresos", "cargar_temperaturas") as medicion:
+    df_temp = temperaturas()
+    df_temp = df_temp[(df_temp['date'] >= fecha_desde) & (df_temp['date'] <= fecha_hasta)]
+    medicion["filas"] = len(df_temp)
 
-# Filtrar datos por rango de fechas
-data_eh = data_eh[(data_eh['date_ingreso'] >= pd.to_datetime(rango_fechas[0])) & (data_eh['date_ingreso'] <= pd.to_datetime(rango_fechas[1]))]
-
-#%% Gráfico 1: Cantidad diaria de defunciones cardiovasculares
-daily_cardiovascular_eh = data_eh[data_eh['CARDIOVASCULAR']].groupby('date_ingreso').size().reset_index(name='Cantidad')
+# %% 3. Gráfico 1: Serie diaria de egresos
+with etapa("egresos", "serie_diaria") as medicion:
+    diario = serie_diaria(cubo) if not cubo.empty else pd.DataFrame(columns=['fecha'] + list(indicadores_egresos))
+    medicion["filas"] = len(cubo)
 
 st.write("## Cantidad diaria de egresos hospitalarios")
+st.write(f"Este gráfico muestra el número diario de egresos hospitalarios ({indicador.lower()}) según su fecha de "
+         "ingreso, dentro del rango de fechas seleccionado, junto a la temperatura máxima.")
 
-st.write("Este gráfico muestra el número diario de ingresos hospitalarios relacionadas con causas cardiovasculares dentro del rango de fechas seleccionado.")
+with etapa("egresos", "grafico_serie_diaria") as medicion:
+    fig1 = px.line(
+        diario,
+        x='fecha',
+        y=indicador,
+        title=f'Cantidad diaria de egresos: {indicador}',
+        labels={'fecha': 'Fecha ingreso', indicador: 'Cantidad de egresos'},
+        template='plotly_white'
+    )
+    fig1.update_traces(line_color=color_egresos)
+    fig1.add_trace(go.Scatter(
+        x=df_temp['date'], y=df_temp['t_max'],
+        mode='lines', name='Temperatura Máxima',
+        line=dict(color=color_temperatura), yaxis='y2'
+    ))
+    fig1.update_layout(yaxis2=dict(title='Temperatura Máxima', overlaying='y', side='right'))
+    medicion["filas"] = len(diario)
+with etapa("egresos", "mostrar_fig1"):
+    st.plotly_chart(fig1, use_container_width=True)
 
-fig1 = px.line(
-    daily_cardiovascular_eh, 
-    x='date_ingreso', 
-    y='Cantidad', 
-    title='Cantidad diaria de egresos por causas cardiovasculares',
-    labels={'date_ingreso': 'Fecha ingreso', 'Cantidad': 'Cantidad de egresos'},
-    template='plotly_white'
-)
+with st.expander("Ver tabla: Últimos 10 días"):
+    st.table(diario[['fecha'] + list(indicadores_egresos)].tail(10))
+    st.download_button(
+        label="Descargar Datos (Excel)",
+        data=to_excel_bytes(diario),
+        file_name="egresos_diarios.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+# %% 4. Gráfico 2: Egresos por comuna
+with etapa("egresos", "por_comuna") as medicion:
+    comunas = por_comuna(cubo).sort_values(indicador, ascending=False)
+    medicion["filas"] = len(cubo)
+
+st.write("## Egresos por comuna de residencia")
+st.write("Total de egresos del indicador seleccionado por comuna de residencia en el rango de fechas.")
 
-st.plotly_chart(fig1)
+with etapa("egresos", "grafico_comunas") as medicion:
+    fig2 = px.bar(
+        comunas,
+        x='Nombre comuna',
+        y=indicador,
+        title=f'Egresos por comuna: {indicador}',
+        labels={'Nombre comuna': 'Comuna', indicador: 'Cantidad de egresos'},
+        template='plotly_white'
+    )
+    fig2.update_traces(marker_color=color_egresos)
+    medicion["filas"] = len(comunas)
+with etapa("egresos", "mostrar_fig2"):
+    st.plotly_chart(fig2, use_container_width=True)
 
-# %%
+with st.expander("Ver tabla: Egresos por comuna"):
+    st.dataframe(comunas, hide_index=True)
+    st.download_button(
+        label="Descargar Datos (Excel)",
+        data=to_excel_bytes(comunas),
+        file_name="egresos_por_comuna.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
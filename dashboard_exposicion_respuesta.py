@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Página Exposición–Respuesta: efecto rezagado de la temperatura máxima sobre las atenciones de urgencia
+y las defunciones.
+
+Para cada causa y grupo de edad se muestra el riesgo relativo (RR) por cada 1°C de temperatura máxima
+sobre el umbral, en los rezagos 0 a 21 días, junto con el efecto acumulado. Los modelos se ajustan una
+sola vez (ver ``analisis_rezagos.py``) y quedan en caché, por lo que la página responde de inmediato.
+"""
+
+# %% 1. Importar librerías y definir funciones auxiliares
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from io import BytesIO
+from analisis_rezagos import exposicion_respuesta, versiones_entradas, REZAGO_MAXIMO, UMBRAL_TEMPERATURA
+from diagnostico import etapa, medido, cache_data
+
+# Función para convertir un DataFrame a Excel (en bytes)
+@medido("exposicion_respuesta")
+def to_excel_bytes(df: pd.DataFrame) -> bytes:
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Datos')
+    return output.getvalue()
+
+color_respuesta = '#08306B'  # Azul oscuro
+color_referencia = '#B22222' # Firebrick
+
+@cache_data("exposicion_respuesta", show_spinner="Ajustando modelos de rezagos distribuidos...")
+def cargar_resultados(umbral: float, version: tuple) -> pd.DataFrame:
+    # ``version`` solo sirve de clave: cambia cuando cambia cualquiera de los archivos que leen los ajustes
+    return exposicion_respuesta(umbral=umbral)
+
+# %% 2. Configuración del Sidebar
+st.sidebar.write("### Parámetros del modelo")
+umbral = st.sidebar.select_slider(
+    "Umbral de temperatura máxima (°C):",
+    options=[26.0, 28.0, 30.0, 32.0, 34.0],
+    value=UMBRAL_TEMPERATURA
+)
+resultados = cargar_resultados(umbral, versiones_entradas())
+
+fuente = st.sidebar.selectbox("Fuente:", resultados['fuente'].unique())
+resultados_fuente = resultados[resultados['fuente'] == fuente]
+causa = st.sidebar.selectbox("Causa:", resultados_fuente['causa'].unique())
+edad = st.sidebar.selectbox("Grupo de edad:", resultados_fuente.loc[resultados_fuente['causa'] == causa, 'edad'].unique())
+
+serie = resultados_fuente[(resultados_fuente['causa'] == causa) & (resultados_fuente['edad'] == edad)]
+por_rezago = serie[serie['rezago'] >= 0]
+acumulado = serie[serie['rezago'] == -1].iloc[0]
+
+# %% 3. Renderización
+st.title("Exposición–respuesta entre temperatura máxima y salud")
+st.markdown(
+    f"""
+    **Descripción:**
+    Modelo cuasi-Poisson de rezagos distribuidos (0 a {REZAGO_MAXIMO} días) ajustado a los conteos diarios,
+    controlando por estacionalidad, tendencia y día de la semana. La exposición es el exceso de temperatura máxima
+    sobre **{umbral:.0f}°C**; un RR mayor a 1 indica más eventos por cada grado sobre el umbral.
+    """
+)
+
+col1, col2, col3 = st.columns(3)
+col1.metric("RR acumulado (0–21 días)", f"{acumulado['rr']:.3f}")
+col2.metric("IC 95%", f"{acumulado['rr_inf']:.3f} – {acumulado['rr_sup']:.3f}")
+col3.metric("Días analizados", int(acumulado['n_dias']))
+
+with etapa("exposicion_respuesta", "grafico_rezagos"):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=pd.concat([por_rezago['rezago'], por_rezago['rezago'][::-1]]),
+        y=pd.concat([por_rezago['rr_sup'], por_rezago['rr_inf'][::-1]]),
+        fill='toself', fillcolor='rgba(8, 48, 107, 0.15)', line=dict(width=0),
+        name='IC 95%', hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=por_rezago['rezago'], y=por_rezago['rr'],
+        mode='lines+markers', name='RR por rezago',
+        line=dict(color=color_respuesta)
+    ))
+    fig.add_hline(y=1, line_dash="dot", line_color=color_referencia)
+    fig.update_layout(
+        title=f'Riesgo relativo por rezago – {causa} ({edad})',
+        xaxis_title='Rezago (días)',
+        yaxis_title='RR por 1°C sobre el umbral',
+        template='plotly_white',
+        legend=dict(orientation="h", yanchor="top", y=-0.2, xanchor="center", x=0.5)
+    )
+with etapa("exposicion_respuesta", "mostrar_fig"):
+    st.plotly_chart(fig, use_container_width=True)
+
+st.header("Efecto acumulado en todas las series")
+tabla = resultados[resultados['rezago'] == -1].drop(columns='rezago').rename(columns={
+    'fuente': 'Fuente', 'causa': 'Causa', 'edad': 'Grupo de edad', 'rr': 'RR acumulado',
+    'rr_inf': 'IC 95% inferior', 'rr_sup': 'IC 95% superior', 'dispersion': 'Sobredispersión',
+    'n_dias': 'Días'
+})
+st.dataframe(tabla, use_container_width=True, hide_index=True)
+st.download_button(
+    label="Descargar Resultados (Excel)",
+    data=to_excel_bytes(resultados),
+    file_name="exposicion_respuesta.xlsx",
+    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
@@ -1,5 +1,6 @@
 import streamlit as st
-from datetime import datetime
+from metricas_servidor import iniciar_exportacion, render
+from precarga import iniciar_precarga
 st.set_page_config(layout="wide")
 # Cargar imágenes y logotipos
 st.image('img/seremi-100-años.png', width=300)
@@ -20,6 +21,10 @@ def home():
             - Alertas de temperatura
             - Atenciones de urgencias
             - Defunciones
+            - Exposición–respuesta (efecto rezagado de la temperatura)
+            - Hospitalizaciones desde urgencia (y su razón respecto de las atenciones)
+            - Egresos hospitalarios
+            - Mapa por comuna (egresos y defunciones por comuna de residencia)
         - **Vigilancia de notificaciones**
             - Enlace externo para la sección de Vigilancia de notificaciones de personas afectadas por temperaturas
         - **Plataforma territorial**
@@ -48,13 +53,19 @@ def external_link3():
 # Definir las páginas
 pages = {
     "Inicio": [
-        st.Page(home, default=True, title="Página de inicio", icon=":material/home:")
+        st.Page(home, default=True, title="Página de inicio", icon=":material/home:"),
+        # Tiempos por etapa de las páginas: fuera del menú, se abre en /diagnostico
+        st.Page("dashboard_diagnostico.py", title="Diagnóstico", icon=":material/monitoring:",
+                url_path="diagnostico", visibility="hidden")
     ],
     "Temperatura extrema": [
         st.Page("dashboard_alertas.py", title="Alertas de temperatura", icon=":material/public:"),
         st.Page("dashboard_atenciones_urgencia.py", title="Atenciones de urgencias", icon=":material/public:"),
         st.Page("dashboard_defunciones.py", title="Defunciones", icon=":material/public:"),
-        # st.Page("dashboard_egresos.py", title="Egresos Hospitalarios", icon=":material/public:"),
+        st.Page("dashboard_exposicion_respuesta.py", title="Exposición–respuesta", icon=":material/public:"),
+        st.Page("dashboard_hospitalizaciones.py", title="Hospitalizaciones", icon=":material/public:"),
+        st.Page("dashboard_egresos.py", title="Egresos Hospitalarios", icon=":material/public:"),
+        st.Page("dashboard_mapa_comunas.py", title="Mapa por comuna", icon=":material/map:"),
             ],
     "Vigilancia de notificaciones":[
         st.Page(external_link, title="Vigilancia de notificaciones", icon=":material/link:")
@@ -71,6 +82,12 @@ pages = {
     # ]
 }
 
+# Métricas para Prometheus (endpoint local y archivo) y precarga de librerías y datos en segundo plano;
+# ambas se inician una sola vez por proceso, con la primera visita
+iniciar_exportacion()
+iniciar_precarga()
+
 # Navegación entre páginas
 pg = st.navigation(pages)
-pg.run()
+with render(pg.title):
+    pg.run()
@@ -1,11 +1,12 @@
 #%%
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import pydeck as pdk
 import plotly.graph_objects as go
 from io import BytesIO
 import datetime
+from cubo_atenciones import (cubo_diario, serie, razones_hospitalizacion, causas_atencion,
+                             causas_hospitalizacion, grupos_edad, versiones_entradas)
+from diagnostico import etapa, medido, cache_data
 
 fecha_inicio = datetime.date(2024, 1, 1)  # Mínimo permitido
 fecha_fin = datetime.date.today()  # Máximo permitido
@@ -18,313 +19,210 @@ rango_fechas = st.sidebar.date_input(
     min_value=fecha_inicio,
     max_value=fecha_fin
 )
+edad = st.sidebar.selectbox("Grupo de edad:", grupos_edad)
+
+# Función para convertir un DataFrame a Excel (en bytes)
+@medido("hospitalizaciones")
+def to_excel_bytes(df: pd.DataFrame) -> bytes:
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='Datos')
+    return output.getvalue()
+
 #%%
-df_au = pd.read_csv("data_atenciones_urgencia/df_rm_circ_2024.csv")
-df_au['fecha'] = pd.to_datetime(df_au['fecha'])
+# El cubo diario (fecha × causa × edad) y las razones hospitalizaciones / atenciones se calculan
+# una vez por versión de los datos; cada interacción solo recorta el rango de fechas
+@cache_data("hospitalizaciones", show_spinner="Agregando hospitalizaciones y atenciones...")
+def cargar_agregados(versiones: tuple):
+    cubo, calendario, ids = cubo_diario()
+    hospitalizaciones = pd.concat(
+        {nombre: serie(cubo, calendario, ids, id_causa) for id_causa, nombre in causas_hospitalizacion.items()},
+        axis=1)
+    atenciones = pd.concat(
+        {nombre: serie(cubo, calendario, ids, id_causa) for id_causa, nombre in causas_atencion.items()},
+        axis=1)
+    return hospitalizaciones, atenciones, razones_hospitalizacion(cubo, calendario, ids)
+
+hospitalizaciones, atenciones, razones = cargar_agregados(versiones_entradas())
 
 if len(rango_fechas) == 2:
     fecha_inicio_seleccionada, fecha_fin_seleccionada = rango_fechas
-    df_au = df_au[(df_au['fecha'] >= pd.Timestamp(fecha_inicio_seleccionada)) &
-                     (df_au['fecha'] <= pd.Timestamp(fecha_fin_seleccionada))]
-else:
-    df_au = df_au
-
-#%%
-diccionario_causas_au={
-    1   :'Atenciones de urgencia - Total',
-    12   :'Atenciones de urgencia - Total Sistema Circulatorio',
-    13  :'Atenciones de urgencia - Infarto agudo miocardio',
-    14  :'Atenciones de urgencia - Accidente vascular encefálico',
-    15   :'Atenciones de urgencia - Crisis hipertensiva',
-    16   :'Atenciones de urgencia - Arritmia grave',
-    17   :'Atenciones de urgencia - Otras causas circulatorias',
-    25  :'Hospitalizaciones - Total',
-    22   :'Hospitalizaciones - CAUSAS SISTEMA CIRCULATORIO',
-}
+    periodo = slice(pd.Timestamp(fecha_inicio_seleccionada), pd.Timestamp(fecha_fin_seleccionada))
+    with etapa("hospitalizaciones", "filtrar_fechas") as medicion:
+        hospitalizaciones = hospitalizaciones.loc[periodo]
+        atenciones = atenciones.loc[periodo]
+        razones = razones.loc[periodo]
+        medicion["filas"] = len(razones)
+
+hosp_total, hosp_circ = causas_hospitalizacion.values()
+leyenda = dict(
+    orientation="h",  # Leyenda horizontal
+    yanchor="top",    # Alinear la parte superior de la leyenda
+    y=-0.2,           # Posicionar debajo del gráfico
+    xanchor="center", # Centrar horizontalmente
+    x=0.5             # Ubicación horizontal central
+)
 
 #%%
 
-def grafico_area_atenciones_respiratorias(df, col, title):
-    # Filtrar y agrupar los datos según las causas indicadas
-    # df_total = df[df['Causa'] == diccionario_causas_au[1]].groupby('fecha')[col].sum().reset_index()
-    df_tota_sc = df[df['Causa'] == diccionario_causas_au[22]].groupby('fecha')[col].sum().reset_index()
-
-    # Crear la figura del gráfico
+@medido("hospitalizaciones")
+def grafico_area_atenciones_respiratorias(hospitalizaciones, col, title):
+    # Hospitalizaciones diarias (total y por causas del sistema circulatorio)
     fig = go.Figure()
-
-    # Añadir trazas para cada grupo de causas
-    # fig.add_trace(go.Scatter(
-    #     x=df_total['fecha'], y=df_total[col],
-    #     mode='lines', name='Atenciones de urgencia - Total'
-    # ))
-    fig.add_trace(go.Scatter(
-        x=df_tota_sc['fecha'], y=df_tota_sc[col],
-        mode='lines', name='Hospitalizaciones - Total Sistema Circulatorio'
-    ))
-
-    # Configurar el diseño del gráfico
+    for causa in causas_hospitalizacion.values():
+        fig.add_trace(go.Scatter(
+            x=hospitalizaciones.index, y=hospitalizaciones[(causa, col)],
+            mode='lines', name=causa
+        ))
     fig.update_layout(
         title=title,
         xaxis_title='Fecha',
         yaxis_title=col,
         template='plotly_white',
-        legend=dict(
-            orientation="h",  # Leyenda horizontal
-            yanchor="top",    # Alinear la parte superior de la leyenda
-            y=-0.2,           # Posicionar debajo del gráfico
-            xanchor="center", # Centrar horizontalmente
-            x=0.5             # Ubicación horizontal central
-        )
+        legend=leyenda
     )
     return fig
-def grafico_atenciones_urgencia_pie(df, col, title):
-    data = []
-    labels = []
-    for key, value in diccionario_causas_au.items():
-        suma = df[df['Causa'] == value][col].sum()
-        data.append(suma)
-        labels.append(value)
-    fig = go.Figure(data=[go.Pie(labels=labels, values=data, hole=0.3)])
+@medido("hospitalizaciones")
+def grafico_atenciones_urgencia_pie(hospitalizaciones, title):
+    # Distribución por grupo de edad de las hospitalizaciones circulatorias del período
+    grupos = [g for g in grupos_edad if g != 'Total']
+    suma = hospitalizaciones[hosp_circ][grupos].sum()
+    fig = go.Figure(data=[go.Pie(labels=grupos, values=suma.values, hole=0.3)])
     fig.update_layout(
         title=title,
         template='plotly_white'
     )
-def grafico_porcentaje_atenciones(df, col, title):
-
-    # Filtrar los datos por causa y fecha
-    df_total_sc = df[df['Causa'] == diccionario_causas_au[12]].groupby('fecha')[col].sum().reset_index()
-    df_infarto = df[df['Causa'] == diccionario_causas_au[13]].groupby('fecha')[col].sum().reset_index()
-
-    # Calcular los porcentajes por día
-    porcentajes = pd.DataFrame()
-    porcentajes['fecha'] = df_total_sc['fecha']
-    porcentajes['Infarto agudo miocardio (%)'] = (df_infarto[col] / df_total_sc[col]) * 100
-
-    # Crear la figura del gráfico
+    return fig
+@medido("hospitalizaciones")
+def grafico_porcentaje_atenciones(razones, col, title):
+    # Hospitalizaciones por cada 100 atenciones de urgencia (misma agrupación de causas)
+    pares = {
+        'Total (hospitalizaciones / atenciones)': (hosp_total, causas_atencion[1]),
+        'Sistema circulatorio (hospitalizaciones / atenciones)': (hosp_circ, causas_atencion[12]),
+    }
     fig = go.Figure()
-
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Infarto agudo miocardio (%)'],
-        mode='lines', name='Infarto agudo miocardio (%)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Accidente vascular encefálico (%)'],
-        mode='lines', name='Accidente vascular encefálico (%)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Crisis hipertensiva (%)'],
-        mode='lines', name='Crisis hipertensiva (%)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Arritmia grave (%)'],
-        mode='lines', name='Arritmia grave (%)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Otras causas circulatorias (%)'],
-        mode='lines', name='Otras causas circulatorias (%)'
-    ))
-
-    # Configurar el diseño del gráfico
+    for nombre, (hosp, atencion) in pares.items():
+        fig.add_trace(go.Scatter(
+            x=razones.index, y=razones[(hosp, atencion, col)],
+            mode='lines', name=nombre
+        ))
     fig.update_layout(
         title=title,
-        xaxis_title='fecha',
+        xaxis_title='Fecha',
         yaxis_title='Porcentaje (%)',
         template='plotly_white',
-        legend=dict(
-            orientation="h",  # Leyenda horizontal
-            yanchor="top",    # Alinear la parte superior de la leyenda
-            y=-0.2,           # Posicionar debajo del gráfico
-            xanchor="center", # Centrar horizontalmente
-            x=0.5             # Ubicación horizontal central
-        )
-
+        legend=leyenda
     )
-
-
-    
     return fig
-def grafico_total_grupo_etario(df, title):
-    df_filtrado = df[df['Causa'] == diccionario_causas_au[12]]
+@medido("hospitalizaciones")
+def grafico_total_grupo_etario(hospitalizaciones, title):
+    df_filtrado = hospitalizaciones[hosp_circ]
+    colores = {'Menores_1': 'cyan', 'De_1_a_4': 'magenta', 'De_5_a_14': 'orange',
+               'De_15_a_64': 'yellow', 'De_65_y_mas': 'green'}
 
-    # Agrupar los datos por fecha para cada grupo etario
-    df_total = df_filtrado.groupby('fecha')['Total'].sum().reset_index()
-    df_menores_1 = df_filtrado.groupby('fecha')['Menores_1'].sum().reset_index()
-    df_1_a_4 = df_filtrado.groupby('fecha')['De_1_a_4'].sum().reset_index()
-    df_5_a_14 = df_filtrado.groupby('fecha')['De_5_a_14'].sum().reset_index()
-    df_15_a_64 = df_filtrado.groupby('fecha')['De_15_a_64'].sum().reset_index()
-    df_65_y_mas = df_filtrado.groupby('fecha')['De_65_y_mas'].sum().reset_index()
-
-    # Crear la figura del gráfico
     fig = go.Figure()
-
-    # Agregar la línea para el total
+    # Línea para el total y barras apiladas para cada grupo etario
     fig.add_trace(go.Scatter(
-        x=df_total['fecha'], y=df_total['Total'],
+        x=df_filtrado.index, y=df_filtrado['Total'],
         mode='lines', name='Total',
         line=dict(color='blue')
     ))
-
-    # Agregar las barras para cada grupo etario
-    fig.add_trace(go.Bar(
-        x=df_menores_1['fecha'], y=df_menores_1['Menores_1'],
-        name='Menores_1',
-        marker=dict(color='cyan')
-    ))
-
-    fig.add_trace(go.Bar(
-        x=df_1_a_4['fecha'], y=df_1_a_4['De_1_a_4'],
-        name='De_1_a_4',
-        marker=dict(color='magenta')
-    ))
-
-    fig.add_trace(go.Bar(
-        x=df_5_a_14['fecha'], y=df_5_a_14['De_5_a_14'],
-        name='De_5_a_14',
-        marker=dict(color='orange')
-    ))
-
-    fig.add_trace(go.Bar(
-        x=df_15_a_64['fecha'], y=df_15_a_64['De_15_a_64'],
-        name='De_15_a_64',
-        marker=dict(color='yellow')
-    ))
-
-    fig.add_trace(go.Bar(
-        x=df_65_y_mas['fecha'], y=df_65_y_mas['De_65_y_mas'],
-        name='De_65_y_mas',
-        marker=dict(color='green')
-    ))
-
-    # Configurar el diseño del gráfico
+    for grupo, color in colores.items():
+        fig.add_trace(go.Bar(
+            x=df_filtrado.index, y=df_filtrado[grupo],
+            name=grupo,
+            marker=dict(color=color)
+        ))
     fig.update_layout(
         title=title,
         xaxis_title='Fecha',
-        yaxis_title='Cantidad de Consultas',
+        yaxis_title='Cantidad de Hospitalizaciones',
         barmode='stack',
         template='plotly_white',
-        legend=dict(
-            title='Grupos Etarios',
-            orientation="h",  # Leyenda horizontal
-            yanchor="top",    # Alinear la parte superior de la leyenda
-            y=-0.2,           # Posicionar debajo del gráfico
-            xanchor="center", # Centrar horizontalmente
-            x=0.5             # Ubicación horizontal central
-        )
+        legend=dict(leyenda, title='Grupos Etarios')
     )
-    
     return fig
-def grafico_grupos_interes_epidemiologico(df, title):
-    # Filtrar el DataFrame para 'Atenciones de urgencia - Total Sistema Circulatorio'
-    df_filtrado = df[df['Causa'] == diccionario_causas_au[12]]
+@medido("hospitalizaciones")
+def grafico_grupos_interes_epidemiologico(hospitalizaciones, title):
+    df_filtrado = hospitalizaciones[hosp_circ]
+    colores = {'Menores_1': 'cyan', 'De_1_a_4': 'magenta', 'De_65_y_mas': 'green'}
 
-    # Agrupar los datos por fecha para cada grupo de interés epidemiológico
-    df_menores_1 = df_filtrado.groupby('fecha')['Menores_1'].sum().reset_index()
-    df_1_a_4 = df_filtrado.groupby('fecha')['De_1_a_4'].sum().reset_index()
-    df_65_y_mas = df_filtrado.groupby('fecha')['De_65_y_mas'].sum().reset_index()
-
-    # Crear la figura del gráfico
     fig = go.Figure()
-
-
-
-    # Agregar las barras para cada grupo de interés epidemiológico
-    fig.add_trace(go.Bar(
-        x=df_menores_1['fecha'], y=df_menores_1['Menores_1'],
-        name='Menores_1',
-        marker=dict(color='cyan')
-    ))
-
-    fig.add_trace(go.Bar(
-        x=df_1_a_4['fecha'], y=df_1_a_4['De_1_a_4'],
-        name='De_1_a_4',
-        marker=dict(color='magenta')
-    ))
-
-    fig.add_trace(go.Bar(
-        x=df_65_y_mas['fecha'], y=df_65_y_mas['De_65_y_mas'],
-        name='De_65_y_mas',
-        marker=dict(color='green')
-    ))
-
-    # Configurar el diseño del gráfico
+    for grupo, color in colores.items():
+        fig.add_trace(go.Bar(
+            x=df_filtrado.index, y=df_filtrado[grupo],
+            name=grupo,
+            marker=dict(color=color)
+        ))
     fig.update_layout(
         title=title,
         xaxis_title='Fecha',
-        yaxis_title='Cantidad de Consultas',
+        yaxis_title='Cantidad de Hospitalizaciones',
         barmode='stack',
         template='plotly_white',
-        legend=dict(
-            title='Grupos Etario de interes',
-            orientation="h",  # Leyenda horizontal
-            yanchor="top",    # Alinear la parte superior de la leyenda
-            y=-0.2,           # Posicionar debajo del gráfico
-            xanchor="center", # Centrar horizontalmente
-            x=0.5             # Ubicación horizontal central
-        )
+        legend=dict(leyenda, title='Grupos Etario de interes')
     )
     return fig
-def grafico_porcentaje_total(df, col, title):
-    # Filtrar datos por causas específicas y calcular el total general de atenciones de urgencia
-    df_total_urgencias = df[df['Causa'] == 'Atenciones de urgencia - Total'].groupby('fecha')[col].sum().reset_index()
-    df_total_sc = df[df['Causa'] == 'Atenciones de urgencia - Total Sistema Circulatorio'].groupby('fecha')[col].sum().reset_index()
+@medido("hospitalizaciones")
+def grafico_porcentaje_total(hospitalizaciones, col, title):
+    # Porcentaje de las hospitalizaciones totales que corresponde a causas del sistema circulatorio
+    total = hospitalizaciones[(hosp_total, col)]
+    porcentaje = (100 * hospitalizaciones[(hosp_circ, col)] / total).where(total > 0)
 
-    # Calcular los porcentajes por día
-    porcentajes = pd.DataFrame()
-    porcentajes['fecha'] = df_total_urgencias['fecha']
-    porcentajes['Sistema Circulatorio (%)'] = (df_total_sc[col] / df_total_urgencias[col]) * 100
-
-    # Crear la figura del gráfico
     fig = go.Figure()
-
     fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Sistema Circulatorio (%)'],
+        x=porcentaje.index, y=porcentaje,
         mode='lines', name='Sistema Circulatorio (%)'
     ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Infarto agudo miocardio (%)'],
-        mode='lines', name='Infarto agudo miocardio (%)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Accidente vascular encefálico (%)'],
-        mode='lines', name='Accidente vascular encefálico (%)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Crisis hipertensiva (%)'],
-        mode='lines', name='Crisis hipertensiva (%)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Arritmia grave (%)'],
-        mode='lines', name='Arritmia grave (%)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=porcentajes['fecha'], y=porcentajes['Otras causas circulatorias (%)'],
-        mode='lines', name='Otras causas circulatorias (%)'
-    ))
-    # Configurar el diseño del gráfico
     fig.update_layout(
         title=title,
         xaxis_title='Fecha',
         yaxis_title='Porcentaje (%)',
         template='plotly_white',
-        legend=dict(
-            orientation="h",  # Leyenda horizontal
-            yanchor="top",    # Alinear la parte superior de la leyenda
-            y=-0.2,           # Posicionar debajo del gráfico
-            xanchor="center", # Centrar horizontalmente
-            x=0.5             # Ubicación horizontal central
-        )
+        legend=leyenda
     )
     return fig
 #%%
-# Llamar a la función con el DataFrame y columna correspondiente
-fig_area_atenciones_respiratorias=(grafico_area_atenciones_respiratorias(df_au,'Total','Total sistema circulatorio'))
-fig_porcentaje_atenciones=(grafico_porcentaje_atenciones(df_au, 'Total', 'Porcentaje en relación a Total Sistema Circulatorio'))
-fig_porcentaje_atenciones_total=(grafico_porcentaje_total(df_au, 'Total', 'Porcentaje en relación a Total de atenciones'))
-fig_total_grupo_etario=(grafico_total_grupo_etario(df_au, 'Total Consultas de Urgencia por Grupo Etario'))
-fig_grupos_interes_epidemiologico=(grafico_grupos_interes_epidemiologico(df_au, 'Consultas de Urgencia por Grupos de Interés Epidemiológico'))
+st.title("Hospitalizaciones desde las unidades de urgencia")
+st.write("Hospitalizaciones diarias registradas en las atenciones de urgencia de la RM (todas las causas y "
+         "causas del sistema circulatorio) y su relación con el número de atenciones.")
+
+fig_area_atenciones_respiratorias=(grafico_area_atenciones_respiratorias(hospitalizaciones, edad, f'Hospitalizaciones diarias ({edad})'))
+fig_porcentaje_atenciones=(grafico_porcentaje_atenciones(razones, edad, f'Hospitalizaciones por cada 100 atenciones de urgencia ({edad})'))
+fig_porcentaje_atenciones_total=(grafico_porcentaje_total(hospitalizaciones, edad, f'Porcentaje circulatorio del total de hospitalizaciones ({edad})'))
+fig_total_grupo_etario=(grafico_total_grupo_etario(hospitalizaciones, 'Hospitalizaciones circulatorias por Grupo Etario'))
+fig_grupos_interes_epidemiologico=(grafico_grupos_interes_epidemiologico(hospitalizaciones, 'Hospitalizaciones circulatorias por Grupos de Interés Epidemiológico'))
+fig_pie=(grafico_atenciones_urgencia_pie(hospitalizaciones, 'Hospitalizaciones circulatorias del período por grupo etario'))
+
+with etapa("hospitalizaciones", "mostrar_graficos"):
+    st.plotly_chart(fig_area_atenciones_respiratorias, use_container_width=True)
+    st.plotly_chart(fig_porcentaje_atenciones, use_container_width=True)
+    st.plotly_chart(fig_porcentaje_atenciones_total, use_container_width=True)
+    st.plotly_chart(fig_total_grupo_etario, use_container_width=True)
+    st.plotly_chart(fig_grupos_interes_epidemiologico, use_container_width=True)
+    st.plotly_chart(fig_pie, use_container_width=True)
 
-st.plotly_chart(fig_area_atenciones_respiratorias, use_container_width=True)
-st.plotly_chart(fig_porcentaje_atenciones, use_container_width=True)
-st.plotly_chart(fig_porcentaje_atenciones_total, use_container_width=True)
-st.plotly_chart(fig_total_grupo_etario, use_container_width=True)
-st.plotly_chart(fig_grupos_interes_epidemiologico, use_container_width=True)
\ No newline at end of file
+#%%
+st.header("Razón hospitalizaciones / atenciones por causa")
+st.write("Hospitalizaciones por cada 100 atenciones de urgencia, para cualquier combinación de causas.")
+col_hosp, col_atencion = st.columns(2)
+hosp_sel = col_hosp.selectbox("Hospitalizaciones:", list(causas_hospitalizacion.values()), index=1)
+atencion_sel = col_atencion.selectbox("Atenciones de urgencia:", list(causas_atencion.values()), index=1)
+with etapa("hospitalizaciones", "grafico_razon") as medicion:
+    razon_sel = razones[(hosp_sel, atencion_sel)]
+    fig_razon = go.Figure()
+    for grupo in grupos_edad:
+        fig_razon.add_trace(go.Scatter(x=razon_sel.index, y=razon_sel[grupo], mode='lines', name=grupo))
+    fig_razon.update_layout(title=f'{hosp_sel} por cada 100 atenciones: {atencion_sel}', xaxis_title='Fecha',
+                            yaxis_title='Porcentaje (%)', template='plotly_white', legend=leyenda)
+    medicion["filas"] = len(razon_sel)
+with etapa("hospitalizaciones", "mostrar_fig_razon"):
+    st.plotly_chart(fig_razon, use_container_width=True)
+with st.expander("Ver tabla: Razones del período"):
+    st.dataframe(razon_sel.round(2))
+    st.download_button(
+        label="Descargar Datos (Excel)",
+        data=to_excel_bytes(razon_sel.round(2)),
+        file_name="razon_hospitalizaciones_atenciones.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
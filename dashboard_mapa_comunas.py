@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Página Mapa por comuna – Egresos hospitalarios y defunciones por comuna de residencia
+
+Muestra, para la fecha elegida, el número de egresos o defunciones por comuna de la RM en un mapa
+(mapa de calor y círculos proporcionales; coroplético si existen los polígonos comunales).
+El arreglo comuna × día y la geometría se calculan una sola vez (``espacial.py``); mover el control
+de fecha solo selecciona otra columna del arreglo.
+"""
+
+# %% 1. Importar librerías
+import streamlit as st
+import pandas as pd
+import numpy as np
+import pydeck as pdk
+from io import BytesIO
+from espacial import indicadores_espaciales, arreglo_comuna_dia, comunas, capas_mapa, versiones_entradas
+from diagnostico import etapa, medido, cache_data
+
+# Función para convertir un DataFrame a Excel (en bytes)
+@medido("mapa_comunas")
+def to_excel_bytes(df: pd.DataFrame) -> bytes:
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Datos')
+    return output.getvalue()
+
+# %% 2. Configuración del Sidebar y carga del arreglo comuna × día
+st.sidebar.write("### Datos a mostrar")
+fuente = st.sidebar.selectbox("Fuente:", list(indicadores_espaciales))
+indicador = st.sidebar.selectbox("Indicador:", indicadores_espaciales[fuente])
+dias_acumulados = st.sidebar.slider("Días acumulados (hasta la fecha elegida):", 1, 30, 7)
+
+@cache_data("mapa_comunas", show_spinner="Agregando por comuna y día...")
+def cargar_arreglo(fuente: str, indicador: str, versiones: tuple):
+    matriz, calendario = arreglo_comuna_dia(fuente, indicador)
+    if matriz is None:
+        return None, None
+    # Sumas acumuladas por comuna: cualquier ventana de días se obtiene con una resta
+    acumulado = np.concatenate((np.zeros((matriz.shape[0], 1)), np.cumsum(matriz, axis=1)), axis=1)
+    return acumulado, calendario
+
+acumulado, calendario = cargar_arreglo(fuente, indicador, versiones_entradas())
+
+st.write("## Mapa por comuna de residencia")
+if acumulado is None:
+    st.warning(
+        "No hay datos por comuna para esta fuente. Los egresos requieren `data_egresos/eh_2024.parquet` "
+        "y las defunciones un archivo generado con la columna `COMUNA` (ejecute `pipeline.py`)."
+    )
+    st.stop()
+
+fecha = st.slider(
+    "Fecha:",
+    min_value=calendario[0].date(),
+    max_value=calendario[-1].date(),
+    value=calendario[-1].date(),
+    format="DD/MM/YYYY"
+)
+
+# %% 3. Valores del período y mapa
+with etapa("mapa_comunas", "ventana_fechas") as medicion:
+    fin = calendario.get_loc(pd.Timestamp(fecha)) + 1
+    inicio = max(fin - dias_acumulados, 0)
+    valores = acumulado[:, fin] - acumulado[:, inicio]
+    # Escala fija para todas las fechas: el máximo de cualquier ventana del mismo largo
+    ventana = min(dias_acumulados, acumulado.shape[1] - 1)
+    maximo = float((acumulado[:, ventana:] - acumulado[:, :-ventana]).max())
+    medicion["filas"] = len(valores)
+
+st.write(
+    f"{fuente} ({indicador.lower()}) entre el {calendario[inicio]:%d/%m/%Y} y el {calendario[fin - 1]:%d/%m/%Y}, "
+    "por comuna de residencia. La escala de colores es la misma para todas las fechas."
+)
+with etapa("mapa_comunas", "capas_mapa") as medicion:
+    capas = capas_mapa(valores, maximo)
+    medicion["filas"] = len(valores)
+with etapa("mapa_comunas", "mostrar_mapa"):
+    st.pydeck_chart(pdk.Deck(
+        layers=capas,
+        initial_view_state=pdk.ViewState(latitude=-33.50, longitude=-70.70, zoom=8.5),
+        tooltip={"text": "{comuna}: {valor}"},
+        map_style=None
+    ))
+
+tabla = comunas()[['codigo', 'comuna', 'provincia']].assign(**{indicador: valores.astype(int)})
+tabla = tabla.sort_values(indicador, ascending=False)
+with st.expander("Ver tabla: Valores por comuna"):
+    st.dataframe(tabla, hide_index=True)
+    st.download_button(
+        label="Descargar Datos (Excel)",
+        data=to_excel_bytes(tabla),
+        file_name="mapa_por_comuna.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
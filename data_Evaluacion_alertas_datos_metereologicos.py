@@ -1,8 +1,25 @@
 #%%
+import os
 import pandas as pd
+from cache_artefactos import publicar
+from calidad import Reglas, publicar_reporte, validar
+from lector_csv import leer
+
+# Carpeta raíz de los archivos fuente (configurable con la variable de entorno DATOS_ENTRADA)
+DATOS_ENTRADA = os.environ.get('DATOS_ENTRADA', r'C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA')
+
+# Reglas de calidad de la salida (calidad.py): temperaturas plausibles para Santiago y un registro por estación y día
+reglas_meteo = Reglas(
+    obligatorias=['date', 't_max', 't_min'],
+    numericas=['t_max', 't_min'],
+    rangos={'t_max': (-10, 50), 't_min': (-20, 40)},
+    clave=['date', 'est'],
+    fecha='date',
+)
+
 #%%
 # Cargar los datos (Asumiendo que ya has cargado y preparado 'df' y 'df_est' como antes)
-df = pd.read_csv(r"C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA\TEMPERATURA\tmm_historico_2024.csv")
+df = leer(os.path.join(DATOS_ENTRADA, 'TEMPERATURA', 'tmm_historico_2024.csv'), ['date', 't_max'])
 #%%
 df['date'] = pd.to_datetime(df['date'])
 
@@ -63,5 +80,6 @@ df = evaluar_alertas_sobre35(df)
 df = evaluar_alertas_senapred(df)
 
 # %%
-df.to_csv("data_temperatura/datos_meteo.csv")
+publicar('datos_meteo', df, 'data_temperatura/datos_meteo.csv')
+publicar_reporte('datos_meteo', validar(df, reglas_meteo), 'data_temperatura/datos_meteo.csv')
 # %%
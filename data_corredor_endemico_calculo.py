@@ -1,10 +1,11 @@
 # %% Cargar y procesar datos
 import pandas as pd
+from cache_artefactos import publicar
+from lector_csv import leer
 import numpy as np
-import matplotlib.pyplot as plt
 
-df_historico = pd.read_csv("data_corredor_endemico/defunciones_historicas_2018_2023.csv")
-df_2024 = pd.read_csv("data_defunciones/defunciones_2024.csv", sep="|")
+df_historico = leer("data_corredor_endemico/defunciones_historicas_2018_2023.csv", ['Fechadef', 'Menor 1 año', '1 a 79', '80 y mas'])
+df_2024 = leer("data_defunciones/defunciones_2024.csv", ['DATE', 'EDAD_CANT'])
 
 # Asegurarse de que las fechas estén en formato datetime
 df_historico['Fechadef'] = pd.to_datetime(df_historico['Fechadef'], errors='coerce')
@@ -23,11 +24,11 @@ conteo_por_fecha.reset_index(inplace=True)
 conteo_por_fecha.rename(columns={'DATE': 'Fechadef'}, inplace=True)
 
 # Guardar el DataFrame actualizado
-conteo_por_fecha.to_csv("data_corredor_endemico/defunciones_historicas_2024.csv", index=False)
+publicar('defunciones_historicas_2024', conteo_por_fecha, 'data_corredor_endemico/defunciones_historicas_2024.csv', index=False)
 
 col = ['Fechadef', 'Menor 1 año', '1 a 79', '80 y mas']
 df_historico_hoy = pd.concat([df_historico[col], conteo_por_fecha[col]])
-df_historico_hoy.to_csv("data_corredor_endemico/defunciones_historicas_hoy.csv", index=False)
+publicar('defunciones_historicas_hoy', df_historico_hoy, 'data_corredor_endemico/defunciones_historicas_hoy.csv', index=False)
 
 # %% Funciones para cálculo del corredor endémico
 def load_and_process_data(file_path):
@@ -52,6 +53,8 @@ def calculate_daily_rates(data, population_mapping):
     return data
 
 def create_graph(data):
+    # matplotlib solo se usa para revisar el corredor a mano: se importa aquí y no al correr el ETL
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 6))
     plt.plot(data['Fechadef'], data['IC_Inf_Casos'], label='Zona de Éxito', linestyle='--', color='green')
     plt.plot(data['Fechadef'], data['Media_Casos'], label='Zona de Seguridad', linestyle='-', color='blue')
@@ -1,5 +1,13 @@
 #%%
+import os
 import pandas as pd
+from cache_artefactos import publicar
+from calidad import Reglas, publicar_reporte, validar
+from etl_paralelo import defunciones_rm, procesar, sumar_conteos
+from nowcasting import RUTA_DEFUNCIONES as RUTA_INSTANTANEAS, registrar
+
+# Carpeta raíz de los archivos fuente (configurable con la variable de entorno DATOS_ENTRADA)
+DATOS_ENTRADA = os.environ.get('DATOS_ENTRADA', r'C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA')
 
 #%%
 # Leer el archivo CSV
@@ -10,30 +18,53 @@ col=["SEXO",
  "MES_DEF",
  "ANO_DEF",
  "EDAD_TIPO",
- "EDAD_CANT"
+ "EDAD_CANT",
+ "COMUNA"
 ]
 
-df_2024 = pd.read_csv(r'C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA\DEFUNCIONES\DEF2024.csv', sep='|', encoding='LATIN',usecols=col,low_memory=False)
-df_2025 = pd.read_csv(r'C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA\DEFUNCIONES\DEF2025.csv', sep=';', encoding='LATIN',usecols=col,low_memory=False)
+# Archivos nacionales por año (DEF2024 viene separado por '|' y DEF2025 por ';': lector_csv.py lo detecta)
+archivos_defunciones = ['DEF2024.csv', 'DEF2025.csv']
+
+# Reglas de calidad de la salida (calidad.py); no hay identificador de defunción para buscar duplicados
+reglas_defunciones = Reglas(
+    obligatorias=['DIAG1', 'DATE', 'SEXO', 'EDAD_CANT'],
+    numericas=['SEXO', 'EDAD_TIPO', 'EDAD_CANT', 'DIA_DEF', 'MES_DEF', 'ANO_DEF'],
+    rangos={'EDAD_CANT': (0, 120), 'DIA_DEF': (1, 31), 'MES_DEF': (1, 12), 'SEXO': (1, 9)},
+    fecha='DATE',
+)
+
 #%%
-# Filtrar los datos para la región 13
-filtered_df_2024 = df_2024[df_2024['REG_RES'] == 13]
-filtered_df_2025 = df_2025[df_2025['REG_RES'] == 13]
-filtered_df = pd.concat([filtered_df_2024, filtered_df_2025])
-filtered_df.loc[filtered_df['EDAD_TIPO'].isin([2, 3, 4]), 'EDAD_CANT'] = 0
-edad_cant_out_of_range = filtered_df[(filtered_df['EDAD_CANT'] >= 80) | (filtered_df['EDAD_CANT'] <= 0)]
-filtered_df['CARDIOVASCULAR'] = filtered_df['DIAG1'].str.startswith('I', na=False)
-filtered_df['DATE'] = pd.to_datetime(filtered_df[['ANO_DEF', 'MES_DEF', 'DIA_DEF']].astype(str).agg('-'.join, axis=1), errors='coerce')
-# Obtener la fecha máxima registrada
-max_date = filtered_df['DATE'].max()
-
-# Filtrar excluyendo la fecha máxima (hoy)
-filtered_df = filtered_df[filtered_df['DATE'] < max_date]
-
-# Guardar el CSV sin el último día
-filtered_df.to_csv(r'data_defunciones/defunciones_2024.csv', index=False, sep='|', encoding='LATIN')
-print("Los datos filtrados sin el último día se han guardado correctamente.")
+# Los procesos del pool importan este script (en Windows): el flujo corre solo en el proceso principal
+if __name__ == '__main__':
+    # Cada archivo se lee por bloques en su propio proceso (etl_paralelo.py), que filtra la región 13,
+    # marca los grupos de causa (grupos_causa.py) en la misma pasada y cuenta por día y rango de edad
+    partes = procesar(defunciones_rm, [(os.path.join(DATOS_ENTRADA, 'DEFUNCIONES', archivo), col)
+                                       for archivo in archivos_defunciones])
+    filtered_df = pd.concat([filas for filas, _ in partes])
+    conteos_grupos = sumar_conteos([conteos for _, conteos in partes])
+    # Obtener la fecha máxima registrada
+    max_date = filtered_df['DATE'].max()
 
-# %%
-a=pd.DataFrame({'diag':list((filtered_df['DIAG1'][filtered_df['DIAG1'].str.startswith('I', na=False)].unique()))})
+    # Filtrar excluyendo la fecha máxima (hoy); las fechas inválidas (NaT) también quedan fuera
+    descartes = {'fecha_invalida': filtered_df['DATE'].isna().sum(),
+                 'ultimo_dia': (filtered_df['DATE'] == max_date).sum()}
+    filtered_df = filtered_df[filtered_df['DATE'] < max_date]
+
+    # Guardar el CSV sin el último día, con su reporte de calidad
+    publicar('defunciones', filtered_df, 'data_defunciones/defunciones_2024.csv', index=False, sep='|', encoding='LATIN')
+    publicar_reporte('defunciones', validar(filtered_df, reglas_defunciones, descartes), 'data_defunciones/defunciones_2024.csv')
+    print("Los datos filtrados sin el último día se han guardado correctamente.")
+
+    #%%
+    # Conteos diarios por grupo de causa y rango de edad (Total = todas las causas), sin el último día
+    conteos_grupos = conteos_grupos.reset_index()
+    conteos_grupos = conteos_grupos[conteos_grupos['DATE'] < max_date]
+    publicar('defunciones_grupos', conteos_grupos, 'data_defunciones/defunciones_grupos_diarias.csv', index=False, sep='|')
+
+    # Instantánea de este extracto (conteos diarios por grupo, con el día de corte excluido) para
+    # estimar el retraso de registro de los últimos días (nowcasting.py)
+    registrar('instantaneas_defunciones', conteos_grupos.groupby('DATE').sum(numeric_only=True), max_date, RUTA_INSTANTANEAS)
+
+    # %%
+    a=pd.DataFrame({'diag':list((filtered_df['DIAG1'][filtered_df['DIAG1'].str.startswith('I', na=False)].unique()))})
 # %%
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Reconstruye la historia de defunciones diarias de la Región Metropolitana que usa el corredor
+endémico (``data_corredor_endemico/defunciones_historicas_2018_2023.csv``) a partir de los archivos
+nacionales ``DEFUNCIONES/DEF<año>.csv`` de la carpeta de datos fuente.
+
+Cada año se procesa en su propio proceso (``etl_paralelo.py``): se lee por bloques, se filtra la
+región y se cuenta por día y rango de edad; el proceso principal solo suma los conteos. El separador
+y la codificación de cada archivo se detectan al leerlo (``lector_csv.py``).
+
+Uso:
+    python data_defunciones_historicas.py --desde 2018 --hasta 2023
+    python data_defunciones_historicas.py --desde 2014 --hasta 2023 --procesos 8
+"""
+
+# %% 1. Importar librerías y parámetros
+import argparse
+import os
+
+from cache_artefactos import publicar
+from etl_paralelo import defunciones_rm, procesar, sumar_conteos
+
+DATOS_ENTRADA = os.environ.get('DATOS_ENTRADA', r'C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA')
+columnas = ['DIAG1', 'REG_RES', 'DIA_DEF', 'MES_DEF', 'ANO_DEF', 'EDAD_TIPO', 'EDAD_CANT']
+
+
+def historia(desde: int, hasta: int, entrada: str = DATOS_ENTRADA, procesos: int = None):
+    """Defunciones diarias por rango de edad (columnas del corredor: ``Fechadef`` y un rango por columna)."""
+    rutas = [os.path.join(entrada, 'DEFUNCIONES', f'DEF{anio}.csv') for anio in range(desde, hasta + 1)]
+    faltantes = [ruta for ruta in rutas if not os.path.exists(ruta)]
+    if faltantes:
+        raise FileNotFoundError(f"No existen los archivos: {', '.join(faltantes)}")
+    partes = procesar(defunciones_rm, [(ruta, columnas, False) for ruta in rutas], procesos)
+    conteos = sumar_conteos([conteos for _, conteos in partes])['Total'].unstack('RANGO_EDAD')
+    conteos = conteos[(conteos.index.year >= desde) & (conteos.index.year <= hasta)]
+    conteos.columns = conteos.columns.astype(str)
+    return conteos.rename_axis(index='Fechadef', columns=None).reset_index()
+
+
+# %%
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reconstruye la historia de defunciones diarias del corredor endémico.")
+    parser.add_argument('--desde', type=int, default=2018, help='primer año')
+    parser.add_argument('--hasta', type=int, default=2023, help='último año')
+    parser.add_argument('--entrada', default=DATOS_ENTRADA, help='carpeta raíz de los archivos fuente')
+    parser.add_argument('--procesos', type=int, default=None, help='procesos en paralelo (por defecto ETL_PROCESOS)')
+    args = parser.parse_args()
+
+    df_historico = historia(args.desde, args.hasta, args.entrada, args.procesos)
+    ruta = f'data_corredor_endemico/defunciones_historicas_{args.desde}_{args.hasta}.csv'
+    publicar(f'defunciones_historicas_{args.desde}_{args.hasta}', df_historico, ruta, index=False)
+    print(f"{len(df_historico)} días guardados en {ruta}")
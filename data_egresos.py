@@ -1,35 +1,81 @@
 #%%
+import os
 import pandas as pd
+from collections import Counter
+
+from cache_artefactos import publicar_parquet
+from calidad import Reglas, publicar_reporte, validar
+from lector_csv import bloques
+
+# Carpeta raíz de los archivos fuente (configurable con la variable de entorno DATOS_ENTRADA)
+DATOS_ENTRADA = os.environ.get('DATOS_ENTRADA', r'C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA')
+
+# El archivo preliminar de egresos tiene millones de filas: se lee por bloques y de cada bloque se
+# conservan solo los egresos de la RM, ya convertidos a tipos compactos
+TAMANO_BLOQUE = 500_000
+
 #%%
 col_list=[
-'Seremi',
-'NUM_EGR',
 'EDAD_CANT',
 'TIPO_EDAD',
 'COMUNA',
-'REGION',
 'DIA_ING',
 'MES_ING',
 'ANO_ING',
-'T_DIAG1',
 'DIAG1',
 ]
-df_eh = pd.read_csv(r"C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA\EGRESOS_HOSPITALARIOS\EH_2024_preliminar13012025.csv", usecols=col_list,sep=';', encoding='LATIN',low_memory=False)
-#%%
-df_eh = df_eh.dropna(subset=["DIA_ING", "MES_ING", "ANO_ING"])
-df_eh["DIA_ING"] = pd.to_numeric(df_eh["DIA_ING"], errors="coerce").astype("Int64")
-df_eh["MES_ING"] = pd.to_numeric(df_eh["MES_ING"], errors="coerce").astype("Int64")
-df_eh["ANO_ING"] = pd.to_numeric(df_eh["ANO_ING"], errors="coerce").astype("Int64")
-df_eh["date_ingreso"] = pd.to_datetime(
-    df_eh[["ANO_ING", "MES_ING", "DIA_ING"]].rename(columns={"ANO_ING": "year", "MES_ING": "month", "DIA_ING": "day"}),
-    errors="coerce"
+
+
+# Reglas de calidad de la salida (calidad.py); la edad desconocida queda como -1 (fuera de rango)
+reglas_egresos = Reglas(
+    obligatorias=['date_ingreso', 'COMUNA', 'DIAG1'],
+    rangos={'EDAD_CANT': (0, 120)},
+    fecha='date_ingreso',
 )
-df_eh_rm = df_eh[df_eh["COMUNA"].astype(str).str.startswith("13", na=False)]
-df_eh_rm['CARDIOVASCULAR'] = df_eh_rm['DIAG1'].str.startswith('I', na=False)
-df_eh_rm.loc[df_eh_rm['TIPO_EDAD'].isin([2, 3, 4]), 'EDAD_CANT'] = 0
-df_eh_rm['MAYOR_80'] = df_eh_rm['EDAD_CANT'] >= 80
-df_eh_rm['MENOR_1'] = df_eh_rm['EDAD_CANT'] < 1
-df_eh_rm_2024 = df_eh_rm[df_eh_rm['date_ingreso'] < '2025-01-01']
+
+
+def procesar_bloque(bloque: pd.DataFrame, descartes: Counter) -> pd.DataFrame:
+    """
+    Egresos de la RM ingresados antes de 2025, con los tipos del almacenamiento compacto. Suma en
+    ``descartes`` los egresos de la RM sin fecha de ingreso válida (por ejemplo, sin ``DIA_ING``).
+    """
+    bloque = bloque[bloque["COMUNA"].str.strip().str.startswith("13", na=False)]
+    fecha_ingreso = pd.to_datetime(
+        bloque[["ANO_ING", "MES_ING", "DIA_ING"]]
+        .apply(pd.to_numeric, errors="coerce")
+        .rename(columns={"ANO_ING": "year", "MES_ING": "month", "DIA_ING": "day"}),
+        errors="coerce"
+    )
+    descartes['fecha_ingreso_invalida'] += int(fecha_ingreso.isna().sum())
+    bloque = bloque[fecha_ingreso < '2025-01-01']
+    fecha_ingreso = fecha_ingreso[bloque.index]
+
+    tipo_edad = pd.to_numeric(bloque["TIPO_EDAD"], errors="coerce").fillna(0).astype("int8")
+    edad = pd.to_numeric(bloque["EDAD_CANT"], errors="coerce").fillna(-1).astype("int16")
+    # Edades en meses, días u horas corresponden a menores de 1 año
+    edad = edad.mask(tipo_edad.isin([2, 3, 4]), 0)
+    diag1 = bloque["DIAG1"].str.strip()
+    return pd.DataFrame({
+        "date_ingreso": fecha_ingreso,
+        "COMUNA": bloque["COMUNA"].str.strip(),
+        "TIPO_EDAD": tipo_edad,
+        "EDAD_CANT": edad,
+        "DIAG1": diag1,
+        "CARDIOVASCULAR": diag1.str.startswith('I', na=False),
+        "MAYOR_80": edad >= 80,
+        "MENOR_1": (edad >= 0) & (edad < 1),
+    })
+
+
+lector = bloques(os.path.join(DATOS_ENTRADA, 'EGRESOS_HOSPITALARIOS', 'EH_2024_preliminar13012025.csv'),
+                 TAMANO_BLOQUE, encoding='latin-1', usecols=col_list, dtype=str)
+descartes = Counter()
+df_eh_rm_2024 = pd.concat([procesar_bloque(bloque, descartes) for bloque in lector], ignore_index=True)
+# Las categorías se fijan al final, sobre el conjunto completo de comunas y diagnósticos
+df_eh_rm_2024["COMUNA"] = df_eh_rm_2024["COMUNA"].astype("category")
+df_eh_rm_2024["DIAG1"] = df_eh_rm_2024["DIAG1"].astype("category")
+df_eh_rm_2024 = df_eh_rm_2024.sort_values("date_ingreso", kind="stable").reset_index(drop=True)
 # %%
-df_eh_rm_2024.to_csv(r'data_egresos/eh_2024.csv', index=False, encoding='LATIN')
+publicar_parquet('egresos', df_eh_rm_2024, 'data_egresos/eh_2024.parquet')
+publicar_reporte('egresos', validar(df_eh_rm_2024, reglas_egresos, descartes), 'data_egresos/eh_2024.parquet')
 # %%
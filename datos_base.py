@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Tablas base tipadas que leen los dashboards (temperaturas, defunciones, atenciones de urgencia y
+corredores endémicos).
+
+Cada tabla se lee y convierte una sola vez por versión del archivo (``version_archivo``). Las tablas
+grandes se publican como archivos Arrow que mapean todos los procesos del servidor
+(``memoria_compartida.py``); las páginas reciben una copia superficial que pueden modificar
+libremente (copy-on-write). Así, junto con el refresco en segundo plano de ``precarga.py``, ninguna
+página vuelve a leer y convertir un CSV completo al atender una visita.
+
+Los tipos son compactos: textos repetidos (diagnósticos, causas, tipos de establecimiento) como
+categóricos, edades, códigos y conteos en el entero más pequeño que los contiene (int8/int16) y
+banderas como booleanos. ``reporte_memoria`` compara el tamaño de cada tabla con el de la lectura
+sin tipos:
+
+    python datos_base.py
+"""
+
+# %% 1. Importar librerías y rutas
+from functools import lru_cache
+
+import pandas as pd
+
+from cache_artefactos import version_archivo
+from cie10 import codificar
+from lector_csv import leer
+from memoria_compartida import tabla_compartida
+
+RUTA_TEMPERATURAS = "data_temperatura/tmm_historico_2024.csv"
+RUTA_DEFUNCIONES = "data_defunciones/defunciones_2024.csv"
+RUTA_URGENCIAS = "data_atenciones_urgencia/df_rm_circ_2024.csv"
+
+# Cambia cuando cambian los tipos de las tablas, para no mapear archivos compartidos del formato anterior
+FORMATO = 3
+
+columnas_defunciones = [
+    'SEXO', 'EDAD_TIPO', 'EDAD_CANT', 'DIA_DEF', 'MES_DEF', 'ANO_DEF',
+    'DIAG1', 'REG_RES', 'CARDIOVASCULAR', 'DATE'
+]
+grupos_edad_urgencias = ['Total', 'Menores_1', 'De_1_a_4', 'De_5_a_14', 'De_15_a_64', 'De_65_y_mas']
+
+# Tabla -> (columnas categóricas, columnas enteras)
+tipos_tablas = {
+    'temperaturas': (['ht_min', 'ht_max', 'url'], ['day', 'col_7', 'est', 'year', 'month']),
+    'defunciones': (['DIAG1', 'REG_RES'], ['SEXO', 'EDAD_TIPO', 'EDAD_CANT', 'DIA_DEF', 'MES_DEF', 'ANO_DEF']),
+    'urgencias': (['GLOSATIPOESTABLECIMIENTO', 'Causa'], ['IdCausa'] + grupos_edad_urgencias),
+}
+
+
+def reducir(df: pd.DataFrame, categoricas=(), enteras=()) -> pd.DataFrame:
+    """
+    Convierte las columnas de texto ``categoricas`` a categóricas y las ``enteras`` al entero más
+    pequeño que contiene sus valores (las que tienen nulos quedan como float). Ignora las ausentes.
+    """
+    for columna in categoricas:
+        if columna in df:
+            df[columna] = df[columna].astype('category')
+    for columna in enteras:
+        if columna in df:
+            df[columna] = pd.to_numeric(df[columna], errors='coerce', downcast='integer')
+    return df
+
+
+# %% 2. Tablas en caché por versión
+def _leer_temperaturas(ruta: str) -> pd.DataFrame:
+    df = leer(ruta, ['date'])
+    df['date'] = pd.to_datetime(df['date'])
+    return reducir(df, *tipos_tablas['temperaturas'])
+
+
+@lru_cache(maxsize=2)
+def _temperaturas(ruta: str, version: tuple) -> pd.DataFrame:
+    return tabla_compartida('temperaturas', (ruta, version, FORMATO), lambda: _leer_temperaturas(ruta))
+
+
+def temperaturas(ruta: str = RUTA_TEMPERATURAS) -> pd.DataFrame:
+    """Temperaturas diarias con ``date`` como fecha."""
+    return _temperaturas(ruta, version_archivo(ruta)).copy(deep=False)
+
+
+def _leer_defunciones(ruta: str) -> pd.DataFrame:
+    data = leer(ruta, usecols=columnas_defunciones, dtype=str)
+    data = data[columnas_defunciones].copy()
+    data['CARDIOVASCULAR'] = data['CARDIOVASCULAR'] == 'True'
+    data['DATE'] = pd.to_datetime(data['DATE'], errors='coerce')
+    data = reducir(data, *tipos_tablas['defunciones'])
+    data['CIE10'] = codificar(data['DIAG1'])
+    return data
+
+
+@lru_cache(maxsize=2)
+def _defunciones(ruta: str, version: tuple) -> pd.DataFrame:
+    return tabla_compartida('defunciones', (ruta, version, FORMATO), lambda: _leer_defunciones(ruta))
+
+
+def defunciones(ruta: str = RUTA_DEFUNCIONES) -> pd.DataFrame:
+    """
+    Defunciones con las columnas de ``columnas_defunciones``: ``CARDIOVASCULAR`` booleana, ``DATE``
+    fecha, códigos y edad como enteros pequeños y ``DIAG1``/``REG_RES`` categóricas. ``CIE10`` es
+    ``DIAG1`` como entero ordenado (``cie10.py``), para filtrar grupos de causa por intervalos.
+    """
+    return _defunciones(ruta, version_archivo(ruta)).copy(deep=False)
+
+
+def _leer_urgencias(ruta: str) -> pd.DataFrame:
+    df = leer(ruta, ['fecha', 'IdCausa', 'Causa'])
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return reducir(df, *tipos_tablas['urgencias'])
+
+
+@lru_cache(maxsize=2)
+def _urgencias(ruta: str, version: tuple) -> pd.DataFrame:
+    return tabla_compartida('urgencias', (ruta, version, FORMATO), lambda: _leer_urgencias(ruta))
+
+
+def urgencias(ruta: str = RUTA_URGENCIAS) -> pd.DataFrame:
+    """
+    Atenciones de urgencia y hospitalizaciones de ``df_rm_circ_2024.csv``: ``fecha`` como fecha,
+    tipo de establecimiento y causa categóricos, ``IdCausa`` y conteos como enteros pequeños.
+    """
+    return _urgencias(ruta, version_archivo(ruta)).copy(deep=False)
+
+
+@lru_cache(maxsize=4)
+def _corredor(ruta: str, version: tuple) -> pd.DataFrame:
+    return pd.read_excel(ruta)
+
+
+def corredor(ruta: str) -> pd.DataFrame:
+    """Planilla de un corredor endémico (``data_corredor_endemico/corredor_endemico_*.xlsx``)."""
+    return _corredor(ruta, version_archivo(ruta)).copy(deep=False)
+
+
+# %% 3. Reporte de memoria
+# Tabla -> (carga tipada, ruta, opciones de la lectura sin tipos que hacían antes las páginas)
+tablas_base = {
+    'temperaturas': (temperaturas, RUTA_TEMPERATURAS, {}),
+    'defunciones': (defunciones, RUTA_DEFUNCIONES, {'sep': '|', 'dtype': str}),
+    'urgencias': (urgencias, RUTA_URGENCIAS, {}),
+}
+
+
+def reporte_memoria() -> pd.DataFrame:
+    """
+    Por tabla: filas, bytes de la lectura sin tipos (``pd.read_csv`` con las opciones de
+    ``tablas_base``), bytes de la tabla tipada y cuántas veces más chica es.
+    """
+    filas = []
+    for nombre, (cargar, ruta, opciones) in tablas_base.items():
+        tipada = cargar(ruta)
+        sin_tipos = pd.read_csv(ruta, **opciones)
+        sin_tipos = sin_tipos[[c for c in tipada.columns if c in sin_tipos]]  # las derivadas cuentan solo después
+        antes = int(sin_tipos.memory_usage(index=False, deep=True).sum())
+        despues = int(tipada.memory_usage(index=False, deep=True).sum())
+        filas.append({'tabla': nombre, 'filas': len(tipada), 'bytes_sin_tipos': antes,
+                      'bytes_tipados': despues, 'reduccion': antes / despues})
+    return pd.DataFrame(filas)
+
+
+# %%
+if __name__ == '__main__':
+    print(reporte_memoria().to_string(index=False))
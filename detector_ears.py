@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Detector de alertas tempranas EARS (C1, C2 y C3) para las atenciones de urgencia del sistema circulatorio.
+
+Vigila las series diarias de ``Atenciones de urgencia - Total Sistema Circulatorio`` (columnas ``Total``
+y ``De_65_y_mas``, sumando todos los tipos de establecimiento) y marca los días que superan lo esperado:
+    - **C1:** z contra los 7 días previos (t-7 .. t-1); alerta si z > 3.
+    - **C2:** z contra los días t-9 .. t-3 (dos días de resguardo); alerta si z > 3.
+    - **C3:** suma de max(0, C2 - 1) de los últimos 3 días; alerta si supera 2.
+
+El detector es incremental: guarda en ``estado_ears.json`` los conteos y valores de C2 de los últimos
+``RETENCION`` días de cada serie, por fecha. El ETL reescribe el archivo completo en cada ejecución y
+los días recientes siguen subiendo por el retraso de registro, por lo que en cada ejecución se busca
+el primer día cuyo conteo es nuevo o cambió y se reevalúan desde ahí todos los días siguientes,
+reemplazando sus filas en ``alertas_ears.csv``. Se ejecuta sin interfaz:
+
+    python detector_ears.py              # procesa los días nuevos
+    python detector_ears.py --reiniciar  # recalcula desde el inicio de la serie
+"""
+
+# %% 1. Importar librerías y parámetros
+import argparse
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache_artefactos import version_archivo
+from lector_csv import leer
+
+RUTA_URGENCIAS = "data_atenciones_urgencia/df_rm_circ_2024.csv"
+RUTA_ESTADO = "data_atenciones_urgencia/estado_ears.json"
+RUTA_ALERTAS = "data_atenciones_urgencia/alertas_ears.csv"
+
+CAUSA_VIGILADA = 'Atenciones de urgencia - Total Sistema Circulatorio'
+COLUMNAS_VIGILADAS = ['Total', 'De_65_y_mas']
+
+UMBRAL_C1 = 3.0
+UMBRAL_C2 = 3.0
+UMBRAL_C3 = 2.0
+DESVIACION_MINIMA = 1.0  # evita z infinitos cuando la línea base es constante
+HISTORIA = 9             # días de historia que necesita C2 (t-9 .. t-1)
+REVISION = 28            # días recientes cuyos conteos pueden cambiar entre extractos
+RETENCION = HISTORIA + REVISION  # días de conteos y C2 guardados en el estado
+
+COLUMNAS_ALERTAS = ['fecha', 'serie', 'observado', 'esperado_c1', 'c1', 'esperado_c2', 'c2', 'c3',
+                    'alerta_c1', 'alerta_c2', 'alerta_c3']
+
+
+# %% 2. Estadísticos EARS sobre una ventana de historia
+def estadistico(valor: float, base: np.ndarray):
+    """Media de la línea base y z del valor observado contra ella."""
+    media = base.mean()
+    desviacion = max(base.std(ddof=1), DESVIACION_MINIMA)
+    return media, (valor - media) / desviacion
+
+
+def paso_ears(estado_serie: dict, fecha: str, valor: float) -> dict:
+    """
+    Procesa un día nuevo de una serie y actualiza su estado en el lugar.
+    Retorna la fila de resultados (sin el nombre de la serie); si aún no hay historia suficiente
+    los estadísticos quedan en NaN.
+    """
+    historia = estado_serie['historia']
+    fila = {'fecha': fecha, 'observado': valor, 'esperado_c1': np.nan, 'c1': np.nan,
+            'esperado_c2': np.nan, 'c2': np.nan, 'c3': np.nan}
+    if len(historia) >= HISTORIA:
+        base = np.asarray(historia, dtype=float)
+        fila['esperado_c1'], fila['c1'] = estadistico(valor, base[-7:])
+        fila['esperado_c2'], fila['c2'] = estadistico(valor, base[-9:-2])
+        c2_previos = [c for c in estado_serie['c2'] if c is not None]
+        if len(c2_previos) == 2:
+            fila['c3'] = sum(max(0.0, c - 1) for c in c2_previos + [fila['c2']])
+    fila['alerta_c1'] = bool(fila['c1'] > UMBRAL_C1)
+    fila['alerta_c2'] = bool(fila['c2'] > UMBRAL_C2)
+    fila['alerta_c3'] = bool(fila['c3'] > UMBRAL_C3)
+
+    estado_serie['historia'] = (historia + [valor])[-HISTORIA:]
+    estado_serie['c2'] = (estado_serie['c2'] + [None if np.isnan(fila['c2']) else fila['c2']])[-2:]
+    estado_serie['ultima_fecha'] = fecha
+    return fila
+
+
+# %% 3. Lectura de días nuevos y persistencia del estado
+def series_diarias(ruta: str = RUTA_URGENCIAS) -> pd.DataFrame:
+    """Conteos diarios de las series vigiladas, sumando todos los tipos de establecimiento."""
+    df = leer(ruta, usecols=['fecha', 'Causa'] + COLUMNAS_VIGILADAS)
+    df = df[df['Causa'] == CAUSA_VIGILADA]
+    diario = df.groupby('fecha')[COLUMNAS_VIGILADAS].sum().sort_index()
+    diario.index = pd.to_datetime(diario.index)
+    return diario.asfreq('D', fill_value=0)
+
+
+def cargar_estado(ruta: str = RUTA_ESTADO) -> dict:
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_estado(estado: dict, ruta: str = RUTA_ESTADO):
+    # Escribir a un temporal y reemplazar, para no dejar un estado a medio escribir
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, indent=1)
+    os.replace(temporal, ruta)
+
+
+def primer_cambio(valores: pd.Series, conteos: dict):
+    """
+    Primera fecha de ``valores`` cuyo conteo es nuevo o distinto del guardado en ``conteos``
+    (``fecha -> conteo``); ``None`` si no cambió nada. Sin conteos guardados, la primera fecha.
+    Los días anteriores al más antiguo guardado no se comparan.
+    """
+    if not conteos:
+        return valores.index[0] if len(valores) else None
+    guardados = pd.Series(conteos, dtype=float)
+    guardados.index = pd.to_datetime(guardados.index)
+    comparados = valores[valores.index >= guardados.index.min()]
+    distintos = comparados.index[~comparados.eq(guardados.reindex(comparados.index))]
+    return distintos[0] if len(distintos) else None
+
+
+def _guardar_alertas(nuevas: pd.DataFrame, ruta: str):
+    """Agrega las filas a la tabla de alertas; las reevaluadas reemplazan a las anteriores."""
+    if os.path.exists(ruta):
+        nuevas = pd.concat([pd.read_csv(ruta, dtype={'fecha': str, 'serie': str}), nuevas], ignore_index=True)
+    nuevas = (nuevas.drop_duplicates(subset=['fecha', 'serie'], keep='last')
+              .sort_values(['serie', 'fecha'], kind='stable'))
+    temporal = ruta + '.tmp'
+    nuevas.to_csv(temporal, index=False)
+    os.replace(temporal, ruta)
+
+
+def actualizar(ruta_datos: str = RUTA_URGENCIAS, ruta_estado: str = RUTA_ESTADO,
+               ruta_alertas: str = RUTA_ALERTAS, reiniciar: bool = False) -> pd.DataFrame:
+    """
+    Evalúa los días nuevos y los días recientes cuyo conteo cambió (con todos los posteriores) y
+    actualiza la tabla de alertas. Devuelve las filas nuevas o reevaluadas.
+    """
+    estado = {} if reiniciar else cargar_estado(ruta_estado)
+    if reiniciar and os.path.exists(ruta_alertas):
+        os.remove(ruta_alertas)
+    diario = series_diarias(ruta_datos)
+
+    filas = []
+    for serie in COLUMNAS_VIGILADAS:
+        valores = diario[serie].astype(float)
+        estado_serie = estado.get(serie, {})
+        conteos = estado_serie.get('conteos', {})
+        c2_guardados = estado_serie.get('c2', {})
+        if not isinstance(c2_guardados, dict):  # estado sin conteos por fecha: se recalcula la serie
+            conteos, c2_guardados = {}, {}
+        desde = primer_cambio(valores, conteos)
+        if desde is None:
+            continue
+
+        # La historia sale de los conteos actuales; los C2 previos, de los días que no cambiaron
+        previos = valores[valores.index < desde]
+        trabajo = {'historia': previos.iloc[-HISTORIA:].tolist(),
+                   'c2': [c2_guardados.get(f.strftime('%Y-%m-%d')) for f in previos.index[-2:]]}
+        for fecha, valor in valores[valores.index >= desde].items():
+            fila = paso_ears(trabajo, fecha.strftime('%Y-%m-%d'), valor)
+            c2_guardados[fila['fecha']] = None if np.isnan(fila['c2']) else fila['c2']
+            fila['serie'] = serie
+            filas.append(fila)
+
+        recientes = valores.iloc[-RETENCION:]
+        fechas = [f.strftime('%Y-%m-%d') for f in recientes.index]
+        estado[serie] = {'conteos': dict(zip(fechas, recientes.tolist())),
+                         'c2': {f: c2_guardados.get(f) for f in fechas},
+                         'ultima_fecha': fechas[-1]}
+
+    nuevas = pd.DataFrame(filas, columns=COLUMNAS_ALERTAS)
+    if not nuevas.empty:
+        _guardar_alertas(nuevas, ruta_alertas)
+    guardar_estado(estado, ruta_estado)
+    return nuevas
+
+
+def leer_alertas(ruta: str = RUTA_ALERTAS) -> pd.DataFrame:
+    """Tabla de resultados EARS para los dashboards (vacía si el detector aún no se ha ejecutado)."""
+    if not os.path.exists(ruta):
+        return pd.DataFrame(columns=COLUMNAS_ALERTAS)
+    return _leer_alertas(ruta, version_archivo(ruta)).copy()
+
+
+@lru_cache(maxsize=2)
+def _leer_alertas(ruta: str, version: tuple) -> pd.DataFrame:
+    alertas = pd.read_csv(ruta, parse_dates=['fecha'])
+    return alertas.drop_duplicates(subset=['fecha', 'serie'], keep='last')
+
+
+# %%
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--reiniciar', action='store_true', help='recalcular desde el inicio de la serie')
+    args = parser.parse_args()
+    nuevas = actualizar(reiniciar=args.reiniciar)
+    marcadas = nuevas[nuevas[['alerta_c1', 'alerta_c2', 'alerta_c3']].any(axis=1)]
+    print(f"Días procesados: {nuevas['fecha'].nunique()} - con alerta: {marcadas['fecha'].nunique()}")
+    if not marcadas.empty:
+        print(marcadas.to_string(index=False))
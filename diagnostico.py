@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de tiempos por etapa de los dashboards (carga, agregación, figura, exportación).
+
+Cada etapa medida deja un registro con su duración, las filas procesadas y la memoria en un buffer
+circular en memoria del proceso (los últimos ``TAMANO_BUFFER`` registros, compartidos por todas las
+sesiones de Streamlit). La página ``dashboard_diagnostico.py`` muestra los percentiles por etapa.
+Cada etapa alimenta además los histogramas acumulados de ``metricas_servidor.py`` (Prometheus).
+
+Uso en las páginas:
+    with etapa("alertas", "leer_csv") as medicion:
+        df = pd.read_csv(...)
+        medicion["filas"] = len(df)
+
+    @medido("alertas")
+    def grafico_alertas(df): ...
+
+    @cache_data("alertas", show_spinner="Cargando...")   # st.cache_data + medido + aciertos/fallos
+    def cargar_datos(version): ...
+
+La memoria se informa de dos formas:
+  - ``rss_max_mb``: máximo de memoria residente del proceso al terminar la etapa (costo nulo).
+  - ``memoria_mb``: pico de memoria asignada durante la etapa, con ``tracemalloc``. Triplica el
+    tiempo de las etapas con muchos objetos Python, por eso está apagado por defecto; se enciende
+    con ``DASHBOARD_DIAGNOSTICO_MEMORIA=1`` o desde la página de diagnóstico (``trazar_memoria``).
+    Con varias sesiones simultáneas el pico incluye lo asignado por las otras sesiones.
+"""
+
+# %% 1. Importar librerías y parámetros
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+import metricas_servidor
+
+try:
+    import resource  # no existe en Windows
+except ImportError:
+    resource = None
+
+TAMANO_BUFFER = 5000
+PERCENTILES = [50, 90, 99]
+
+_registros = deque(maxlen=TAMANO_BUFFER)
+_local = threading.local()  # pila de etapas abiertas del hilo (una sesión de Streamlit por hilo)
+
+if os.environ.get("DASHBOARD_DIAGNOSTICO_MEMORIA") == "1" and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+# %% 2. Medición
+def _rss_max_mb():
+    if resource is None:
+        return None
+    # ru_maxrss está en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _filas(objeto):
+    """Filas de un DataFrame/Series/arreglo (o del primer elemento de una tupla); ``None`` si no aplica."""
+    if isinstance(objeto, tuple) and objeto:
+        return _filas(objeto[0])
+    forma = getattr(objeto, "shape", None)
+    if forma:
+        return int(forma[0])
+    return None
+
+
+@contextmanager
+def etapa(pagina: str, nombre: str):
+    """
+    Mide el bloque como la etapa ``nombre`` de ``pagina``. Entrega un diccionario donde el bloque
+    puede anotar ``filas``. Las etapas pueden anidarse; el pico de memoria de una etapa incluye el de
+    sus etapas internas.
+    """
+    medicion = {"filas": None}
+    pila = getattr(_local, "pila", None)
+    if pila is None:
+        pila = _local.pila = []
+    trazando = tracemalloc.is_tracing()
+    marco = {"pico": 0}
+    if trazando:
+        base, pico = tracemalloc.get_traced_memory()
+        if pila:
+            # El pico acumulado hasta aquí pertenece a la etapa externa, que se reinicia abajo
+            pila[-1]["pico"] = max(pila[-1]["pico"], pico)
+        tracemalloc.reset_peak()
+    pila.append(marco)
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        segundos = time.perf_counter() - inicio
+        pila.pop()
+        memoria_mb = None
+        if trazando and tracemalloc.is_tracing():
+            pico = max(tracemalloc.get_traced_memory()[1], marco["pico"])
+            if pila:
+                pila[-1]["pico"] = max(pila[-1]["pico"], pico)
+            memoria_mb = max(pico - base, 0) / 2**20
+        _registros.append({
+            "momento": pd.Timestamp.now(),
+            "pagina": pagina,
+            "etapa": nombre,
+            "segundos": segundos,
+            "filas": medicion["filas"],
+            "memoria_mb": memoria_mb,
+            "rss_max_mb": _rss_max_mb(),
+        })
+        metricas_servidor.duracion_etapa.observar(segundos, pagina=pagina, etapa=nombre)
+
+
+def medido(pagina: str, nombre: str = None):
+    """
+    Decorador: mide cada llamada de la función como una etapa (por defecto con el nombre de la
+    función). Las filas son las del primer argumento tabular o, si no hay, las del resultado.
+    Si la función devuelve ``bytes`` (exportaciones a Excel/CSV) se registra también su tamaño.
+    Bajo ``st.cache_data`` solo se registran las llamadas que no aciertan en caché.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with etapa(pagina, nombre or funcion.__name__) as medicion:
+                resultado = funcion(*args, **kwargs)
+                filas = [f for f in map(_filas, args) if f is not None]
+                medicion["filas"] = filas[0] if filas else _filas(resultado)
+            if isinstance(resultado, bytes):
+                metricas_servidor.tamano_exportacion.observar(len(resultado), pagina=pagina,
+                                                              funcion=nombre or funcion.__name__)
+            return resultado
+        return envoltura
+    return decorador
+
+
+def cache_data(pagina: str, **opciones):
+    """
+    ``st.cache_data(**opciones)`` que además mide las llamadas que se calculan (como ``medido``) y
+    cuenta aciertos y fallos de caché en ``metricas_servidor``.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def calculo(*args, **kwargs):
+            _local.fallo = True
+            return funcion(*args, **kwargs)
+
+        cacheada = st.cache_data(**opciones)(medido(pagina)(calculo))
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            previo, _local.fallo = getattr(_local, "fallo", False), False
+            try:
+                resultado = cacheada(*args, **kwargs)
+                contador = metricas_servidor.cache_fallos if _local.fallo else metricas_servidor.cache_aciertos
+                contador.incrementar(pagina=pagina, funcion=funcion.__name__)
+            finally:
+                _local.fallo = previo
+            return resultado
+        envoltura.clear = cacheada.clear
+        return envoltura
+    return decorador
+
+
+# %% 3. Consulta del buffer
+def registros() -> pd.DataFrame:
+    """Registros del buffer, del más antiguo al más reciente."""
+    columnas = ["momento", "pagina", "etapa", "segundos", "filas", "memoria_mb", "rss_max_mb"]
+    df = pd.DataFrame(list(_registros), columns=columnas)
+    for columna in ["filas", "memoria_mb", "rss_max_mb"]:
+        df[columna] = pd.to_numeric(df[columna], errors="coerce")
+    return df
+
+
+def percentiles(df: pd.DataFrame = None) -> pd.DataFrame:
+    """Por página y etapa: número de mediciones, percentiles de duración (s), filas y memoria."""
+    df = registros() if df is None else df
+    columnas = (["pagina", "etapa", "n"] + [f"p{p}_s" for p in PERCENTILES]
+                + ["max_s", "total_s", "filas_mediana", "memoria_max_mb"])
+    if df.empty:
+        return pd.DataFrame(columns=columnas)
+    grupos = df.groupby(["pagina", "etapa"], sort=False)
+    resumen = grupos["segundos"].agg(["count", "max", "sum"]).rename(
+        columns={"count": "n", "max": "max_s", "sum": "total_s"})
+    for p in PERCENTILES:
+        resumen[f"p{p}_s"] = grupos["segundos"].quantile(p / 100)
+    resumen["filas_mediana"] = grupos["filas"].median()
+    resumen["memoria_max_mb"] = grupos["memoria_mb"].max()
+    return resumen.reset_index()[columnas].sort_values("p90_s", ascending=False, ignore_index=True)
+
+
+def limpiar():
+    _registros.clear()
+
+
+def trazar_memoria(activar: bool):
+    """Enciende o apaga ``tracemalloc`` para todo el proceso."""
+    if activar and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not activar and tracemalloc.is_tracing():
+        tracemalloc.stop()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Agregados de egresos hospitalarios de la RM para el dashboard.
+
+``data_egresos.py`` deja los egresos en un almacenamiento Parquet con tipos compactos
+(``TIPO_EDAD`` int8, ``EDAD_CANT`` int16, ``COMUNA`` y ``DIAG1`` categóricas y banderas booleanas).
+Aquí se reduce ese archivo, una sola vez por versión, a un cubo fecha × comuna con los conteos de
+cada indicador; el dashboard filtra y suma sobre el cubo sin volver a tocar los registros individuales.
+"""
+
+# %% 1. Importar librerías y rutas
+from functools import lru_cache
+
+import pandas as pd
+
+from cache_artefactos import version_archivo
+
+RUTA_EGRESOS = "data_egresos/eh_2024.parquet"
+RUTA_COMUNAS = "data_espacial/comunas_rm.csv"
+
+COLUMNAS_ALMACEN = ['date_ingreso', 'COMUNA', 'CARDIOVASCULAR', 'MAYOR_80', 'MENOR_1']
+
+# Indicador -> banderas que deben cumplirse (lista vacía = todos los egresos)
+indicadores_egresos = {
+    'Total': [],
+    'Cardiovascular': ['CARDIOVASCULAR'],
+    'Cardiovascular mayores de 80': ['CARDIOVASCULAR', 'MAYOR_80'],
+    'Cardiovascular menores de 1': ['CARDIOVASCULAR', 'MENOR_1'],
+}
+
+
+# %% 2. Cubo fecha × comuna
+def nombres_comunas(ruta: str = RUTA_COMUNAS) -> pd.Series:
+    """Nombre de cada comuna de la RM indexado por su código (texto, p. ej. ``'13101'``)."""
+    comunas = pd.read_csv(ruta, dtype={'codigo': str})
+    return comunas.set_index('codigo')['comuna']
+
+
+@lru_cache(maxsize=2)
+def _cubo_egresos(ruta: str, version: tuple) -> pd.DataFrame:
+    df = pd.read_parquet(ruta, columns=COLUMNAS_ALMACEN)
+    conteos = pd.DataFrame({'fecha': df['date_ingreso'], 'COMUNA': df['COMUNA']})
+    for indicador, banderas in indicadores_egresos.items():
+        marca = pd.Series(True, index=df.index)
+        for bandera in banderas:
+            marca &= df[bandera]
+        conteos[indicador] = marca.astype('int32')
+    cubo = conteos.groupby(['fecha', 'COMUNA'], observed=True).sum().reset_index()
+    cubo['Nombre comuna'] = cubo['COMUNA'].astype(str).map(nombres_comunas()).fillna(cubo['COMUNA'].astype(str))
+    return cubo
+
+
+def versiones_entradas(ruta: str = RUTA_EGRESOS) -> tuple:
+    """Versión de cada archivo que lee el cubo: los egresos y los nombres de las comunas."""
+    return tuple(version_archivo(r) for r in (ruta, RUTA_COMUNAS))
+
+
+def cubo_egresos(ruta: str = RUTA_EGRESOS) -> pd.DataFrame:
+    """
+    Egresos por fecha de ingreso y comuna, con una columna de conteo por indicador de
+    ``indicadores_egresos``. Se recalcula solo cuando cambia el archivo publicado.
+    """
+    return _cubo_egresos(ruta, version_archivo(ruta))
+
+
+def serie_diaria(cubo: pd.DataFrame) -> pd.DataFrame:
+    """Suma el cubo sobre las comunas: una fila por día (sin huecos) y una columna por indicador."""
+    diario = cubo.groupby('fecha')[list(indicadores_egresos)].sum()
+    return diario.asfreq('D', fill_value=0).rename_axis('fecha').reset_index()
+
+
+def por_comuna(cubo: pd.DataFrame) -> pd.DataFrame:
+    """Suma el cubo sobre las fechas: una fila por comuna y una columna por indicador."""
+    return cubo.groupby(['COMUNA', 'Nombre comuna'], observed=True)[list(indicadores_egresos)].sum().reset_index()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Agregación espacial por comuna de residencia y capa de mapa para pydeck.
+
+Los egresos hospitalarios y las defunciones se acumulan en un arreglo comuna × día (una fila por
+comuna de ``data_espacial/comunas_rm.csv``, una columna por día del calendario) con un solo
+``np.bincount`` por indicador. La geometría se prepara una sola vez y queda en caché:
+    - Centroides aproximados de cada comuna (cabecera comunal), incluidos en ``comunas_rm.csv``.
+    - Si existe ``data_espacial/comunas_rm.geojson`` (polígonos con la propiedad ``codigo``), se usa
+      además una capa coroplética: los polígonos se leen, validan y convierten una sola vez en una
+      tabla con un anillo exterior (y sus huecos) por fila (``geometria_poligonos``).
+Al recorrer las fechas solo cambian los arreglos de valores y colores por comuna, que se asocian a
+esa geometría por posición: el GeoJSON no se vuelve a armar.
+"""
+
+# %% 1. Importar librerías y rutas
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache_artefactos import version_archivo
+from lector_csv import detectar, leer
+from egresos import RUTA_EGRESOS, RUTA_COMUNAS, cubo_egresos, indicadores_egresos
+
+RUTA_DEFUNCIONES = "data_defunciones/defunciones_2024.csv"
+RUTA_POLIGONOS = "data_espacial/comunas_rm.geojson"
+
+# Fuente -> indicadores disponibles en el arreglo comuna × día
+indicadores_espaciales = {
+    'Egresos hospitalarios': list(indicadores_egresos),
+    'Defunciones': ['Total', 'Cardiovascular'],
+}
+
+# Escala de color (de bajo a alto) para las capas del mapa
+PALETA = np.array([[255, 255, 178], [254, 204, 92], [253, 141, 60], [240, 59, 32], [189, 0, 38]])
+
+
+# %% 2. Comunas y arreglo comuna × día
+@lru_cache(maxsize=1)
+def _comunas(version: tuple) -> pd.DataFrame:
+    return pd.read_csv(RUTA_COMUNAS, dtype={'codigo': str})
+
+
+def comunas() -> pd.DataFrame:
+    """Comunas de la RM: ``codigo``, ``comuna``, ``provincia``, ``lat`` y ``lon``."""
+    return _comunas(version_archivo(RUTA_COMUNAS))
+
+
+def acumular(codigos: pd.Series, fechas: pd.Series, pesos=None, calendario: pd.DatetimeIndex = None):
+    """
+    Suma ``pesos`` (o cuenta eventos) en un arreglo comuna × día. Los códigos que no son comunas
+    de la RM y las fechas fuera del calendario se descartan. Devuelve ``(matriz, calendario)``.
+    """
+    codigos = codigos.astype(str).str.strip().str.replace(r'\.0$', '', regex=True).to_numpy()
+    fechas = pd.to_datetime(fechas, errors='coerce')
+    if calendario is None:
+        calendario = pd.date_range(fechas.min(), fechas.max(), freq='D', name='fecha')
+    tabla = comunas()
+    posicion_comuna = pd.Index(tabla['codigo']).get_indexer(codigos)
+    posicion_dia = calendario.get_indexer(pd.DatetimeIndex(fechas).normalize())
+    validos = (posicion_comuna >= 0) & (posicion_dia >= 0)
+    celdas = posicion_comuna[validos] * len(calendario) + posicion_dia[validos]
+    pesos = None if pesos is None else np.asarray(pesos, dtype=float)[validos]
+    matriz = np.bincount(celdas, weights=pesos, minlength=len(tabla) * len(calendario))
+    return matriz.reshape(len(tabla), len(calendario)), calendario
+
+
+@lru_cache(maxsize=2)
+def _arreglos_egresos(version: tuple) -> dict:
+    cubo = cubo_egresos()
+    calendario = pd.date_range(cubo['fecha'].min(), cubo['fecha'].max(), freq='D', name='fecha')
+    return {indicador: acumular(cubo['COMUNA'], cubo['fecha'], cubo[indicador], calendario)
+            for indicador in indicadores_egresos}
+
+
+@lru_cache(maxsize=2)
+def _arreglos_defunciones(version: tuple) -> dict:
+    if 'COMUNA' not in detectar(RUTA_DEFUNCIONES).columnas:
+        # Archivos generados antes de incluir la comuna de residencia en el ETL de defunciones
+        return {}
+    df = leer(RUTA_DEFUNCIONES, usecols=['COMUNA', 'CARDIOVASCULAR', 'DATE'], dtype={'COMUNA': str})
+    df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+    df = df.dropna(subset=['DATE'])
+    calendario = pd.date_range(df['DATE'].min(), df['DATE'].max(), freq='D', name='fecha')
+    cardiovascular = (df['CARDIOVASCULAR'].astype(str) == 'True').to_numpy()
+    return {
+        'Total': acumular(df['COMUNA'], df['DATE'], calendario=calendario),
+        'Cardiovascular': acumular(df['COMUNA'], df['DATE'], cardiovascular, calendario),
+    }
+
+
+def versiones_entradas() -> tuple:
+    """
+    Versión de cada archivo que leen los arreglos comuna × día: egresos, defunciones y comunas
+    (``None`` si un archivo no existe).
+    """
+    rutas = (RUTA_EGRESOS, RUTA_DEFUNCIONES, RUTA_COMUNAS)
+    return tuple(version_archivo(r) if os.path.exists(r) else None for r in rutas)
+
+
+def arreglo_comuna_dia(fuente: str, indicador: str):
+    """
+    Arreglo comuna × día del indicador, en el orden de filas de ``comunas()``, junto al calendario
+    de sus columnas. Devuelve ``(None, None)`` si la fuente no está disponible.
+    """
+    if fuente == 'Egresos hospitalarios':
+        if not os.path.exists(RUTA_EGRESOS):
+            return None, None
+        arreglos = _arreglos_egresos(version_archivo(RUTA_EGRESOS))
+    else:
+        arreglos = _arreglos_defunciones(version_archivo(RUTA_DEFUNCIONES))
+    return arreglos.get(indicador, (None, None))
+
+
+# %% 3. Geometría en caché y valores por día
+@lru_cache(maxsize=1)
+def _poligonos(version: tuple) -> tuple:
+    with open(RUTA_POLIGONOS, encoding='utf-8') as f:
+        capa = json.load(f)
+    geometrias = {str(entidad['properties']['codigo']): entidad['geometry'] for entidad in capa['features']}
+    # Mismo orden que comunas(); las comunas sin polígono quedan fuera
+    return tuple((i, geometrias[codigo]) for i, codigo in enumerate(comunas()['codigo']) if codigo in geometrias)
+
+
+def poligonos():
+    """Pares ``(fila, geometría)`` de los polígonos comunales, o ``None`` si no hay archivo de polígonos."""
+    if not os.path.exists(RUTA_POLIGONOS):
+        return None
+    return _poligonos(version_archivo(RUTA_POLIGONOS))
+
+
+@lru_cache(maxsize=1)
+def _geometria_poligonos(version: tuple) -> pd.DataFrame:
+    filas, partes = [], []
+    for fila, geometria in _poligonos(version):
+        # Un MultiPolygon aporta una fila por polígono; cada polígono es su lista de anillos
+        poligonos_comuna = [geometria['coordinates']] if geometria['type'] == 'Polygon' else geometria['coordinates']
+        filas += [fila] * len(poligonos_comuna)
+        partes += poligonos_comuna
+    return pd.DataFrame({'fila': np.asarray(filas, dtype=int), 'poligono': partes})
+
+
+def geometria_poligonos():
+    """
+    Polígonos comunales para la ``PolygonLayer`` (``fila`` de ``comunas()`` y ``poligono``), preparados
+    una sola vez por versión del archivo; ``None`` si no hay archivo de polígonos.
+    """
+    if not os.path.exists(RUTA_POLIGONOS):
+        return None
+    return _geometria_poligonos(version_archivo(RUTA_POLIGONOS))
+
+
+def colores(valores: np.ndarray, maximo: float) -> np.ndarray:
+    """Color RGB de cada valor interpolando la paleta entre 0 y ``maximo``."""
+    fraccion = np.clip(valores / maximo, 0, 1) if maximo > 0 else np.zeros_like(valores, dtype=float)
+    posicion = fraccion * (len(PALETA) - 1)
+    return np.column_stack([np.interp(posicion, np.arange(len(PALETA)), PALETA[:, canal]) for canal in range(3)]).astype(int)
+
+
+def datos_dia(valores: np.ndarray, maximo: float) -> pd.DataFrame:
+    """Centroides de las comunas con el valor del día y su color (la geometría base no se recalcula)."""
+    datos = comunas()[['codigo', 'comuna', 'lat', 'lon']].copy()
+    datos['valor'] = valores
+    datos[['r', 'g', 'b']] = colores(valores, maximo)
+    return datos
+
+
+def capas_mapa(valores: np.ndarray, maximo: float) -> list:
+    """
+    Capas pydeck para los valores de un día: coroplética si hay polígonos y, siempre, un mapa de
+    calor y círculos proporcionales sobre los centroides.
+    """
+    import pydeck as pdk
+
+    datos = datos_dia(valores, maximo)
+    capas = []
+    geometria = geometria_poligonos()
+    if geometria is not None:
+        # La geometría en caché no se copia: solo se le asocian los arreglos del día por fila de comuna
+        filas = geometria['fila'].to_numpy()
+        del_dia = geometria.assign(**{columna: datos[columna].to_numpy()[filas]
+                                      for columna in ('comuna', 'valor', 'r', 'g', 'b')})
+        capas.append(pdk.Layer('PolygonLayer', del_dia, get_polygon='poligono', get_fill_color=['r', 'g', 'b', 160],
+                               get_line_color=[80, 80, 80], stroked=True, line_width_min_pixels=1, pickable=True))
+    capas.append(pdk.Layer('HeatmapLayer', datos, get_position=['lon', 'lat'], get_weight='valor',
+                           radius_pixels=60, opacity=0.5))
+    escala = 2500 / np.sqrt(maximo) if maximo > 0 else 0
+    capas.append(pdk.Layer('ScatterplotLayer', datos.assign(radio=np.sqrt(datos['valor']) * escala),
+                           get_position=['lon', 'lat'], get_radius='radio', get_fill_color=['r', 'g', 'b', 200],
+                           pickable=True))
+    return capas
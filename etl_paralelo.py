@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Procesamiento en paralelo de los archivos nacionales (un archivo por año) para los ETL.
+
+Cada archivo se procesa en su propio proceso: se lee por bloques de ``FILAS_POR_BLOQUE`` filas
+(solo las columnas necesarias, con el separador y la codificación que detecta ``lector_csv.py``),
+se filtra la Región Metropolitana y se pre-agrega cada bloque, de modo que la memoria de un proceso
+no depende del tamaño del archivo. El proceso principal solo
+recibe los agregados parciales (o las filas de la región) y los combina. Así, recalcular diez años
+de historia usa todos los núcleos en lugar de leer los archivos uno tras otro.
+
+    - ``procesar(funcion, tareas)`` reparte las tareas en un pool de ``PROCESOS`` procesos
+      (variable de entorno ``ETL_PROCESOS``, por defecto uno por núcleo).
+    - Las funciones de cada conjunto de datos (``defunciones_rm``, ``urgencias_rm``) viven en este
+      módulo para que los procesos del pool puedan importarlas.
+
+Los procesos se crean con ``spawn`` en todos los sistemas (es el único método en Windows): cada uno
+importa el script que lanzó el pool, por lo que los ETL ejecutan su flujo bajo
+``if __name__ == '__main__':``.
+"""
+
+# %% 1. Importar librerías y parámetros
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import lector_csv
+from grupos_causa import marcas_defunciones
+
+PROCESOS = int(os.environ.get("ETL_PROCESOS", os.cpu_count() or 1))
+FILAS_POR_BLOQUE = 250_000
+REGION = 13  # Región Metropolitana de Santiago
+ENCODING = 'latin-1'  # codificación de los archivos nacionales cuando el encabezado no la delata
+
+
+def bloques(ruta: str, columnas: list):
+    """
+    Lee ``ruta`` por bloques de ``FILAS_POR_BLOQUE`` filas con solo las ``columnas`` indicadas;
+    ``lector_csv.ErrorFormato`` si el archivo no las tiene.
+    """
+    yield from lector_csv.bloques(ruta, FILAS_POR_BLOQUE, encoding=ENCODING, usecols=columnas)
+
+
+def numerica(columna: pd.Series) -> pd.Series:
+    """
+    ``columna`` como número (``NaN`` lo que no se puede leer). pandas infiere el tipo en cada bloque
+    por separado: basta un valor no numérico para que un bloque traiga la columna como texto y las
+    comparaciones con números no encuentren ninguna fila.
+    """
+    return pd.to_numeric(columna, errors='coerce')
+
+
+# %% 2. Reparto de tareas en procesos
+def procesar(funcion, tareas: list, procesos: int = None) -> list:
+    """
+    Resultados de ``funcion(*tarea)`` para cada tarea (en el orden de ``tareas``). Con una sola
+    tarea o un solo proceso se ejecuta en el proceso actual, sin pool.
+    """
+    procesos = min(procesos or PROCESOS, len(tareas))
+    if procesos <= 1:
+        return [funcion(*tarea) for tarea in tareas]
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futuros = [pool.submit(funcion, *tarea) for tarea in tareas]
+        return [futuro.result() for futuro in futuros]
+
+
+# %% 3. Defunciones
+rangos_edad = {'bins': [-1, 0, 79, float('inf')], 'labels': ['Menor 1 año', '1 a 79', '80 y mas']}
+
+
+def sumar_conteos(partes: list) -> pd.DataFrame:
+    """Suma conteos parciales con el mismo índice (fecha y rango de edad) y las mismas columnas."""
+    conteos = pd.concat(partes)
+    return conteos.groupby(level=list(range(conteos.index.nlevels)), observed=False).sum()
+
+
+def defunciones_rm(ruta: str, columnas: list, filas: bool = True) -> tuple:
+    """
+    Defunciones con residencia en la región de un archivo nacional: ``(filas, conteos)``.
+
+    ``filas`` son las defunciones de la región con la edad de los menores de un año en 0,
+    ``CARDIOVASCULAR`` y ``DATE`` (``None`` si ``filas=False``, cuando solo interesan los conteos).
+    ``conteos`` tiene, por ``DATE`` y ``RANGO_EDAD``, las defunciones de cada grupo de causa
+    (``grupos_causa.py``) y ``Total`` (todas las causas).
+    """
+    partes_filas, partes_conteos = [], []
+    for bloque in bloques(ruta, columnas):
+        bloque = bloque[numerica(bloque['REG_RES']) == REGION].copy()
+        bloque['EDAD_CANT'] = numerica(bloque['EDAD_CANT'])
+        bloque.loc[numerica(bloque['EDAD_TIPO']).isin([2, 3, 4]), 'EDAD_CANT'] = 0
+        marcas = marcas_defunciones(bloque['DIAG1'])
+        bloque['CARDIOVASCULAR'] = marcas['CARDIOVASCULAR']
+        fecha = bloque[['ANO_DEF', 'MES_DEF', 'DIA_DEF']].set_axis(['year', 'month', 'day'], axis=1)
+        bloque['DATE'] = pd.to_datetime(fecha, errors='coerce')
+        rango_edad = pd.cut(bloque['EDAD_CANT'], **rangos_edad)
+        conteos = marcas.assign(Total=True).groupby([bloque['DATE'], rango_edad], observed=False).sum()
+        partes_conteos.append(conteos.rename_axis(['DATE', 'RANGO_EDAD']))
+        if filas:
+            partes_filas.append(bloque)
+    return (pd.concat(partes_filas) if filas else None), sumar_conteos(partes_conteos)
+
+
+# %% 4. Atenciones de urgencia
+claves_urgencia = ['GLOSATIPOESTABLECIMIENTO', 'fecha', 'IdCausa', 'Causa']
+columnas_urgencia = ['Total', 'Menores_1', 'De_1_a_4', 'De_5_a_14', 'De_15_a_64', 'De_65_y_mas']
+
+
+def urgencias_rm(ruta: str, causas: dict) -> pd.DataFrame:
+    """
+    Atenciones de urgencia de la región en un archivo nacional para las ``causas`` (IdCausa -> texto
+    de ``Causa``), sumadas por tipo de establecimiento, fecha (texto ``dd/mm/aaaa``) y causa.
+    """
+    leidas = ['CodigoRegion', 'GLOSATIPOESTABLECIMIENTO', 'fecha', 'IdCausa'] + columnas_urgencia
+    partes = []
+    for bloque in bloques(ruta, leidas):
+        id_causa = numerica(bloque['IdCausa'])
+        region = (numerica(bloque['CodigoRegion']) == REGION) & id_causa.isin(causas.keys())
+        bloque = bloque.loc[region].assign(IdCausa=id_causa[region].astype('int64'))
+        bloque = bloque.assign(Causa=bloque['IdCausa'].map(causas))
+        partes.append(bloque.groupby(claves_urgencia)[columnas_urgencia].sum())
+    return pd.concat(partes).groupby(level=claves_urgencia).sum().reset_index()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Estimación del exceso de defunciones y de atenciones de urgencia durante los episodios de
+Alerta Amarilla/Roja.
+
+Para cada serie diaria se compara lo observado con una línea base estacional:
+    - Defunciones de 80 y más y menores de 1 año: el valor central del corredor endémico
+      (Zona de éxito + Zona de seguridad) en las fechas que cubre el corredor.
+    - Resto de las series y fechas: un modelo de Poisson con tendencia, armónicos anuales y día de la
+      semana, ajustado solo con los días fuera de alerta.
+
+El exceso se agrega por episodio de alerta y su intervalo de confianza se obtiene por bootstrap
+paramétrico (coeficientes de la línea base + ruido de Poisson), simulado en lotes vectorizados.
+"""
+
+# %% 1. Importar librerías y parámetros
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from datos_base import temperaturas, corredor as planilla_corredor
+from metricas_exposicion import RUTA_TEMPERATURAS, version_archivo, evaluar_alertas, rachas
+from analisis_rezagos import (RUTA_URGENCIAS, RUTA_DEFUNCIONES, cubo_urgencias, cubo_defunciones,
+                              matriz_confusores, ajustar_poisson)
+
+DIAS_POSTERIORES = 3     # días después del episodio incluidos (efecto rezagado)
+DIAS_EXCLUIDOS = 7       # días posteriores a una alerta que no se usan para ajustar la línea base
+N_BOOTSTRAP = 2000
+TAMANO_LOTE = 500        # réplicas simuladas por lote (acota la memoria a lote × días)
+SEMILLA = 2024
+
+# Series sobre las que se estima el exceso: (fuente, causa, edad)
+series_exceso = [
+    ('Defunciones', 'Total defunciones', 'Total'),
+    ('Defunciones', 'Total defunciones', '80 y mas'),
+    ('Defunciones', 'Total defunciones', 'Menor 1 año'),
+    ('Defunciones', 'Cardiovascular', 'Total'),
+    ('Atenciones de urgencia', 'Total Sistema Circulatorio', 'Total'),
+    ('Atenciones de urgencia', 'Total Sistema Circulatorio', 'De_65_y_mas'),
+]
+
+# Corredores endémicos disponibles por grupo de edad de defunciones
+corredores = {
+    '80 y mas': 'data_corredor_endemico/corredor_endemico_mayor80.xlsx',
+    'Menor 1 año': 'data_corredor_endemico/corredor_endemico_menor1.xlsx',
+}
+
+
+# %% 2. Episodios de alerta
+def episodios_alerta(ruta: str = RUTA_TEMPERATURAS) -> tuple:
+    """
+    Devuelve la serie diaria de alertas SEREMI y la tabla de episodios (rachas de días en
+    Alerta Amarilla o Roja), con el nivel máximo alcanzado en cada uno.
+    """
+    df = temperaturas(ruta)[['date', 't_max']]
+    df = df.groupby('date', as_index=False)['t_max'].mean()
+    df = df.set_index('date').asfreq('D').reset_index()
+    alertas = evaluar_alertas(df)
+    en_alerta = alertas['alerta'].isin(['Alerta Amarilla', 'Alerta Roja']).to_numpy()
+    inicios, finales = rachas(en_alerta)
+    roja = (alertas['alerta'] == 'Alerta Roja').to_numpy()
+    episodios = pd.DataFrame({
+        'inicio': alertas['date'].to_numpy()[inicios],
+        'fin': alertas['date'].to_numpy()[finales],
+        'dias_alerta': finales - inicios + 1,
+        'nivel': np.where([roja[i:f + 1].any() for i, f in zip(inicios, finales)], 'Alerta Roja', 'Alerta Amarilla'),
+    })
+    return alertas, episodios
+
+
+# %% 3. Línea base estacional
+def linea_base_modelo(y: np.ndarray, fechas: pd.DatetimeIndex, excluir: np.ndarray):
+    """
+    Ajusta la línea base de Poisson con los días no excluidos. Devuelve la matriz de diseño,
+    los coeficientes y su covarianza, para predecir y simular sobre todas las fechas.
+    """
+    X = matriz_confusores(fechas)
+    usar = ~excluir & np.isfinite(y)
+    beta, covarianza, _ = ajustar_poisson(X[usar], y[usar])
+    return X, beta, covarianza
+
+
+def linea_base_corredor(edad: str, fechas: pd.DatetimeIndex) -> np.ndarray:
+    """Valor central del corredor endémico (NaN fuera de las fechas que cubre)."""
+    if edad not in corredores:
+        return np.full(len(fechas), np.nan)
+    corredor = planilla_corredor(corredores[edad])
+    corredor['Fecha'] = pd.to_datetime(corredor['Fecha'])
+    central = (corredor['Zona de éxito'] + corredor['Zona de seguridad']).to_numpy()
+    return pd.Series(central, index=corredor['Fecha']).reindex(fechas).to_numpy()
+
+
+# %% 4. Bootstrap vectorizado por episodio
+def matriz_episodios(fechas: pd.DatetimeIndex, episodios: pd.DataFrame,
+                     dias_posteriores: int = DIAS_POSTERIORES) -> np.ndarray:
+    """
+    Matriz indicadora días × episodios (cada episodio extendido ``dias_posteriores`` días). La
+    extensión se corta el día antes del inicio del episodio siguiente, de modo que cada día cuenta
+    para un solo episodio y la suma de los excesos por episodio no supera el total.
+    """
+    valores = fechas.to_numpy()
+    inicio = episodios['inicio'].to_numpy()
+    fin = (episodios['fin'] + pd.Timedelta(days=dias_posteriores)).to_numpy()
+    inicios = np.sort(inicio)
+    siguiente = np.searchsorted(inicios, inicio, side='right')
+    con_siguiente = siguiente < len(inicios)
+    corte = inicios[np.minimum(siguiente, len(inicios) - 1)] - np.timedelta64(1, 'D')
+    fin = np.where(con_siguiente, np.minimum(fin, corte), fin)
+    return ((valores[:, None] >= inicio[None, :]) & (valores[:, None] <= fin[None, :])).astype(float)
+
+
+def simular_esperados(X, beta, covarianza, base_fija, indicadora, rng,
+                      n_bootstrap: int = N_BOOTSTRAP, tamano_lote: int = TAMANO_LOTE) -> np.ndarray:
+    """
+    Simula los conteos esperados sumados por episodio (n_bootstrap × episodios).
+    En cada lote se sortean coeficientes de la línea base desde su distribución normal aproximada,
+    se reemplazan por el corredor donde exista y se agrega ruido de Poisson; todo con operaciones
+    matriciales sobre el lote completo.
+    """
+    usa_corredor = np.isfinite(base_fija)
+    # Solo interesan los días que caen dentro de algún episodio
+    dias = indicadora.any(axis=1)
+    X, base_fija, usa_corredor, indicadora = X[dias], base_fija[dias], usa_corredor[dias], indicadora[dias]
+    sumas = []
+    for inicio in range(0, n_bootstrap, tamano_lote):
+        lote = min(tamano_lote, n_bootstrap - inicio)
+        betas = rng.multivariate_normal(beta, covarianza, size=lote)         # lote × p
+        mu = np.exp(betas @ X.T)                                             # lote × días
+        mu[:, usa_corredor] = base_fija[usa_corredor]
+        conteos = rng.poisson(mu)
+        sumas.append(conteos @ indicadora)                                   # lote × episodios
+    return np.vstack(sumas)
+
+
+def estimar_exceso(y: np.ndarray, fechas: pd.DatetimeIndex, alertas: pd.DataFrame,
+                   episodios: pd.DataFrame, edad: str = None,
+                   dias_posteriores: int = DIAS_POSTERIORES, n_bootstrap: int = N_BOOTSTRAP,
+                   semilla: int = SEMILLA) -> pd.DataFrame:
+    """
+    Exceso observado − esperado por episodio de alerta para una serie diaria ``y``, con IC 95%.
+    """
+    y = np.asarray(y, dtype=float)
+    en_alerta = alertas.set_index('date')['alerta'].reindex(fechas).isin(['Alerta Amarilla', 'Alerta Roja'])
+    # Se excluyen de la línea base los días en alerta y los posteriores (efecto rezagado)
+    excluir = en_alerta.astype(int).rolling(DIAS_EXCLUIDOS + 1, min_periods=1).max().astype(bool).to_numpy()
+
+    X, beta, covarianza = linea_base_modelo(y, fechas, excluir)
+    base_fija = linea_base_corredor(edad, fechas) if edad else np.full(len(fechas), np.nan)
+    esperado = np.where(np.isfinite(base_fija), base_fija, np.exp(X @ beta))
+
+    episodios = episodios[(episodios['inicio'] >= fechas.min()) & (episodios['fin'] <= fechas.max())]
+    episodios = episodios.reset_index(drop=True)
+    if episodios.empty:
+        return episodios.assign(observados=[], esperados=[], exceso=[], ic_inf=[], ic_sup=[], exceso_pct=[])
+    indicadora = matriz_episodios(fechas, episodios, dias_posteriores)
+    observados = np.nan_to_num(y) @ indicadora
+    esperados = esperado @ indicadora
+
+    rng = np.random.default_rng(semilla)
+    simulados = simular_esperados(X, beta, covarianza, base_fija, indicadora, rng, n_bootstrap)
+    excesos = observados[None, :] - simulados
+    resultado = episodios.copy()
+    resultado['observados'] = observados
+    resultado['esperados'] = esperados
+    resultado['exceso'] = observados - esperados
+    resultado['ic_inf'] = np.percentile(excesos, 2.5, axis=0)
+    resultado['ic_sup'] = np.percentile(excesos, 97.5, axis=0)
+    resultado['exceso_pct'] = 100 * resultado['exceso'] / esperados
+    return resultado
+
+
+# %% 5. Tabla completa en caché
+@lru_cache(maxsize=4)
+def _exceso_por_episodio(versiones: tuple, dias_posteriores: int) -> pd.DataFrame:
+    alertas, episodios = episodios_alerta()
+    cubos = {'Atenciones de urgencia': cubo_urgencias(), 'Defunciones': cubo_defunciones()}
+    resultados = []
+    for fuente, causa, edad in series_exceso:
+        cubo = cubos[fuente]
+        if (causa, edad) not in cubo.columns:
+            continue
+        serie = cubo[(causa, edad)]
+        resultado = estimar_exceso(serie.to_numpy(), serie.index, alertas, episodios,
+                                   edad=edad if fuente == 'Defunciones' else None,
+                                   dias_posteriores=dias_posteriores)
+        resultado.insert(0, 'edad', edad)
+        resultado.insert(0, 'causa', causa)
+        resultado.insert(0, 'fuente', fuente)
+        resultados.append(resultado)
+    return pd.concat(resultados, ignore_index=True)
+
+
+def versiones_entradas() -> tuple:
+    """
+    Versión de cada archivo que lee el cálculo del exceso: las series, las temperaturas y los
+    corredores endémicos que sirven de línea base (``None`` si un corredor no existe).
+    """
+    rutas = (RUTA_URGENCIAS, RUTA_DEFUNCIONES, RUTA_TEMPERATURAS) + tuple(corredores.values())
+    return tuple(version_archivo(r) if os.path.exists(r) else None for r in rutas)
+
+
+def exceso_por_episodio(dias_posteriores: int = DIAS_POSTERIORES) -> pd.DataFrame:
+    """Exceso por episodio de alerta para todas las series, en caché según la versión de los archivos."""
+    return _exceso_por_episodio(versiones_entradas(), dias_posteriores).copy()
+
+
+# %%
+if __name__ == '__main__':
+    print(exceso_por_episodio().to_string(index=False))
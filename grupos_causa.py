@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de grupos de causa vigilados por el visor.
+
+Cada grupo declara en un solo lugar cómo se reconoce en cada fuente:
+    - ``cie10``: intervalos de categorías CIE-10 de la causa básica de defunción (``DIAG1``).
+    - ``ids_urgencia``: IdCausa de la estadística de atenciones de urgencia (REM) con el texto
+      que queda en ``Causa``.
+
+El registro alimenta:
+    - los ETL: ``data_defunciones.py`` marca y agrega todos los grupos en la misma pasada por el
+      archivo nacional, y ``data_atenciones_urgencias_circulatorio.py`` conserva los IdCausa de todos
+      los grupos;
+    - los dashboards: los cubos de ``analisis_rezagos.py`` (y con ellos exposición–respuesta y la capa
+      de series derivadas) y el selector de grupo de causa de la página de defunciones.
+
+Agregar una serie (por ejemplo, insuficiencia renal) es agregar un ``GrupoCausa`` aquí; no requiere
+otra lectura de los archivos nacionales.
+"""
+
+# %% 1. Importar librerías y definir el registro
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from cie10 import codificar, mascara
+
+
+@dataclass(frozen=True)
+class GrupoCausa:
+    """
+    Grupo de causas. ``nombre`` es la etiqueta de sus series en los dashboards y ``columna`` el
+    nombre de su columna en las salidas de los ETL.
+    """
+    nombre: str
+    columna: str
+    cie10: list = field(default_factory=list)
+    ids_urgencia: dict = field(default_factory=dict)
+
+    @property
+    def texto_cie10(self) -> str:
+        """Intervalos CIE-10 como texto (``'T67, X30, E86'``, ``'I00-I99'``)."""
+        return ', '.join(desde if desde == hasta else f'{desde}-{hasta}' for desde, hasta in self.cie10)
+
+    @property
+    def etiqueta(self) -> str:
+        return f'{self.nombre} ({self.texto_cie10})' if self.cie10 else self.nombre
+
+
+registro = [
+    GrupoCausa('Cardiovascular', 'CARDIOVASCULAR', [('I00', 'I99')], {
+        12: 'Atenciones de urgencia - Total Sistema Circulatorio',
+        13: 'Atenciones de urgencia - Infarto agudo miocardio',
+        14: 'Atenciones de urgencia - Accidente vascular encefálico',
+        15: 'Atenciones de urgencia - Crisis hipertensiva',
+        16: 'Atenciones de urgencia - Arritmia grave',
+        17: 'Atenciones de urgencia - Otras causas circulatorias',
+        22: 'Hospitalizaciones - CAUSAS SISTEMA CIRCULATORIO',
+    }),
+    GrupoCausa('Respiratorio', 'RESPIRATORIO', [('J00', 'J99')], {
+        2: 'Atenciones de urgencia - Total Sistema Respiratorio',
+        7: 'Hospitalizaciones - CAUSAS SISTEMA RESPIRATORIO',
+    }),
+    GrupoCausa('Relacionadas con el calor', 'CALOR', [('T67', 'T67'), ('X30', 'X30'), ('E86', 'E86')]),
+    GrupoCausa('Efectos del calor', 'GOLPE_CALOR', [('T67', 'T67')]),
+    GrupoCausa('Exposición a calor natural excesivo', 'EXPOSICION_CALOR', [('X30', 'X30')]),
+    GrupoCausa('Deshidratación', 'DESHIDRATACION', [('E86', 'E86')]),
+    GrupoCausa('Insuficiencia renal aguda', 'RENAL_AGUDA', [('N17', 'N17')]),
+]
+
+PREFIJO_ATENCIONES = 'Atenciones de urgencia - '
+
+# Totales de la estadística de urgencias que se conservan siempre (denominadores de los porcentajes)
+totales_urgencia = {
+    1: 'Atenciones de urgencia - Total',
+    25: 'Hospitalizaciones - Total',
+}
+
+
+# %% 2. Consultas
+def grupos_defunciones() -> list:
+    """Grupos que se reconocen en las defunciones (tienen intervalos CIE-10)."""
+    return [grupo for grupo in registro if grupo.cie10]
+
+
+def marcas_defunciones(diagnosticos: pd.Series) -> pd.DataFrame:
+    """
+    Una columna booleana por grupo de ``grupos_defunciones`` (con el nombre de ``columna``) para una
+    columna de códigos ``DIAG1``; los códigos se interpretan una sola vez (``cie10.codificar``).
+    """
+    codigos = codificar(diagnosticos)
+    return pd.DataFrame({grupo.columna: mascara(codigos, grupo.cie10) for grupo in grupos_defunciones()},
+                        index=diagnosticos.index)
+
+
+def causas_urgencia() -> dict:
+    """IdCausa -> texto de ``Causa`` de todas las series de urgencia del registro, totales incluidos."""
+    causas = dict(totales_urgencia)
+    for grupo in registro:
+        causas.update(grupo.ids_urgencia)
+    return causas
+
+
+def atenciones_por_grupo() -> dict:
+    """IdCausa -> nombre corto de las atenciones de urgencia de los grupos (sin hospitalizaciones ni totales)."""
+    return {id_causa: texto[len(PREFIJO_ATENCIONES):]
+            for grupo in registro for id_causa, texto in grupo.ids_urgencia.items()
+            if texto.startswith(PREFIJO_ATENCIONES)}
+
+
+def grupo(nombre: str) -> GrupoCausa:
+    """El grupo del registro con ese ``nombre`` o ``etiqueta``."""
+    for candidato in registro:
+        if nombre in (candidato.nombre, candidato.etiqueta):
+            return candidato
+    raise KeyError(nombre)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Lectura de archivos CSV con detección de formato y validación de columnas.
+
+Los archivos fuente no son uniformes: ``DEF2024.csv`` usa ``|`` y ``DEF2025.csv`` usa ``;``, ambos en
+latin-1, y los archivos generados por los ETL usan ``|`` o ``,``. Leer con el separador equivocado no
+falla: produce un DataFrame de una sola columna que recién revienta más adelante con un ``KeyError``
+poco claro. Aquí, antes de leer:
+
+    - ``detectar`` mira los primeros ``BYTES_MUESTRA`` bytes y deduce la codificación (BOM, UTF-8 o
+      latin-1), el separador (``| ; , tab``: el que divide todas las líneas en el mismo número de
+      campos) y si la primera línea es un encabezado.
+    - Si se indican las ``columnas`` esperadas, se validan contra el encabezado: si falta alguna se
+      lanza ``ErrorFormato`` con las columnas faltantes, las encontradas y el formato detectado.
+    - ``leer`` usa el lector CSV de pyarrow (multihilo) cuando está instalado y las opciones lo
+      permiten (``usecols`` y ``dtype=str``), y el de pandas en los demás casos; ``bloques`` lee por
+      bloques con el de pandas. El resultado es el mismo que el de ``pd.read_csv``.
+"""
+
+# %% 1. Importar librerías y parámetros
+import codecs
+import csv
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # sin pyarrow se usa siempre el lector de pandas
+    pa = None
+
+BYTES_MUESTRA = 64 * 1024
+LINEAS_MUESTRA = 200
+separadores = '|;,\t'
+opciones_pyarrow = {'usecols', 'dtype'}
+
+
+class ErrorFormato(ValueError):
+    """El archivo no tiene el formato o las columnas esperadas."""
+
+
+@dataclass(frozen=True)
+class Formato:
+    """Formato detectado de un CSV. ``columnas`` son las del encabezado (o las esperadas si no tiene)."""
+    sep: str
+    encoding: str
+    encabezado: bool
+    columnas: tuple
+
+    def __str__(self) -> str:
+        sep = {'\t': 'tab'}.get(self.sep, self.sep)
+        return f"separador '{sep}', codificación {self.encoding}, {'con' if self.encabezado else 'sin'} encabezado"
+
+
+# %% 2. Detección del formato
+def _encoding(muestra: bytes, supuesto: str) -> str:
+    if muestra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if muestra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    if muestra.isascii():
+        # Un encabezado solo ASCII no distingue UTF-8 de latin-1: vale la codificación supuesta
+        return supuesto
+    try:
+        muestra.decode('utf-8')
+    except UnicodeDecodeError as error:
+        # Un carácter cortado al final de la muestra no descarta UTF-8
+        if error.start < len(muestra) - 3:
+            return 'latin-1'
+    return 'utf-8'
+
+
+def _separador(lineas: list):
+    """El separador que divide más líneas en el mismo número (> 1) de campos; ``None`` si ninguno."""
+    mejor, mejor_puntaje = None, (0, 0)
+    for sep in separadores:
+        campos = [len(fila) for fila in csv.reader(lineas, delimiter=sep)]
+        if not campos:
+            continue
+        valores, frecuencias = np.unique(campos, return_counts=True)
+        comun = valores[frecuencias.argmax()]
+        puntaje = (frecuencias.max() / len(campos), comun)
+        if comun > 1 and puntaje > mejor_puntaje:
+            mejor, mejor_puntaje = sep, puntaje
+    return mejor
+
+
+def _es_numero(texto: str) -> bool:
+    try:
+        float(texto.replace(',', '.'))
+        return True
+    except ValueError:
+        return False
+
+
+def _tiene_encabezado(filas: list, columnas) -> bool:
+    primera = [campo.strip() for campo in filas[0]]
+    if columnas:
+        return bool(set(columnas) & set(primera)) or len(primera) != len(columnas)
+    # Sin columnas esperadas: la primera línea es encabezado si ninguno de sus campos es numérico
+    return not any(_es_numero(campo) for campo in primera if campo)
+
+
+def detectar(ruta: str, columnas=None, encoding: str = 'utf-8') -> Formato:
+    """
+    Formato de ``ruta`` según sus primeros ``BYTES_MUESTRA`` bytes. ``encoding`` es la codificación
+    supuesta cuando la muestra es solo ASCII. Si se indican ``columnas``, valida que estén todas.
+    """
+    with open(ruta, 'rb') as f:
+        muestra = f.read(BYTES_MUESTRA)
+    if not muestra.strip():
+        raise ErrorFormato(f"{ruta}: el archivo está vacío")
+    encoding = _encoding(muestra, encoding)
+    lineas = muestra.decode(encoding, errors='ignore').lstrip('\ufeff').splitlines()
+    if len(muestra) == BYTES_MUESTRA and len(lineas) > 1:
+        lineas = lineas[:-1]  # la última puede estar cortada
+    lineas = [linea for linea in lineas if linea.strip()][:LINEAS_MUESTRA]
+
+    sep = _separador(lineas)
+    if sep is None:
+        if columnas and len(columnas) > 1:
+            raise ErrorFormato(f"{ruta}: no se encontró un separador ({', '.join(map(repr, separadores))}) que "
+                               f"divida las líneas en columnas; primera línea: {lineas[0][:120]!r}")
+        sep = ','
+    filas = list(csv.reader(lineas, delimiter=sep))
+    encabezado = _tiene_encabezado(filas, columnas)
+    if encabezado:
+        nombres = tuple(filas[0])
+    elif columnas:
+        nombres = tuple(columnas)
+    else:
+        nombres = tuple(range(len(filas[0])))
+    formato = Formato(sep, encoding, encabezado, nombres)
+
+    faltantes = [c for c in (columnas or ()) if c not in nombres]
+    if faltantes:
+        raise ErrorFormato(f"{ruta}: faltan las columnas {faltantes}; se encontraron {list(nombres)} "
+                           f"({formato})")
+    return formato
+
+
+# %% 3. Lectura
+def _opciones_pandas(formato: Formato, opciones: dict) -> dict:
+    opciones = dict(sep=formato.sep, encoding=formato.encoding, **opciones)
+    if not formato.encabezado:
+        opciones.update(header=None, names=list(formato.columnas))
+    return opciones
+
+
+def _esperadas(columnas, opciones: dict) -> list:
+    """Columnas esperadas más las de ``usecols`` (si es una lista de nombres), para validarlas juntas."""
+    esperadas = list(columnas or [])
+    usecols = opciones.get('usecols')
+    if usecols is not None and not callable(usecols):
+        esperadas += [c for c in usecols if isinstance(c, str) and c not in esperadas]
+    return esperadas
+
+
+def _leer_pyarrow(ruta: str, formato: Formato, usecols=None, texto: bool = False) -> pd.DataFrame:
+    lectura = pa_csv.ReadOptions(encoding=formato.encoding)
+    separacion = pa_csv.ParseOptions(delimiter=formato.sep)
+    incluidas = list(usecols) if usecols is not None else []
+    if texto:
+        tipos = {columna: pa.string() for columna in incluidas or formato.columnas}
+    else:
+        # pyarrow convierte fechas y horas ('06:07' -> 06:07:00); pandas las deja como texto
+        with pa_csv.open_csv(ruta, read_options=lectura, parse_options=separacion) as flujo:
+            tipos = {campo.name: pa.string() for campo in flujo.schema if pa.types.is_temporal(campo.type)}
+    conversion = pa_csv.ConvertOptions(column_types=tipos, include_columns=incluidas, strings_can_be_null=True)
+    tabla = pa_csv.read_csv(ruta, read_options=lectura, parse_options=separacion, convert_options=conversion)
+    # Como pandas: columnas sin valores como float y textos como ``str``
+    tabla = tabla.cast(pa.schema([campo.with_type(pa.float64()) if pa.types.is_null(campo.type) else campo
+                                  for campo in tabla.schema]))
+    cadena = pd.StringDtype('pyarrow', na_value=np.nan)
+    df = tabla.to_pandas(types_mapper={pa.string(): cadena, pa.large_string(): cadena}.get)
+    if usecols is not None:
+        # pandas entrega las columnas de ``usecols`` en el orden del archivo
+        df = df[[c for c in formato.columnas if c in set(usecols)]]
+    return df
+
+
+def leer(ruta: str, columnas=None, encoding: str = 'utf-8', **opciones) -> pd.DataFrame:
+    """
+    ``pd.read_csv`` con el formato detectado (``detectar``) y las ``columnas`` esperadas validadas.
+    ``opciones`` son las de ``pd.read_csv`` (sin ``sep`` ni ``encoding``).
+    """
+    formato = detectar(ruta, _esperadas(columnas, opciones), encoding)
+    rapido = (pa is not None and formato.encabezado and set(opciones) <= opciones_pyarrow
+              and opciones.get('dtype', str) is str)
+    try:
+        if rapido:
+            return _leer_pyarrow(ruta, formato, opciones.get('usecols'), 'dtype' in opciones)
+        return pd.read_csv(ruta, **_opciones_pandas(formato, opciones))
+    except (UnicodeDecodeError, pd.errors.ParserError) as error:
+        raise ErrorFormato(f"{ruta}: no se pudo leer con {formato}: {error}") from error
+    except Exception as error:
+        if pa is not None and isinstance(error, pa.ArrowInvalid):
+            raise ErrorFormato(f"{ruta}: no se pudo leer con {formato}: {error}") from error
+        raise
+
+
+def bloques(ruta: str, filas: int, columnas=None, encoding: str = 'utf-8', **opciones):
+    """Como ``leer``, pero entrega bloques de ``filas`` filas (lector de pandas)."""
+    formato = detectar(ruta, _esperadas(columnas, opciones), encoding)
+    try:
+        yield from pd.read_csv(ruta, chunksize=filas, **_opciones_pandas(formato, opciones))
+    except (UnicodeDecodeError, pd.errors.ParserError) as error:
+        raise ErrorFormato(f"{ruta}: no se pudo leer con {formato}: {error}") from error
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Tablas compartidas entre los procesos del visor mediante archivos Arrow mapeados en memoria.
+
+Con varios procesos de Streamlit detrás de un balanceador, cada uno guardaba su propia copia de las
+tablas base (sobre todo las columnas de texto de defunciones). Aquí cada tabla se publica una sola
+vez por versión en ``data_cache/compartido/<nombre>-<versión>.arrow`` (formato IPC de Arrow, sin
+compresión) y todos los procesos la mapean de solo lectura: las páginas del archivo viven en la
+caché de páginas del sistema operativo y se comparten, de modo que la memoria propia de cada proceso
+no crece al agregar procesos.
+
+    - Publicar es escribir un temporal y reemplazarlo de una vez (``escribir_atomico``): un proceso
+      nunca mapea un archivo a medio escribir. Una versión nueva de los datos es un archivo nuevo;
+      los procesos pasan a él cuando su refresco (``precarga.py``) fija la nueva versión.
+    - Las columnas de texto se entregan como ``str`` de pandas sobre el mismo búfer de Arrow (sin
+      copia); numéricas y fechas sin nulos también son vistas del archivo. Los DataFrames son de
+      solo lectura: con copy-on-write (pandas 3) cualquier modificación copia la columna afectada.
+    - Se conservan los ``CONSERVAR`` archivos más recientes de cada tabla; en Linux borrar un archivo
+      que otro proceso aún mapea es seguro.
+
+Se desactiva con ``DASHBOARD_MEMORIA_COMPARTIDA=0`` (cada proceso guarda su propia copia).
+"""
+
+# %% 1. Importar librerías y parámetros
+import glob
+import hashlib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+
+from cache_artefactos import DIRECTORIO_CACHE, escribir_atomico
+
+ACTIVA = os.environ.get("DASHBOARD_MEMORIA_COMPARTIDA", "1") != "0"
+DIRECTORIO_COMPARTIDO = os.path.join(DIRECTORIO_CACHE, "compartido")
+CONSERVAR = 3
+
+try:
+    _TIPO_TEXTO = pd.StringDtype('pyarrow', na_value=np.nan)  # el ``str`` por defecto de pandas 3
+except TypeError:
+    _TIPO_TEXTO = None  # pandas < 2.3: las columnas de texto se copian como ``object``
+
+
+# %% 2. Publicación y mapeo
+def ruta_tabla(nombre: str, version) -> str:
+    clave = hashlib.sha256(repr(version).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(DIRECTORIO_COMPARTIDO, f"{nombre}-{clave}.arrow")
+
+
+def publicar_tabla(nombre: str, version, df: pd.DataFrame) -> str:
+    """Escribe ``df`` como la tabla compartida ``nombre`` de ``version`` y borra las versiones antiguas."""
+    tabla = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    salida = pa.BufferOutputStream()
+    with pa.ipc.new_file(salida, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    ruta = ruta_tabla(nombre, version)
+    escribir_atomico(ruta, salida.getvalue().to_pybytes())
+    _limpiar(nombre)
+    return ruta
+
+
+def _columna(columna: pa.ChunkedArray) -> pd.Series:
+    if _TIPO_TEXTO is not None and pa.types.is_large_string(columna.type):
+        return pd.Series(pd.arrays.ArrowStringArray(columna, dtype=_TIPO_TEXTO), copy=False)
+    if _TIPO_TEXTO is not None and pa.types.is_string(columna.type):
+        return pd.Series(pd.arrays.ArrowStringArray(columna.cast(pa.large_string()), dtype=_TIPO_TEXTO),
+                         copy=False)
+    return columna.to_pandas()
+
+
+def mapear_tabla(ruta: str) -> pd.DataFrame:
+    """DataFrame sobre el archivo Arrow mapeado (sin copiar las columnas)."""
+    tabla = pa.ipc.open_file(pa.memory_map(ruta)).read_all()
+    return pd.DataFrame({n: _columna(c) for n, c in zip(tabla.column_names, tabla.columns)}, copy=False)
+
+
+def tabla_compartida(nombre: str, version, construir) -> pd.DataFrame:
+    """
+    La tabla ``nombre`` de ``version``: la mapea si otro proceso ya la publicó; si no, la construye
+    con ``construir()``, la publica y la mapea. Sin memoria compartida, devuelve ``construir()``.
+    """
+    if not ACTIVA:
+        return construir()
+    ruta = ruta_tabla(nombre, version)
+    if not os.path.exists(ruta):
+        df = construir()
+        try:
+            publicar_tabla(nombre, version, df)
+        except (OSError, pa.ArrowException):
+            logging.getLogger(__name__).exception("No se pudo publicar la tabla compartida %s", nombre)
+            return df
+    return mapear_tabla(ruta)
+
+
+def _limpiar(nombre: str):
+    archivos = sorted(glob.glob(os.path.join(DIRECTORIO_COMPARTIDO, f"{nombre}-*.arrow")),
+                      key=os.path.getmtime, reverse=True)
+    for ruta in archivos[CONSERVAR:]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass  # otro proceso lo borró, o el sistema no permite borrar archivos mapeados
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de métricas de exposición al calor sobre la base de temperaturas.
+
+A partir de la serie diaria de cada estación (``tmm_historico_2024.csv``) calcula:
+    1. Episodios de calor codificados por rachas (inicio, fin, duración y peak de t_max).
+    2. Grados-día acumulados sobre 30°C y 34°C por temporada de calor.
+    3. Noches tropicales (t_min sobre un umbral).
+    4. Excess Heat Factor (EHF, Nairn & Fawcett 2015).
+
+Todos los cálculos son pasadas O(n) de NumPy sobre la serie completa (sin ``rolling`` ni
+``apply``) y los resultados se guardan en caché por estación y versión del archivo.
+"""
+
+# %% 1. Importar librerías y parámetros
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache_artefactos import version_archivo
+from datos_base import temperaturas
+
+RUTA_TEMPERATURAS = "data_temperatura/tmm_historico_2024.csv"
+
+UMBRAL_EPISODIO = 34.0        # t_max que define un día caluroso (criterio SEREMI)
+DURACION_MINIMA = 2           # días consecutivos para considerar episodio (Alerta Amarilla)
+UMBRALES_GRADOS_DIA = (30.0, 34.0)
+UMBRAL_NOCHE_TROPICAL = 20.0  # t_min mínima de una noche tropical
+PERCENTIL_EHF = 95            # percentil climatológico de la temperatura media diaria
+VENTANA_ACLIMATACION = 30     # días previos usados en el índice de aclimatación del EHF
+
+
+# %% 2. Funciones vectorizadas de bajo nivel
+def rachas(mascara: np.ndarray):
+    """
+    Codifica por rachas (run-length) una máscara booleana.
+    Devuelve dos arreglos con el índice de inicio y el índice final (inclusivo) de cada racha de
+    valores verdaderos, en una sola pasada con ``np.diff``.
+    """
+    mascara = np.asarray(mascara, dtype=bool)
+    bordes = np.diff(np.concatenate(([False], mascara, [False])).astype(np.int8))
+    inicios = np.flatnonzero(bordes == 1)
+    finales = np.flatnonzero(bordes == -1) - 1
+    return inicios, finales
+
+
+def media_movil(valores: np.ndarray, ventana: int, adelante: bool = False) -> np.ndarray:
+    """
+    Media móvil con sumas acumuladas. Si ``adelante`` es True la ventana es [i, i+ventana),
+    si no es (i-ventana, i]. Las posiciones sin ventana completa quedan en NaN.
+    """
+    valores = np.asarray(valores, dtype=float)
+    n = len(valores)
+    salida = np.full(n, np.nan)
+    if n < ventana:
+        return salida
+    acumulado = np.concatenate(([0.0], np.cumsum(valores)))
+    medias = (acumulado[ventana:] - acumulado[:-ventana]) / ventana
+    if adelante:
+        salida[:n - ventana + 1] = medias
+    else:
+        salida[ventana - 1:] = medias
+    return salida
+
+
+def temporada_calor(fechas: pd.Series) -> np.ndarray:
+    """Temporada de calor a la que pertenece cada fecha (julio a junio, etiquetada por el año de inicio)."""
+    fechas = pd.DatetimeIndex(fechas)
+    return np.where(fechas.month >= 7, fechas.year, fechas.year - 1)
+
+
+def acumulado_por_grupo(valores: np.ndarray, grupos: np.ndarray) -> np.ndarray:
+    """Suma acumulada que se reinicia en cada cambio de grupo (los grupos deben venir contiguos)."""
+    acumulado = np.cumsum(valores)
+    cambio = np.flatnonzero(np.diff(grupos)) + 1
+    inicios = np.concatenate(([0], cambio))
+    base = np.concatenate(([0.0], acumulado[cambio - 1]))
+    largos = np.diff(np.concatenate((inicios, [len(valores)])))
+    return acumulado - np.repeat(base, largos)
+
+
+# %% 3. Métricas diarias y episodios
+def serie_diaria(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ordena la serie de una estación y la reindexa a un calendario diario continuo, de modo que
+    las rachas y ventanas no salten días faltantes (quedan como NaN).
+    """
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    df = df.drop_duplicates(subset="date").set_index("date").sort_index()
+    calendario = pd.date_range(df.index.min(), df.index.max(), freq="D", name="date")
+    return df[["t_min", "t_max"]].reindex(calendario).reset_index()
+
+
+def calcular_metricas_diarias(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula las métricas diarias de exposición para una estación:
+      - **dia_caluroso:** t_max ≥ 34°C.
+      - **grados_dia_30 / grados_dia_34:** exceso diario de t_max sobre cada umbral.
+      - **gd30_acumulado / gd34_acumulado:** grados-día acumulados dentro de la temporada de calor.
+      - **noche_tropical:** t_min ≥ 20°C.
+      - **ehi_sig, ehi_accl, ehf:** componentes del Excess Heat Factor.
+    """
+    diario = serie_diaria(df)
+    t_max = diario["t_max"].to_numpy(dtype=float)
+    t_min = diario["t_min"].to_numpy(dtype=float)
+    temporada = temporada_calor(diario["date"])
+
+    diario["dia_caluroso"] = t_max >= UMBRAL_EPISODIO
+    for umbral in UMBRALES_GRADOS_DIA:
+        exceso = np.nan_to_num(np.clip(t_max - umbral, 0, None))
+        diario[f"grados_dia_{umbral:.0f}"] = exceso
+        diario[f"gd{umbral:.0f}_acumulado"] = acumulado_por_grupo(exceso, temporada)
+    diario["noche_tropical"] = t_min >= UMBRAL_NOCHE_TROPICAL
+
+    # Excess Heat Factor: EHI_sig = T3 - T95 ; EHI_accl = T3 - T30 ; EHF = EHI_sig * max(1, EHI_accl)
+    t_media = (t_max + t_min) / 2
+    t95 = np.nanpercentile(t_media, PERCENTIL_EHF) if np.isfinite(t_media).any() else np.nan
+    t3 = media_movil(t_media, 3, adelante=True)
+    t30 = np.concatenate(([np.nan], media_movil(t_media, VENTANA_ACLIMATACION)[:-1]))
+    diario["t_media"] = t_media
+    diario["ehi_sig"] = t3 - t95
+    diario["ehi_accl"] = t3 - t30
+    diario["ehf"] = diario["ehi_sig"] * np.maximum(1.0, diario["ehi_accl"])
+    return diario
+
+
+def episodios_calor(diario: pd.DataFrame,
+                    columna: str = "dia_caluroso",
+                    duracion_minima: int = DURACION_MINIMA) -> pd.DataFrame:
+    """
+    Episodios de calor como rachas de días que cumplen ``columna``.
+    Cada fila tiene inicio, fin, duración, peak de t_max, grados-día sobre 34°C y EHF máximo.
+    """
+    columnas = ["inicio", "fin", "duracion", "t_max_peak", "grados_dia_34", "ehf_max"]
+    if diario.empty:
+        return pd.DataFrame(columns=columnas)
+    mascara = diario[columna].to_numpy(dtype=bool)
+    inicios, finales = rachas(mascara)
+    duracion = finales - inicios + 1
+    largos = duracion >= duracion_minima
+    inicios, finales, duracion = inicios[largos], finales[largos], duracion[largos]
+    if len(inicios) == 0:
+        return pd.DataFrame(columns=columnas)
+
+    fechas = diario["date"].to_numpy()
+    t_max = np.nan_to_num(diario["t_max"].to_numpy(dtype=float), nan=-np.inf)
+    ehf = np.nan_to_num(diario["ehf"].to_numpy(dtype=float), nan=-np.inf)
+    gd34 = diario["grados_dia_34"].to_numpy(dtype=float)
+    # reduceat necesita segmentos contiguos: se intercalan inicios y finales + 1 y se toman los pares
+    cortes = np.column_stack((inicios, finales + 1)).ravel()
+    cortes = cortes[cortes < len(mascara)]
+    peak = np.maximum.reduceat(t_max, cortes)[::2][:len(inicios)]
+    ehf_max = np.maximum.reduceat(ehf, cortes)[::2][:len(inicios)]
+    gd = np.add.reduceat(gd34, cortes)[::2][:len(inicios)]
+
+    return pd.DataFrame({
+        "inicio": fechas[inicios],
+        "fin": fechas[finales],
+        "duracion": duracion,
+        "t_max_peak": peak,
+        "grados_dia_34": gd,
+        "ehf_max": np.where(np.isfinite(ehf_max), ehf_max, np.nan),
+    })
+
+
+def evaluar_alertas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Clasificación de alertas SEREMI (misma regla que ``dashboard_alertas.evaluar_alertas``):
+      - **Alerta temprana preventiva:** noviembre a marzo.
+      - **Alerta Amarilla:** dos días consecutivos con t_max ≥ 34°C.
+      - **Alerta Roja:** t_max ≥ 40°C o tres días consecutivos con t_max ≥ 34°C.
+    """
+    df = df.copy()
+    caluroso = (df["t_max"] >= 34).to_numpy(dtype=int)
+    consecutivos_2 = media_movil(caluroso, 2) * 2
+    consecutivos_3 = media_movil(caluroso, 3) * 3
+    df["alerta"] = "Sin Alerta"
+    df.loc[df["date"].dt.month.isin([11, 12, 1, 2, 3]), "alerta"] = "Alerta temprana preventiva"
+    df.loc[df["t_max"] >= 40, "alerta"] = "Alerta Roja"
+    df.loc[consecutivos_2 >= 2, "alerta"] = "Alerta Amarilla"
+    df.loc[consecutivos_3 >= 3, "alerta"] = "Alerta Roja"
+    return df
+
+
+# %% 4. Carga en caché por estación
+@lru_cache(maxsize=32)
+def _metricas_estacion(ruta: str, estacion, version: tuple):
+    df = temperaturas(ruta)
+    if "est" in df.columns and estacion is not None:
+        df = df[df["est"] == estacion]
+    diario = calcular_metricas_diarias(df)
+    return diario, episodios_calor(diario)
+
+
+def metricas_estacion(estacion=None, ruta: str = RUTA_TEMPERATURAS):
+    """
+    Devuelve ``(diario, episodios)`` para una estación, en caché según la versión del archivo.
+    Si ``estacion`` es None se usa la primera estación presente en la base.
+    """
+    if estacion is None:
+        estacion = estaciones(ruta)[0]
+    diario, episodios = _metricas_estacion(ruta, estacion, version_archivo(ruta))
+    return diario.copy(), episodios.copy()
+
+
+@lru_cache(maxsize=8)
+def _estaciones(ruta: str, version: tuple) -> tuple:
+    return tuple(temperaturas(ruta)["est"].unique().tolist())
+
+
+def estaciones(ruta: str = RUTA_TEMPERATURAS) -> tuple:
+    """Códigos de estación presentes en la base de temperaturas."""
+    return _estaciones(ruta, version_archivo(ruta))
+
+
+def filtrar_episodios(episodios: pd.DataFrame, fecha_inicio, fecha_fin) -> pd.DataFrame:
+    """Episodios que se traslapan con el rango de fechas seleccionado."""
+    return episodios[(episodios["fin"] >= pd.Timestamp(fecha_inicio)) &
+                     (episodios["inicio"] <= pd.Timestamp(fecha_fin))].reset_index(drop=True)
+
+
+# %% 5. Superposición en gráficos
+def agregar_episodios(fig, episodios: pd.DataFrame, color: str = "#dc3545", opacidad: float = 0.15):
+    """
+    Sombrea en una figura de Plotly los episodios de calor como franjas verticales, en lugar
+    de marcar día a día. Retorna la misma figura.
+    """
+    for episodio in episodios.itertuples(index=False):
+        fig.add_vrect(
+            x0=episodio.inicio - pd.Timedelta(hours=12),
+            x1=episodio.fin + pd.Timedelta(hours=12),
+            fillcolor=color, opacity=opacidad, line_width=0, layer="below",
+            annotation_text=f"{episodio.t_max_peak:.1f}°C", annotation_position="top left",
+        )
+    return fig
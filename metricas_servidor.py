@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas del servidor del visor en formato de texto de Prometheus.
+
+Contadores e histogramas acumulados desde que arrancó el proceso de Streamlit:
+  - ``dashboard_renderizaciones_total`` / ``dashboard_render_seconds``: ejecuciones de cada página.
+  - ``dashboard_cache_aciertos_total`` / ``dashboard_cache_fallos_total``: llamadas a las cargas en
+    caché de las páginas (``diagnostico.cache_data``).
+  - ``dashboard_etapa_seconds``: duración de las etapas medidas con ``diagnostico.etapa`` (lectura,
+    agregación, figuras, exportación).
+  - ``dashboard_exportacion_bytes``: tamaño de los archivos Excel/CSV generados para descarga.
+  - ``dashboard_refrescos_total``: cambios de datos recalculados y aplicados por ``precarga.py``.
+Y valores leídos al momento de exponer las métricas:
+  - ``dashboard_dataset_edad_seconds``: tiempo desde la última publicación de cada dataset (según el
+    manifiesto o, para los archivos vigilados por ``precarga.py`` que no figuran en él, su fecha de
+    modificación).
+  - ``dashboard_memoria_residente_bytes``, ``dashboard_sesiones_activas`` y
+    ``dashboard_sesion_estado_bytes`` (memoria del ``session_state`` de cada sesión).
+  - ``dashboard_streamlit_cache_bytes``: memoria de cada caché ``st.cache_data``.
+  - ``dashboard_lru_*``: aciertos, fallos y tamaño de las cachés en memoria de los módulos de datos.
+
+Se exponen de dos formas (ver ``iniciar_exportacion``, que llama ``dashboard_home.py``):
+  - HTTP en ``127.0.0.1:<DASHBOARD_METRICAS_PUERTO>/metrics`` (9464 por defecto; 0 lo desactiva).
+  - Archivo ``DASHBOARD_METRICAS_ARCHIVO`` (``data_cache/metricas.prom`` por defecto), reescrito cada
+    ``INTERVALO_ARCHIVO`` segundos, para el colector de archivos de texto de node_exporter. Cada
+    proceso escribe su propio archivo (``metricas.<pid>.prom``, que se borra al terminar).
+Con varios procesos de Streamlit solo uno toma el puerto: todas las muestras llevan la etiqueta
+``pid`` para que las de cada proceso no se confundan.
+"""
+
+# %% 1. Importar librerías y parámetros
+import atexit
+import bisect
+import datetime
+import math
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache_artefactos import DIRECTORIO, DIRECTORIO_CACHE, cargar_manifiesto, escribir_atomico
+
+PUERTO = int(os.environ.get("DASHBOARD_METRICAS_PUERTO", "9464"))
+RUTA_ARCHIVO = os.environ.get("DASHBOARD_METRICAS_ARCHIVO", os.path.join(DIRECTORIO_CACHE, "metricas.prom"))
+INTERVALO_ARCHIVO = 15  # segundos
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_BYTES = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+# Módulo -> funciones con ``lru_cache`` cuyos aciertos se informan
+caches_lru = {
+    'cubo_atenciones': ['_cubo_diario'],
+    'egresos': ['_cubo_egresos'],
+    'espacial': ['_arreglos_egresos', '_arreglos_defunciones'],
+    'series_derivadas': ['_derivadas'],
+    'analisis_rezagos': ['_exposicion_respuesta'],
+    'metricas_exposicion': ['_metricas_estacion'],
+    'exceso_alertas': ['_exceso_por_episodio'],
+    'datos_base': ['_temperaturas', '_defunciones', '_urgencias', '_corredor'],
+    'detector_ears': ['_leer_alertas'],
+}
+
+_lock = threading.Lock()
+_metricas = {}
+_iniciado = False
+
+
+# %% 2. Contadores e histogramas
+def _valor(v) -> str:
+    """Valor de una muestra: enteros tal cual y flotantes con precisión completa."""
+    if isinstance(v, float):
+        if math.isnan(v):
+            return 'NaN'
+        if math.isinf(v):
+            return '+Inf' if v > 0 else '-Inf'
+        return repr(float(v))
+    return str(v)
+
+
+def _etiquetas(etiquetas: dict) -> str:
+    if not etiquetas:
+        return ''
+    escapar = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in etiquetas.items()) + '}'
+
+
+class Contador:
+    """Contador acumulado por combinación de etiquetas."""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, ayuda: str):
+        self.nombre, self.ayuda = nombre, ayuda
+        self.valores = {}
+        _metricas[nombre] = self
+
+    def incrementar(self, valor: float = 1, **etiquetas):
+        clave = tuple(etiquetas.items())
+        with _lock:
+            self.valores[clave] = self.valores.get(clave, 0) + valor
+
+    def muestras(self):
+        with _lock:
+            return [(self.nombre, dict(clave), valor) for clave, valor in self.valores.items()]
+
+
+class Histograma:
+    """Histograma con buckets acumulados (``le``), suma y conteo por combinación de etiquetas."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, buckets: tuple):
+        self.nombre, self.ayuda, self.buckets = nombre, ayuda, buckets
+        self.valores = {}
+        _metricas[nombre] = self
+
+    def observar(self, valor: float, **etiquetas):
+        clave = tuple(etiquetas.items())
+        with _lock:
+            conteos, suma = self.valores.get(clave, ([0] * (len(self.buckets) + 1), 0.0))
+            conteos[bisect.bisect_left(self.buckets, valor)] += 1
+            self.valores[clave] = (conteos, suma + valor)
+
+    def muestras(self):
+        filas = []
+        with _lock:
+            for clave, (conteos, suma) in self.valores.items():
+                etiquetas = dict(clave)
+                acumulado = 0
+                for limite, conteo in zip(list(self.buckets) + ['+Inf'], conteos):
+                    acumulado += conteo
+                    le = limite if limite == '+Inf' else f'{limite:g}'
+                    filas.append((f'{self.nombre}_bucket', {**etiquetas, 'le': le}, acumulado))
+                filas.append((f'{self.nombre}_sum', etiquetas, suma))
+                filas.append((f'{self.nombre}_count', etiquetas, acumulado))
+        return filas
+
+
+renderizaciones = Contador('dashboard_renderizaciones_total', 'Ejecuciones del script de cada página.')
+duracion_render = Histograma('dashboard_render_seconds', 'Duración de la ejecución de cada página.',
+                             BUCKETS_SEGUNDOS)
+cache_aciertos = Contador('dashboard_cache_aciertos_total', 'Llamadas a cargas en caché resueltas desde la caché.')
+cache_fallos = Contador('dashboard_cache_fallos_total', 'Llamadas a cargas en caché que debieron calcularse.')
+duracion_etapa = Histograma('dashboard_etapa_seconds', 'Duración de las etapas de carga, agregación, '
+                            'figuras y exportación.', BUCKETS_SEGUNDOS)
+tamano_exportacion = Histograma('dashboard_exportacion_bytes', 'Tamaño de los archivos generados para descarga.',
+                                BUCKETS_BYTES)
+refrescos = Contador('dashboard_refrescos_total', 'Cambios de datos aplicados por el refresco en segundo plano.')
+
+
+@contextmanager
+def render(pagina: str):
+    """Cuenta y mide una ejecución de la página (también si termina con ``st.stop`` o un error)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        renderizaciones.incrementar(pagina=pagina)
+        duracion_render.observar(time.perf_counter() - inicio, pagina=pagina)
+
+
+# %% 3. Valores leídos al exponer
+def _edad_datasets():
+    """
+    ``(dataset, segundos)`` desde la última publicación de cada dataset del manifiesto. Los archivos
+    vigilados por la precarga que el manifiesto no registra (un servidor sin ``data_cache/``) usan su
+    fecha de modificación, con el nombre del archivo como dataset.
+    """
+    from precarga import archivos_vigilados
+
+    ahora = datetime.datetime.now()
+    manifiesto = cargar_manifiesto()
+    for nombre, entrada in sorted(manifiesto.items()):
+        fecha = datetime.datetime.strptime(entrada['fecha'], '%Y-%m-%d %H:%M:%S')
+        yield nombre, (ahora - fecha).total_seconds()
+    publicadas = {os.path.normcase(os.path.join(DIRECTORIO, entrada['ruta'])) for entrada in manifiesto.values()}
+    for ruta in archivos_vigilados:
+        absoluta = os.path.normcase(os.path.abspath(ruta))
+        if absoluta not in publicadas and os.path.exists(absoluta):
+            yield os.path.basename(ruta), time.time() - os.path.getmtime(absoluta)
+
+
+def _memoria_residente():
+    """Memoria residente actual del proceso (Linux) o ``None`` si no se puede leer."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _runtime():
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance() if Runtime.exists() else None
+    except ImportError:
+        return None
+
+
+def _sesiones(runtime):
+    """``(id de sesión abreviado, bytes del session_state)`` de cada sesión activa."""
+    # ``_session_mgr`` no es API pública de Streamlit: si cambia, simplemente no se informa
+    gestor = getattr(runtime, '_session_mgr', None)
+    if gestor is None:
+        return None
+    sesiones = []
+    for info in gestor.list_active_sessions():
+        estadisticas = info.session.session_state.get_stats()
+        total = sum(s.byte_length for familia in estadisticas.values() for s in familia)
+        sesiones.append((info.session.id[:8], total))
+    return sesiones
+
+
+def _caches_lru():
+    for modulo, funciones in caches_lru.items():
+        referencia = sys.modules.get(modulo)  # solo los módulos que alguna página ya importó
+        if referencia is None:
+            continue
+        for nombre in funciones:
+            funcion = getattr(referencia, nombre, None)
+            if funcion is not None and hasattr(funcion, 'cache_info'):
+                yield f'{modulo}.{nombre}', funcion.cache_info()
+
+
+def exponer() -> str:
+    """Todas las métricas del proceso en formato de texto de Prometheus (versión 0.0.4)."""
+    bloques = []
+    pid = os.getpid()
+
+    def bloque(nombre, tipo, ayuda, muestras):
+        lineas = [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+        lineas += [f'{n}{_etiquetas({**e, "pid": pid})} {_valor(v)}' for n, e, v in muestras]
+        bloques.append('\n'.join(lineas))
+
+    for metrica in list(_metricas.values()):
+        bloque(metrica.nombre, metrica.tipo, metrica.ayuda, metrica.muestras())
+
+    bloque('dashboard_dataset_edad_seconds', 'gauge', 'Segundos desde la última publicación del dataset.',
+           [('dashboard_dataset_edad_seconds', {'dataset': n}, round(s, 1)) for n, s in _edad_datasets()])
+    rss = _memoria_residente()
+    if rss is not None:
+        bloque('dashboard_memoria_residente_bytes', 'gauge', 'Memoria residente del proceso de Streamlit.',
+               [('dashboard_memoria_residente_bytes', {}, rss)])
+
+    runtime = _runtime()
+    if runtime is not None:
+        sesiones = _sesiones(runtime)
+        if sesiones is not None:
+            bloque('dashboard_sesiones_activas', 'gauge', 'Sesiones de navegador conectadas.',
+                   [('dashboard_sesiones_activas', {}, len(sesiones))])
+            bloque('dashboard_sesion_estado_bytes', 'gauge', 'Memoria del session_state de cada sesión.',
+                   [('dashboard_sesion_estado_bytes', {'sesion': s}, b) for s, b in sesiones])
+        por_cache = {}
+        for estadisticas in runtime.stats_mgr.get_stats().values():
+            for s in estadisticas:
+                if s.category_name != 'st_session_state':
+                    clave = (s.category_name, s.cache_name)
+                    por_cache[clave] = por_cache.get(clave, 0) + s.byte_length
+        bloque('dashboard_streamlit_cache_bytes', 'gauge', 'Memoria de las cachés de Streamlit.',
+               [('dashboard_streamlit_cache_bytes', {'tipo': t, 'cache': c}, b) for (t, c), b in por_cache.items()])
+
+    lru = list(_caches_lru())
+    for nombre, campo, tipo, ayuda in [('dashboard_lru_aciertos_total', 'hits', 'counter', 'Aciertos'),
+                                       ('dashboard_lru_fallos_total', 'misses', 'counter', 'Fallos'),
+                                       ('dashboard_lru_entradas', 'currsize', 'gauge', 'Entradas')]:
+        bloque(nombre, tipo, f'{ayuda} de las cachés lru_cache de los módulos de datos.',
+               [(nombre, {'funcion': f}, getattr(info, campo)) for f, info in lru])
+    return '\n'.join(bloques) + '\n'
+
+
+# %% 4. Exportación por HTTP y archivo
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        cuerpo = exponer().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass  # sin una línea de log por cada consulta de Prometheus
+
+
+def ruta_archivo() -> str:
+    """Archivo de métricas de este proceso: ``metricas.prom`` -> ``metricas.<pid>.prom``."""
+    base, extension = os.path.splitext(RUTA_ARCHIVO)
+    return f'{base}.{os.getpid()}{extension or ".prom"}'
+
+
+def _borrar_archivo(ruta: str):
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+
+def _escribir_archivo():
+    ruta = ruta_archivo()
+    atexit.register(_borrar_archivo, ruta)  # node_exporter no debe seguir leyendo un proceso terminado
+    while True:
+        try:
+            escribir_atomico(ruta, exponer().encode('utf-8'))
+        except Exception:
+            logging.getLogger(__name__).exception("No se pudo escribir %s", ruta)
+        time.sleep(INTERVALO_ARCHIVO)
+
+
+def iniciar_exportacion():
+    """Arranca (una sola vez por proceso) el endpoint HTTP local y la escritura periódica del archivo."""
+    global _iniciado
+    with _lock:
+        if _iniciado:
+            return
+        _iniciado = True
+    if PUERTO:
+        try:
+            servidor = ThreadingHTTPServer(('127.0.0.1', PUERTO), _Manejador)
+        except OSError as error:
+            # Otro proceso (p. ej. una segunda réplica) ya usa el puerto: queda el archivo
+            logging.getLogger(__name__).warning("Métricas HTTP desactivadas en el puerto %s: %s", PUERTO, error)
+        else:
+            threading.Thread(target=servidor.serve_forever, name='metricas-http', daemon=True).start()
+    if RUTA_ARCHIVO:
+        threading.Thread(target=_escribir_archivo, name='metricas-archivo', daemon=True).start()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Corrección de los últimos días por retraso de registro (nowcasting).
+
+Los conteos de los días recientes están incompletos cuando se descarga el extracto: una defunción o
+una atención del martes puede aparecer recién en el extracto de la semana siguiente. ``data_defunciones.py``
+solo quita el último día, por lo que la última semana queda sistemáticamente por debajo, justo lo
+que se mira en las tablas de «Últimos 10 días» durante una ola de calor.
+
+Cada ejecución de los ETL guarda una instantánea (``registrar``): los conteos diarios de los últimos
+``VENTANA`` días de cada serie tal como venían en ese extracto, con su fecha de ``corte`` (el primer
+día que el extracto no cubre). Con las instantáneas acumuladas:
+
+    - El ``retraso`` de un conteo es ``corte - fecha`` en días (1 = el último día del extracto).
+    - Un día se considera completo en la instantánea más madura con retraso ``>= HORIZONTE``.
+    - ``distribucion_retrasos`` arma, para todas las series a la vez, el arreglo series × días ×
+      retrasos de las fracciones ``conteo con retraso k / conteo completo`` y estima por retraso la
+      fracción registrada (razón de sumas) y sus cuantiles ``CUANTILES`` entre días. Un retraso visto
+      en menos de ``MIN_DIAS`` días no se estima.
+    - ``corregir`` divide los conteos observados de la última instantánea por esas fracciones:
+      ``estimado = observado / fraccion``, y la banda usa los cuantiles (solo la variabilidad del
+      registro, no el azar de los casos que faltan).
+
+El resultado queda en caché por versión del archivo de instantáneas (``lru_cache``), y
+``agregar_estimacion`` lo dibuja en los gráficos como un tramo punteado con su banda.
+"""
+
+# %% 1. Importar librerías y parámetros
+import os
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache_artefactos import publicar, version_archivo
+from lector_csv import leer
+
+RUTA_DEFUNCIONES = "data_defunciones/instantaneas_defunciones.csv"
+RUTA_URGENCIAS = "data_atenciones_urgencia/instantaneas_urgencias.csv"
+
+HORIZONTE = 28          # días de retraso después de los cuales un conteo se considera completo
+VENTANA = 42            # días hacia atrás que guarda cada instantánea (debe superar HORIZONTE)
+MIN_DIAS = 7            # días completos mínimos para estimar la fracción de un retraso
+CUANTILES = (0.05, 0.95)
+
+columnas_instantanea = ['corte', 'fecha', 'serie', 'conteo']
+columnas_factores = ['fecha', 'retraso', 'fraccion', 'fraccion_inferior', 'fraccion_superior', 'dias']
+
+
+# %% 2. Instantáneas de cada extracto
+def instantanea(diarios: pd.DataFrame, corte) -> pd.DataFrame:
+    """
+    Instantánea en formato largo de los conteos ``diarios`` (índice de fechas, una columna por serie)
+    de un extracto con fecha de ``corte``: los ``VENTANA`` días anteriores, con 0 en los días sin casos.
+    """
+    corte = pd.Timestamp(corte).normalize()
+    dias = pd.date_range(corte - pd.Timedelta(days=VENTANA), corte - pd.Timedelta(days=1), freq='D')
+    diarios = diarios.groupby(pd.to_datetime(diarios.index).normalize()).sum().reindex(dias, fill_value=0)
+    largo = diarios.rename_axis(index='fecha', columns='serie').stack().rename('conteo').reset_index()
+    return largo.assign(corte=corte, conteo=largo['conteo'].astype('int64'))[columnas_instantanea]
+
+
+def leer_instantaneas(ruta: str) -> pd.DataFrame:
+    """Instantáneas acumuladas en ``ruta`` (vacío si aún no hay)."""
+    if not os.path.exists(ruta):
+        return pd.DataFrame({'corte': pd.Series(dtype='datetime64[ns]'), 'fecha': pd.Series(dtype='datetime64[ns]'),
+                             'serie': pd.Series(dtype=str), 'conteo': pd.Series(dtype='int64')})
+    instantaneas = leer(ruta, columnas=columnas_instantanea)
+    for columna in ('corte', 'fecha'):
+        instantaneas[columna] = pd.to_datetime(instantaneas[columna])
+    return instantaneas
+
+
+def registrar(nombre: str, diarios: pd.DataFrame, corte, ruta: str) -> pd.DataFrame:
+    """
+    Agrega la instantánea del extracto actual a las ya guardadas en ``ruta`` y publica el archivo.
+    Volver a procesar el mismo extracto (mismo ``corte``) reemplaza su instantánea.
+    """
+    instantaneas = pd.concat([leer_instantaneas(ruta), instantanea(diarios, corte)], ignore_index=True)
+    instantaneas = (instantaneas.drop_duplicates(subset=['corte', 'fecha', 'serie'], keep='last')
+                    .sort_values(['corte', 'serie', 'fecha'], ignore_index=True))
+    publicar(nombre, instantaneas, ruta, index=False, date_format='%Y-%m-%d')
+    print(f"Instantáneas de {nombre}: {instantaneas['corte'].nunique()} extractos, último corte {pd.Timestamp(corte).date()}")
+    return instantaneas
+
+
+# %% 3. Distribución de retrasos
+def distribucion_retrasos(instantaneas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fracción registrada por serie y retraso (1 .. ``HORIZONTE - 1``): ``fraccion`` (razón de sumas
+    sobre los días completos), ``fraccion_inferior``/``fraccion_superior`` (cuantiles entre días) y
+    ``dias`` usados. ``NaN`` donde hay menos de ``MIN_DIAS`` días.
+    """
+    retraso = (instantaneas['corte'] - instantaneas['fecha']).dt.days.to_numpy()
+    series, i_serie = np.unique(instantaneas['serie'].to_numpy(), return_inverse=True)
+    fechas, i_fecha = np.unique(instantaneas['fecha'].to_numpy(), return_inverse=True)
+    conteo = instantaneas['conteo'].to_numpy(dtype=float)
+
+    # Conteo completo de cada (serie, día): el de la instantánea más madura con retraso >= HORIZONTE
+    completo = np.full((len(series), len(fechas)), np.nan)
+    maduros = np.flatnonzero(retraso >= HORIZONTE)
+    maduros = maduros[np.argsort(retraso[maduros], kind='stable')]
+    completo[i_serie[maduros], i_fecha[maduros]] = conteo[maduros]  # el más maduro se asigna al final
+
+    # Arreglo series × días × retrasos con el conteo registrado a cada retraso
+    recientes = (retraso >= 1) & (retraso < HORIZONTE)
+    parcial = np.full((len(series), len(fechas), HORIZONTE), np.nan)
+    parcial[i_serie[recientes], i_fecha[recientes], retraso[recientes]] = conteo[recientes]
+    parcial = parcial[:, :, 1:]
+
+    base = np.where(completo > 0, completo, np.nan)[:, :, None]
+    validos = ~np.isnan(parcial) & ~np.isnan(base)
+    dias = validos.sum(axis=1)
+    registrados = np.where(validos, parcial, 0).sum(axis=1)
+    totales = np.where(validos, base, 0).sum(axis=1)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)  # retrasos sin días completos
+        fraccion = registrados / totales
+        inferior, superior = np.nanquantile(np.where(validos, parcial / base, np.nan), CUANTILES, axis=1)
+
+    suficientes = dias >= MIN_DIAS
+
+    def limpiar(x):
+        # Una fracción sobre 1 (correcciones a la baja) no se corrige; una nula no permite estimar
+        return np.where(suficientes & (x > 0), np.minimum(x, 1.0), np.nan)
+
+    retrasos = np.arange(1, HORIZONTE)
+    return pd.DataFrame({
+        'serie': np.repeat(series, len(retrasos)),
+        'retraso': np.tile(retrasos, len(series)),
+        'fraccion': limpiar(fraccion).ravel(),
+        'fraccion_inferior': limpiar(inferior).ravel(),
+        'fraccion_superior': limpiar(superior).ravel(),
+        'dias': dias.ravel(),
+    })
+
+
+@lru_cache(maxsize=4)
+def _distribucion(ruta: str, version: tuple) -> tuple:
+    instantaneas = leer_instantaneas(ruta)
+    if instantaneas.empty:
+        return None, distribucion_retrasos(instantaneas)
+    return instantaneas['corte'].max(), distribucion_retrasos(instantaneas)
+
+
+def ultimo_corte(ruta: str):
+    """Fecha de ``corte`` del último extracto con instantánea en ``ruta`` (``None`` si no hay)."""
+    if not os.path.exists(ruta):
+        return None
+    return _distribucion(ruta, version_archivo(ruta))[0]
+
+
+def factores(serie: str, ruta: str) -> pd.DataFrame:
+    """
+    Fracción registrada de cada día reciente de ``serie`` en el último extracto (``columnas_factores``);
+    vacío si no hay instantáneas o si ningún retraso tiene días suficientes.
+    """
+    if not os.path.exists(ruta):
+        return pd.DataFrame(columns=columnas_factores)
+    corte, distribucion = _distribucion(ruta, version_archivo(ruta))
+    distribucion = distribucion[(distribucion['serie'] == serie) & distribucion['fraccion'].notna()]
+    fechas = corte - pd.to_timedelta(distribucion['retraso'], unit='D') if corte is not None else []
+    return distribucion.assign(fecha=fechas)[columnas_factores].sort_values('fecha', ignore_index=True)
+
+
+# %% 4. Corrección y gráfico
+def corregir(observados: pd.Series, factores_serie: pd.DataFrame) -> pd.DataFrame:
+    """
+    Estimación de los días recientes de ``observados`` (conteos con índice de fechas): ``observado``,
+    ``estimado``, ``inferior`` y ``superior`` por ``fecha``. Solo los días con fracción estimada que
+    están en ``observados``: los días sin casos deben venir con 0 (ver ``ultimo_corte``).
+    """
+    observados = observados.rename('observado').rename_axis('fecha').reset_index()
+    estimacion = observados.merge(factores_serie, on='fecha', how='inner')
+    estimacion['estimado'] = estimacion['observado'] / estimacion['fraccion']
+    estimacion['inferior'] = np.maximum(estimacion['observado'] / estimacion['fraccion_superior'],
+                                        estimacion['observado'])
+    estimacion['superior'] = estimacion['observado'] / estimacion['fraccion_inferior']
+    return estimacion[['fecha', 'observado', 'estimado', 'inferior', 'superior']]
+
+
+def tabla(estimacion: pd.DataFrame, columna_fecha: str = 'fecha') -> pd.DataFrame:
+    """Columnas de la estimación para las tablas de «Últimos 10 días» (redondeadas a un decimal)."""
+    estimaciones = ['estimado', 'inferior', 'superior']
+    return (estimacion[['fecha']].join(estimacion[estimaciones].round(1))
+            .rename(columns={'fecha': columna_fecha, 'estimado': 'Estimado',
+                             'inferior': 'Estimado (mín.)', 'superior': 'Estimado (máx.)'}))
+
+
+def agregar_estimacion(fig, estimacion: pd.DataFrame, color: str, nombre: str = 'Estimación por retraso de registro',
+                       opacidad: float = 0.15):
+    """
+    Dibuja en una figura de Plotly la estimación de ``corregir`` como un tramo punteado y su banda
+    (``inferior`` a ``superior``) sobre el eje principal. Retorna la misma figura.
+    """
+    import plotly.graph_objects as go
+
+    if estimacion.empty:
+        return fig
+    fechas = pd.concat([estimacion['fecha'], estimacion['fecha'][::-1]])
+    banda = pd.concat([estimacion['superior'], estimacion['inferior'][::-1]])
+    fig.add_trace(go.Scatter(
+        x=fechas, y=banda, fill='toself', fillcolor=color, opacity=opacidad, line=dict(width=0),
+        hoverinfo='skip', name=f'{nombre} ({CUANTILES[0]:.0%}–{CUANTILES[1]:.0%})', legendgroup=nombre,
+    ))
+    fig.add_trace(go.Scatter(
+        x=estimacion['fecha'], y=estimacion['estimado'], mode='lines', name=nombre, legendgroup=nombre,
+        line=dict(color=color, dash='dash'),
+    ))
+    return fig
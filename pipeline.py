@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecutor de la cadena de procesos ETL (pipeline) sin interfaz.
+
+Cada etapa declara el script que la ejecuta, sus archivos de entrada y sus archivos de salida.
+Las dependencias entre etapas se deducen de esas declaraciones (una etapa depende de otra si lee
+alguno de sus archivos de salida). Al ejecutar:
+    - Se calcula el hash SHA-256 de las entradas, del script de cada etapa y de los módulos del
+      repositorio que importa (directa o indirectamente, ``modulos_locales``); si no cambiaron desde
+      la última ejecución exitosa y las salidas existen, la etapa se omite.
+    - Las etapas independientes corren en paralelo, cada una en su propio proceso de Python.
+    - Las rutas de los archivos fuente se resuelven contra una carpeta raíz configurable
+      (``--entrada`` o la variable de entorno ``DATOS_ENTRADA``), que se pasa a los scripts.
+
+Uso:
+    python pipeline.py --entrada /srv/datos/DATA
+    python pipeline.py --listar
+    python pipeline.py --etapas defunciones corredor_endemico --forzar
+"""
+
+# %% 1. Importar librerías y declarar las etapas
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+RUTA_ESTADO = os.path.join(DIRECTORIO, ".pipeline_estado.json")
+ENTRADA_POR_DEFECTO = r'C:\Users\fariass\OneDrive - SUBSECRETARIA DE SALUD PUBLICA\Escritorio\DATA'
+
+
+@dataclass
+class Etapa:
+    """
+    Etapa del pipeline. Las rutas de ``entradas`` que comienzan con ``{entrada}`` se resuelven contra
+    la carpeta raíz de datos fuente; el resto son relativas al repositorio. Los módulos que importa
+    el script no se declaran: se deducen de sus ``import``.
+    """
+    nombre: str
+    script: str
+    entradas: list
+    salidas: list
+    dependencias: set = field(default_factory=set)
+
+
+etapas = [
+    Etapa('defunciones', 'data_defunciones.py',
+          entradas=['{entrada}/DEFUNCIONES/DEF2024.csv', '{entrada}/DEFUNCIONES/DEF2025.csv'],
+          salidas=['data_defunciones/defunciones_2024.csv', 'data_defunciones/defunciones_grupos_diarias.csv',
+                   'data_defunciones/defunciones_2024.calidad.json',
+                   'data_defunciones/instantaneas_defunciones.csv']),
+    Etapa('atenciones_urgencia', 'data_atenciones_urgencias_circulatorio.py',
+          entradas=['{entrada}/ATENCIONES_URGENCIA/au_2024/AtencionesUrgencia2024.csv',
+                    '{entrada}/ATENCIONES_URGENCIA/au_2025/AtencionesUrgencia2025.csv'],
+          salidas=['data_atenciones_urgencia/df_rm_circ_2024.csv',
+                   'data_atenciones_urgencia/df_rm_circ_2024.calidad.json',
+                   'data_atenciones_urgencia/instantaneas_urgencias.csv',
+                   'data_atenciones_urgencia/alertas_ears.csv',
+                   'data_atenciones_urgencia/estado_ears.json']),
+    Etapa('egresos', 'data_egresos.py',
+          entradas=['{entrada}/EGRESOS_HOSPITALARIOS/EH_2024_preliminar13012025.csv'],
+          salidas=['data_egresos/eh_2024.parquet', 'data_egresos/eh_2024.calidad.json']),
+    Etapa('alertas_meteorologicas', 'data_Evaluacion_alertas_datos_metereologicos.py',
+          entradas=['{entrada}/TEMPERATURA/tmm_historico_2024.csv'],
+          salidas=['data_temperatura/datos_meteo.csv', 'data_temperatura/datos_meteo.calidad.json']),
+    Etapa('corredor_endemico', 'data_corredor_endemico_calculo.py',
+          entradas=['data_corredor_endemico/defunciones_historicas_2018_2023.csv',
+                    'data_defunciones/defunciones_2024.csv'],
+          salidas=['data_corredor_endemico/defunciones_historicas_2024.csv',
+                   'data_corredor_endemico/defunciones_historicas_hoy.csv']),
+]
+
+
+# %% 2. Resolución de rutas, hashes y dependencias
+def resolver(ruta: str, entrada: str) -> str:
+    """Ruta absoluta de una entrada o salida declarada."""
+    if ruta.startswith('{entrada}'):
+        return os.path.join(entrada, *ruta[len('{entrada}/'):].split('/'))
+    return os.path.join(DIRECTORIO, *ruta.split('/'))
+
+
+def hash_archivo(ruta: str, bloque: int = 1 << 20) -> str:
+    """SHA-256 de un archivo leído por bloques (sin cargarlo completo en memoria)."""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for trozo in iter(lambda: f.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def modulos_locales(script: str) -> list:
+    """
+    Módulos del repositorio que importa ``script`` (relativo al repositorio), directa o
+    indirectamente, incluidos los ``import`` dentro de funciones. Las librerías externas se ignoran.
+    """
+    encontrados, pendientes = set(), [script]
+    while pendientes:
+        with open(os.path.join(DIRECTORIO, pendientes.pop()), encoding='utf-8') as f:
+            arbol = ast.parse(f.read())
+        for nodo in ast.walk(arbol):
+            if isinstance(nodo, ast.Import):
+                nombres = [alias.name for alias in nodo.names]
+            elif isinstance(nodo, ast.ImportFrom) and nodo.module and not nodo.level:
+                nombres = [nodo.module]
+            else:
+                continue
+            for nombre in nombres:
+                modulo = nombre.split('.')[0] + '.py'
+                if modulo not in encontrados and modulo != script and os.path.exists(os.path.join(DIRECTORIO, modulo)):
+                    encontrados.add(modulo)
+                    pendientes.append(modulo)
+    return sorted(encontrados)
+
+
+def huella(etapa: Etapa, entrada: str) -> str:
+    """Hash combinado del script, de los módulos que importa y de todas las entradas de la etapa."""
+    h = hashlib.sha256()
+    for ruta in [etapa.script] + modulos_locales(etapa.script) + etapa.entradas:
+        absoluta = resolver(ruta, entrada)
+        if not os.path.exists(absoluta):
+            raise FileNotFoundError(f"Etapa '{etapa.nombre}': no existe la entrada {absoluta}")
+        h.update(ruta.encode('utf-8'))
+        h.update(hash_archivo(absoluta).encode('ascii'))
+    return h.hexdigest()
+
+
+def resolver_dependencias(etapas: list) -> dict:
+    """Completa ``dependencias`` de cada etapa a partir de las salidas que consume y valida que no haya ciclos."""
+    productor = {salida: etapa.nombre for etapa in etapas for salida in etapa.salidas}
+    por_nombre = {etapa.nombre: etapa for etapa in etapas}
+    for etapa in etapas:
+        etapa.dependencias = {productor[e] for e in etapa.entradas if e in productor} - {etapa.nombre}
+    visitadas, en_curso = set(), set()
+
+    def visitar(nombre):
+        if nombre in en_curso:
+            raise ValueError(f"Dependencia circular en la etapa '{nombre}'")
+        if nombre not in visitadas:
+            en_curso.add(nombre)
+            for dependencia in por_nombre[nombre].dependencias:
+                visitar(dependencia)
+            en_curso.discard(nombre)
+            visitadas.add(nombre)
+    for nombre in por_nombre:
+        visitar(nombre)
+    return por_nombre
+
+
+def cargar_estado() -> dict:
+    if not os.path.exists(RUTA_ESTADO):
+        return {}
+    with open(RUTA_ESTADO, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_estado(estado: dict):
+    temporal = RUTA_ESTADO + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=1)
+    os.replace(temporal, RUTA_ESTADO)
+
+
+# %% 3. Ejecución
+def ejecutar_etapa(etapa: Etapa, entrada: str, estado: dict, forzar: bool) -> tuple:
+    """
+    Ejecuta una etapa si su huella cambió (o si ``forzar``). Devuelve ``(resultado, huella, segundos)``
+    con resultado en ``'omitida'``, ``'ok'`` o el mensaje de error.
+    """
+    inicio = time.perf_counter()
+    firma = huella(etapa, entrada)
+    salidas_presentes = all(os.path.exists(resolver(s, entrada)) for s in etapa.salidas)
+    if not forzar and salidas_presentes and estado.get(etapa.nombre, {}).get('huella') == firma:
+        return 'omitida', firma, time.perf_counter() - inicio
+    entorno = dict(os.environ, DATOS_ENTRADA=entrada)
+    proceso = subprocess.run([sys.executable, etapa.script], cwd=DIRECTORIO, env=entorno,
+                             capture_output=True, text=True)
+    if proceso.returncode != 0:
+        return proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else 'error', firma, \
+            time.perf_counter() - inicio
+    return 'ok', firma, time.perf_counter() - inicio
+
+
+def ejecutar(nombres=None, entrada: str = None, forzar: bool = False, paralelo: int = None) -> dict:
+    """
+    Ejecuta las etapas indicadas (por defecto todas) y las que dependen de ellas, respetando el orden
+    de dependencias y corriendo en paralelo las que están listas. Devuelve el resultado por etapa.
+    """
+    entrada = entrada or os.environ.get('DATOS_ENTRADA', ENTRADA_POR_DEFECTO)
+    por_nombre = resolver_dependencias(etapas)
+    seleccion = set(nombres or por_nombre)
+    desconocidas = seleccion - set(por_nombre)
+    if desconocidas:
+        raise ValueError(f"Etapas desconocidas: {', '.join(sorted(desconocidas))}")
+    # Agregar las etapas aguas abajo de las seleccionadas
+    agregadas = True
+    while agregadas:
+        nuevas = {n for n, e in por_nombre.items() if e.dependencias & seleccion} - seleccion
+        seleccion |= nuevas
+        agregadas = bool(nuevas)
+
+    estado = cargar_estado()
+    resultados = {}
+    pendientes = {n: por_nombre[n] for n in seleccion}
+    en_ejecucion = {}
+    with ThreadPoolExecutor(max_workers=paralelo) as pool:
+        while pendientes or en_ejecucion:
+            fallidas = {n for n, r in resultados.items() if r not in ('ok', 'omitida')}
+            for nombre, etapa in list(pendientes.items()):
+                bloqueantes = etapa.dependencias & seleccion
+                if bloqueantes & fallidas:
+                    resultados[nombre] = 'bloqueada'
+                    del pendientes[nombre]
+                    print(f"[{nombre}] bloqueada por: {', '.join(sorted(bloqueantes & fallidas))}")
+                elif not (bloqueantes - set(resultados)):
+                    en_ejecucion[pool.submit(ejecutar_etapa, etapa, entrada, estado, forzar)] = nombre
+                    del pendientes[nombre]
+            if not en_ejecucion:
+                continue
+            terminadas, _ = wait(en_ejecucion, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                nombre = en_ejecucion.pop(futuro)
+                try:
+                    resultado, firma, segundos = futuro.result()
+                except FileNotFoundError as error:
+                    resultado, firma, segundos = str(error), None, 0.0
+                resultados[nombre] = resultado
+                if resultado == 'ok':
+                    estado[nombre] = {'huella': firma, 'fecha': time.strftime('%Y-%m-%d %H:%M:%S')}
+                    guardar_estado(estado)
+                print(f"[{nombre}] {resultado} ({segundos:.1f} s)")
+    return resultados
+
+
+# %%
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ejecuta las etapas ETL con seguimiento de dependencias.")
+    parser.add_argument('--entrada', help='carpeta raíz de los archivos fuente (por defecto DATOS_ENTRADA)')
+    parser.add_argument('--etapas', nargs='*', help='etapas a ejecutar (por defecto todas)')
+    parser.add_argument('--forzar', action='store_true', help='ejecutar aunque las entradas no hayan cambiado')
+    parser.add_argument('--paralelo', type=int, default=None, help='máximo de etapas simultáneas')
+    parser.add_argument('--listar', action='store_true', help='mostrar las etapas y sus dependencias')
+    args = parser.parse_args()
+
+    if args.listar:
+        for etapa in resolver_dependencias(etapas).values():
+            dependencias = ', '.join(sorted(etapa.dependencias)) or '-'
+            print(f"{etapa.nombre:<24} {etapa.script:<50} depende de: {dependencias}")
+        sys.exit(0)
+    resultados = ejecutar(args.etapas, args.entrada, args.forzar, args.paralelo)
+    sys.exit(0 if all(r in ('ok', 'omitida') for r in resultados.values()) else 1)
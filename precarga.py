@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Precarga y refresco del visor en segundo plano.
+
+``dashboard_home.py`` solo importa Streamlit, de modo que la página de inicio (y las páginas de
+enlaces externos) se muestran de inmediato. Mientras tanto, un hilo importa las librerías pesadas
+que usan las páginas (pandas, numpy, plotly) y llena las cachés en memoria de los módulos de datos
+(``lru_cache`` por versión de archivo): cuando el primer visitante abre un dashboard, su carga en
+``st.cache_data`` encuentra las tablas y cubos ya calculados.
+
+Después, el mismo hilo revisa cada ``INTERVALO_REFRESCO`` segundos el manifiesto y los
+``archivos_vigilados``. Si algo cambió, recalcula todos los pasos con las versiones nuevas mientras
+las páginas siguen viendo las anteriores (``cache_artefactos.servir_estado``), y solo al terminar
+cambia el estado servido de una vez. Así ninguna visita lee ni convierte un archivo completo.
+
+Cada paso queda registrado como etapa ``precarga`` (o ``refresco``) en ``diagnostico.py``. Se
+desactiva con ``DASHBOARD_PRECARGA=0``; en ese caso las páginas leen siempre las versiones en disco.
+"""
+
+# %% 1. Importar librerías y pasos de la precarga
+import importlib
+import logging
+import os
+import threading
+import time
+
+from cache_artefactos import con_estado, estado_disco, servir_estado
+
+ACTIVA = os.environ.get("DASHBOARD_PRECARGA", "1") != "0"
+INTERVALO_REFRESCO = float(os.environ.get("DASHBOARD_REFRESCO_SEGUNDOS", "60"))
+INTENTOS_REFRESCO = 3  # si los archivos cambian mientras se recalcula, se vuelve a empezar
+
+librerias = ['numpy', 'pandas', 'plotly.graph_objects', 'plotly.express', 'diagnostico']
+
+# Archivos que leen las páginas y los módulos de datos (además del manifiesto)
+archivos_vigilados = [
+    "data_temperatura/tmm_historico_2024.csv",
+    "data_defunciones/defunciones_2024.csv",
+    "data_atenciones_urgencia/df_rm_circ_2024.csv",
+    "data_atenciones_urgencia/alertas_ears.csv",
+    "data_defunciones/instantaneas_defunciones.csv",
+    "data_atenciones_urgencia/instantaneas_urgencias.csv",
+    "data_egresos/eh_2024.parquet",
+    "data_espacial/comunas_rm.csv",
+    "data_espacial/comunas_rm.geojson",
+    "data_corredor_endemico/corredor_endemico_mayor80.xlsx",
+    "data_corredor_endemico/corredor_endemico_menor1.xlsx",
+]
+
+
+def _tablas_base():
+    from datos_base import corredor, defunciones, temperaturas
+    temperaturas()
+    defunciones()
+    for ruta in archivos_vigilados:
+        if ruta.endswith('.xlsx') and os.path.exists(ruta):
+            corredor(ruta)
+
+
+def _alertas_ears():
+    from detector_ears import leer_alertas
+    leer_alertas()
+
+
+def _nowcasting():
+    from nowcasting import RUTA_DEFUNCIONES, RUTA_URGENCIAS, factores
+    for ruta in (RUTA_DEFUNCIONES, RUTA_URGENCIAS):
+        factores('Total', ruta)
+
+
+def _metricas_estacion():
+    from metricas_exposicion import metricas_estacion
+    metricas_estacion()
+
+
+def _cubo_atenciones():
+    from cubo_atenciones import tipos_establecimiento
+    tipos_establecimiento()
+
+
+def _exceso_alertas():
+    from exceso_alertas import exceso_por_episodio
+    exceso_por_episodio()
+
+
+def _egresos():
+    from egresos import RUTA_EGRESOS, cubo_egresos
+    if os.path.exists(RUTA_EGRESOS):
+        cubo_egresos()
+
+
+def _mapa_comunas():
+    from espacial import indicadores_espaciales, arreglo_comuna_dia, geometria_poligonos
+    for fuente, indicadores in indicadores_espaciales.items():
+        arreglo_comuna_dia(fuente, indicadores[0])
+    geometria_poligonos()
+
+
+def _exposicion_respuesta():
+    from analisis_rezagos import exposicion_respuesta
+    exposicion_respuesta()
+
+
+# En orden: primero lo que usan las páginas más visitadas; el ajuste de rezagos (el más costoso) al final
+pasos = {
+    'tablas_base': _tablas_base,
+    'alertas_ears': _alertas_ears,
+    'nowcasting': _nowcasting,
+    'metricas_estacion': _metricas_estacion,
+    'cubo_atenciones': _cubo_atenciones,
+    'exceso_alertas': _exceso_alertas,
+    'egresos': _egresos,
+    'mapa_comunas': _mapa_comunas,
+    'exposicion_respuesta': _exposicion_respuesta,
+}
+
+_lock = threading.Lock()
+_iniciada = False
+
+
+# %% 2. Hilo de precarga y refresco
+def precargar(pagina: str = "precarga"):
+    """
+    Ejecuta cada paso con las versiones actuales en disco, sin cambiar lo que ven las páginas, y
+    devuelve el estado para el que quedaron calculadas las cachés. Un paso que falla no detiene a
+    los siguientes.
+    """
+    from diagnostico import etapa
+    estado = estado_disco(archivos_vigilados)
+    with con_estado(estado):
+        for nombre, paso in pasos.items():
+            try:
+                with etapa(pagina, nombre):
+                    paso()
+            except Exception:
+                logging.getLogger(__name__).exception("Falló la precarga de %s", nombre)
+    return estado
+
+
+def refrescar(pagina: str = "refresco"):
+    """
+    Recalcula las cachés para los archivos en disco y recién entonces los sirve a las páginas. Si
+    algún archivo vuelve a cambiar durante el cálculo, repite (hasta ``INTENTOS_REFRESCO`` veces).
+    """
+    for _ in range(INTENTOS_REFRESCO):
+        estado = precargar(pagina)
+        if estado_disco(archivos_vigilados) == estado:
+            break
+    servir_estado(estado)
+    return estado
+
+
+def _ciclo():
+    for libreria in librerias:
+        importlib.import_module(libreria)
+    import metricas_servidor
+    servido = refrescar("precarga")
+    while True:
+        time.sleep(INTERVALO_REFRESCO)
+        try:
+            if estado_disco(archivos_vigilados) == servido:
+                continue
+            servido = refrescar()
+            metricas_servidor.refrescos.incrementar()
+            logging.getLogger(__name__).info("Datos actualizados: se sirven las nuevas versiones")
+        except Exception:
+            logging.getLogger(__name__).exception("Falló el refresco de datos")
+
+
+def iniciar_precarga():
+    """Lanza la precarga y el refresco periódico en un hilo (una sola vez por proceso)."""
+    global _iniciada
+    with _lock:
+        if _iniciada or not ACTIVA:
+            return
+        _iniciada = True
+    threading.Thread(target=_ciclo, name='precarga', daemon=True).start()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Capa de series derivadas: medias móviles de 7 días, EWMA y puntajes z contra la misma ventana
+calendario de los años anteriores, para todas las series diarias de los dashboards.
+
+Las series se apilan en una sola matriz series × días (atenciones de urgencia por IdCausa 1, 12–17,
+22, 25 y cada columna de edad; defunciones totales y cardiovasculares por rango de edad) y cada
+estadístico se calcula en una pasada vectorizada sobre esa matriz. El resultado queda en caché
+según la versión de los archivos de origen, de modo que cambiar el suavizado en la interfaz no
+vuelve a leer ni agrupar nada.
+"""
+
+# %% 1. Importar librerías y parámetros
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from metricas_exposicion import version_archivo
+from analisis_rezagos import (RUTA_URGENCIAS, RUTA_DEFUNCIONES, cubo_urgencias, cubo_defunciones,
+                              grupos_edad_urgencia)
+
+VENTANA_MEDIA = 7
+ALFA_EWMA = 0.3
+MEDIA_VENTANA_Z = 3  # la ventana calendario para el puntaje z es el día ± 3 días (7 días)
+
+# Causas de atenciones de urgencia incluidas en la capa (mismos textos que df_rm_circ_2024.csv)
+causas_derivadas = {
+    1: 'Atenciones de urgencia - Total',
+    12: 'Atenciones de urgencia - Total Sistema Circulatorio',
+    13: 'Atenciones de urgencia - Infarto agudo miocardio',
+    14: 'Atenciones de urgencia - Accidente vascular encefálico',
+    15: 'Atenciones de urgencia - Crisis hipertensiva',
+    16: 'Atenciones de urgencia - Arritmia grave',
+    17: 'Atenciones de urgencia - Otras causas circulatorias',
+    25: 'Hospitalizaciones - Total',
+    22: 'Hospitalizaciones - CAUSAS SISTEMA CIRCULATORIO',
+}
+
+TIPOS = ('original', 'media_7d', 'ewma', 'z')
+
+
+# %% 2. Estadísticos sobre la matriz series × días
+def media_movil_2d(matriz: np.ndarray, ventana: int = VENTANA_MEDIA) -> np.ndarray:
+    """
+    Media móvil hacia atrás sobre el eje de días, con sumas y conteos acumulados: los días faltantes
+    (NaN) no cuentan en la ventana. NaN en los primeros ``ventana - 1`` días y en ventanas sin datos.
+    """
+    def suma_ventana(x):
+        acumulado = np.concatenate((np.zeros((x.shape[0], 1)), np.cumsum(x, axis=1)), axis=1)
+        return acumulado[:, ventana:] - acumulado[:, :-ventana]
+
+    presentes = np.isfinite(matriz)
+    salida = np.full(matriz.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        salida[:, ventana - 1:] = (suma_ventana(np.where(presentes, matriz, 0.0))
+                                   / suma_ventana(presentes.astype(float)))
+    return salida
+
+
+def ewma_2d(matriz: np.ndarray, alfa: float = ALFA_EWMA) -> np.ndarray:
+    """
+    EWMA sobre el eje de días: s_t = α·x_t + (1 − α)·s_{t−1}. La recursión avanza día a día pero
+    cada paso actualiza todas las series a la vez. Un día faltante (NaN) mantiene el último valor y
+    la serie empieza en su primer día con dato.
+    """
+    salida = np.empty_like(matriz, dtype=float)
+    salida[:, 0] = matriz[:, 0]
+    for t in range(1, matriz.shape[1]):
+        x, previo = matriz[:, t], salida[:, t - 1]
+        siguiente = np.where(np.isnan(previo), x, alfa * x + (1 - alfa) * previo)
+        salida[:, t] = np.where(np.isnan(x), previo, siguiente)
+    return salida
+
+
+def posicion_calendario(fechas: pd.DatetimeIndex) -> np.ndarray:
+    """Posición 0..365 de cada fecha en un calendario de 366 días (el 29 de febrero tiene su propio lugar)."""
+    bisiesto = pd.to_datetime({'year': 2000, 'month': fechas.month, 'day': fechas.day})
+    return bisiesto.dt.dayofyear.to_numpy() - 1
+
+
+def z_calendario_2d(matriz: np.ndarray, fechas: pd.DatetimeIndex,
+                    media_ventana: int = MEDIA_VENTANA_Z) -> np.ndarray:
+    """
+    Puntaje z de cada día contra la misma ventana calendario (día ± ``media_ventana``) de todos los
+    años anteriores. La matriz se reordena en una grilla series × años × 366 días, las ventanas se
+    suman con sumas acumuladas circulares y los años previos se acumulan sobre el eje de años.
+    """
+    n_series = matriz.shape[0]
+    anios = fechas.year.to_numpy()
+    indice_anio = anios - anios.min()
+    posicion = posicion_calendario(fechas)
+    n_anios = indice_anio.max() + 1
+
+    grilla = np.full((n_series, n_anios, 366), np.nan)
+    grilla[:, indice_anio, posicion] = matriz
+    presente = np.isfinite(grilla)
+    valores = np.where(presente, grilla, 0.0)
+
+    def suma_ventana(x):
+        ancho = 2 * media_ventana + 1
+        extendido = np.concatenate((x[..., -media_ventana:], x, x[..., :media_ventana]), axis=-1)
+        acumulado = np.concatenate((np.zeros(x.shape[:-1] + (1,)), np.cumsum(extendido, axis=-1)), axis=-1)
+        return acumulado[..., ancho:] - acumulado[..., :-ancho]
+
+    n = suma_ventana(presente.astype(float))
+    s1 = suma_ventana(valores)
+    s2 = suma_ventana(valores ** 2)
+    # Acumular solo los años anteriores (exclusivo): desplazar una posición en el eje de años
+    def previos(x):
+        acumulado = np.cumsum(x, axis=1)
+        return np.concatenate((np.zeros_like(acumulado[:, :1]), acumulado[:, :-1]), axis=1)
+    n, s1, s2 = previos(n), previos(s1), previos(s2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = s1 / n
+        desviacion = np.sqrt((s2 - n * media ** 2) / (n - 1))
+        z = (grilla - media) / desviacion
+    z[~np.isfinite(z)] = np.nan
+    return z[:, indice_anio, posicion]
+
+
+# %% 3. Construcción de la capa en caché
+def matriz_series() -> pd.DataFrame:
+    """
+    Todas las series diarias en un solo DataFrame fechas × series, con columnas MultiIndex
+    (fuente, causa, edad).
+    """
+    urgencias = cubo_urgencias(causas=causas_derivadas)
+    defunciones = cubo_defunciones()
+    fechas = pd.date_range(min(urgencias.index.min(), defunciones.index.min()),
+                           max(urgencias.index.max(), defunciones.index.max()), freq='D', name='fecha')
+    return pd.concat({
+        'Atenciones de urgencia': urgencias.reindex(fechas),
+        'Defunciones': defunciones.reindex(fechas),
+    }, axis=1).rename_axis(columns=['fuente', 'causa', 'edad'])
+
+
+@lru_cache(maxsize=2)
+def _derivadas(versiones: tuple) -> dict:
+    series = matriz_series()
+    matriz = series.to_numpy(dtype=float).T   # series × días
+    fechas = series.index
+    resultados = {
+        'original': matriz,
+        'media_7d': media_movil_2d(matriz),
+        'ewma': ewma_2d(matriz),
+        'z': z_calendario_2d(matriz, fechas),
+    }
+    return {tipo: pd.DataFrame(valores.T, index=fechas, columns=series.columns)
+            for tipo, valores in resultados.items()}
+
+
+def versiones_entradas() -> tuple:
+    """Versión de cada archivo que leen las series derivadas: atenciones y defunciones."""
+    return tuple(version_archivo(r) for r in (RUTA_URGENCIAS, RUTA_DEFUNCIONES))
+
+
+def derivadas() -> dict:
+    """
+    Diccionario ``tipo -> DataFrame`` (fechas × series) con tipo en ``'original'``, ``'media_7d'``,
+    ``'ewma'`` y ``'z'``. Se recalcula solo cuando cambian los archivos de origen.
+    """
+    return _derivadas(versiones_entradas())
+
+
+def urgencias_formato_largo(tipo: str = 'media_7d') -> pd.DataFrame:
+    """
+    Series de atenciones de urgencia de la capa en el mismo formato largo que ``df_rm_circ_2024.csv``
+    (una fila por fecha y causa, una columna por grupo de edad), para usarlas directamente en los
+    gráficos existentes. Los tipos de establecimiento vienen ya sumados (``'Todos'``). Los días sin
+    valor (fuera del rango de las atenciones o, en el puntaje z, sin años anteriores) no se incluyen.
+    """
+    urgencias = derivadas()[tipo]['Atenciones de urgencia'].dropna(how='all')
+    largo = urgencias.stack('causa', future_stack=True).reset_index()
+    largo = largo.rename(columns={'causa': 'Causa'})
+    ids = {nombre: id_causa for id_causa, nombre in causas_derivadas.items()}
+    largo.insert(0, 'GLOSATIPOESTABLECIMIENTO', 'Todos')
+    largo.insert(2, 'IdCausa', largo['Causa'].map(ids))
+    return largo[['GLOSATIPOESTABLECIMIENTO', 'fecha', 'IdCausa', 'Causa'] + grupos_edad_urgencia]